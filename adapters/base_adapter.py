@@ -6,15 +6,58 @@
 class BaseOSAdapter:
     """操作系统适配器基类"""
 
+    # 可以直接写入剪贴板的图片格式，按偏好顺序排列（见 output_encoder.CLIPBOARD_FORMATS）
+    # 渲染阶段会直接编码为其中第一个格式
+    clipboard_image_formats = ("png",)
+
+    # 通过 add_hotkey 注册的额外热键：((热键, 回调), ...)，在 start_hotkey_listener 中一并监听
+    extra_hotkeys = ()
+
     def copy_png_bytes_to_clipboard(self, png_bytes):
         raise NotImplementedError("子类必须实现此方法")
 
+    def copy_image_to_clipboard(self, payload):
+        """写入渲染结果（output_encoder.ClipboardPayload）；默认只支持 png 格式"""
+        if payload.format != "png":
+            raise ValueError(f"不支持的剪贴板图片格式: {payload.format}")
+        self.copy_png_bytes_to_clipboard(payload.data)
+
     def send_keystroke(self, key_combo):
         raise NotImplementedError("子类必须实现此方法")
 
     def try_get_image(self):
         raise NotImplementedError("子类必须实现此方法")
 
+    def get_clipboard_text(self):
+        """读取剪贴板文本；默认使用 pyperclip，剪贴板为空时返回空字符串"""
+        import pyperclip
+        return pyperclip.paste()
+
+    def set_clipboard_text(self, text):
+        """写入剪贴板文本；默认使用 pyperclip"""
+        import pyperclip
+        pyperclip.copy(text)
+
+    def clipboard_has_image(self):
+        """剪贴板中当前是否有图片，用于剪切后尽早结束等待；无法判断时返回 False"""
+        return False
+
+    def cut_was_empty(self):
+        """最近一次模拟剪切是否确定没有剪到任何内容（例如输入框为空）；无法判断时返回 False"""
+        return False
+
+    def get_foreground_app(self):
+        """返回当前前台应用的名称，用于按应用记录剪贴板延迟；无法获取时返回 None"""
+        return None
+
+    def warm_up(self):
+        """预先初始化剪贴板等系统资源，减少第一次触发的延迟；默认什么都不做"""
+        pass
+
+    def add_hotkey(self, hotkey, func):
+        """注册一个额外的热键（例如开启性能剖析），需在 start_hotkey_listener 之前调用；不拦截按键"""
+        self.extra_hotkeys = tuple(self.extra_hotkeys) + ((hotkey, func),)
+
     def start_hotkey_listener(self, hotkey, start_func, block_hotkey=False):
         raise NotImplementedError("子类必须实现此方法")
 
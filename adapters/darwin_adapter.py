@@ -46,6 +46,35 @@ class DarwinAdapter(BaseOSAdapter):
             return adapted
         return hotkey
 
+    def get_foreground_app(self):
+        """返回前台应用名称"""
+        try:
+            from AppKit import NSWorkspace
+            app = NSWorkspace.sharedWorkspace().frontmostApplication()
+            return str(app.localizedName()) if app is not None else None
+        except Exception:
+            return None
+
+    def warm_up(self):
+        """初始化系统剪贴板连接"""
+        self.NSPasteboard.generalPasteboard().types()
+
+    def get_clipboard_text(self):
+        """直接通过 NSPasteboard 读取文本，不启动 pbpaste 进程"""
+        text = self.NSPasteboard.generalPasteboard().stringForType_("public.utf8-plain-text")
+        return "" if text is None else str(text)
+
+    def set_clipboard_text(self, text):
+        """直接通过 NSPasteboard 写入文本，不启动 pbcopy 进程"""
+        pasteboard = self.NSPasteboard.generalPasteboard()
+        pasteboard.clearContents()
+        pasteboard.setString_forType_(text, "public.utf8-plain-text")
+
+    def clipboard_has_image(self):
+        """剪贴板中是否有图片类型的数据"""
+        types = self.NSPasteboard.generalPasteboard().types() or ()
+        return any("image" in t.lower() or t in ("public.png", "public.tiff") for t in types)
+
     def copy_png_bytes_to_clipboard(self, png_bytes):
         pasteboard = self.NSPasteboard.generalPasteboard()
         pasteboard.clearContents()
@@ -218,8 +247,8 @@ class DarwinAdapter(BaseOSAdapter):
         is_hotkey_triggered = False
         # 添加时间戳，用于防止短时间内多次触发
         last_trigger_time = 0
-        # 设置触发间隔（秒），防止短时间内多次触发
-        TRIGGER_INTERVAL = 0.5
+        # 设置触发间隔（秒），只用于按键去抖；获取输入与投递结果已由 main 中的 ui_lock 和渲染队列串行化
+        TRIGGER_INTERVAL = 0.05
     
         def on_press(key):
             nonlocal is_hotkey_triggered, last_trigger_time
@@ -320,6 +349,17 @@ class DarwinAdapter(BaseOSAdapter):
             except Exception as e:
                 print(f"热键释放处理错误: {e}")
     
+        # 额外的热键使用单独的 pynput 监听器
+        if self.extra_hotkeys:
+            self.pynput_keyboard.GlobalHotKeys(
+                {self._to_pynput_hotkey(extra_hotkey): func for extra_hotkey, func in self.extra_hotkeys}
+            ).start()
+
         # 启动监听器，同时监听按键按下和释放事件
         with self.pynput_keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
-            listener.join()
\ No newline at end of file
+            listener.join()
+
+    def _to_pynput_hotkey(self, hotkey):
+        """把 "cmd+shift+p" 形式的热键转换为 pynput 的 "<cmd>+<shift>+p" 形式"""
+        names = {'cmd': '<cmd>', 'ctrl': '<ctrl>', 'opt': '<alt>', 'alt': '<alt>', 'shift': '<shift>', 'enter': '<enter>'}
+        return '+'.join(names.get(part.strip(), part.strip()) for part in hotkey.lower().split('+'))
@@ -2,29 +2,43 @@
 操作系统适配器工厂模块
 """
 
+import os
 import sys
 import platform
 
 # 先检查操作系统，只导入当前系统需要的适配器
 current_os = platform.system()
 
+# 设置为 headless 时使用无界面适配器（不需要显示服务器和键盘钩子）
+ADAPTER_ENV = "SKETCHBOOK_ADAPTER"
+use_headless = os.environ.get(ADAPTER_ENV, "").strip().lower() == "headless"
+
 # 定义基础适配器导入
 from .base_adapter import BaseOSAdapter
 
 # 根据当前系统导入相应的适配器
-if current_os == 'Windows':
+if use_headless:
+    # 无界面模式不导入系统适配器，服务器上可能缺少 PyQt5、keyboard 等依赖
+    pass
+elif current_os == 'Windows':
     from .windows_adapter import WindowsAdapter
 elif current_os == 'Darwin':  # macOS
     from .darwin_adapter import DarwinAdapter
 elif current_os == 'Linux':  # Linux
     from .linux_adapter import LinuxAdapter
 
-def get_os_adapter() -> BaseOSAdapter:
+def get_os_adapter(kind=None) -> BaseOSAdapter:
     """根据当前操作系统返回相应的适配器实例
 
+    Args:
+        kind: 传入 "headless" 时返回无界面适配器；默认由环境变量 SKETCHBOOK_ADAPTER 决定
+
     Returns:
         BaseOSAdapter: 对应操作系统的适配器实例
     """
+    if kind == "headless" or (kind is None and use_headless):
+        from .headless_adapter import HeadlessAdapter
+        return HeadlessAdapter()
     if current_os == 'Windows':
         return WindowsAdapter()
     elif current_os == 'Darwin':  # macOS
@@ -0,0 +1,175 @@
+"""
+无界面适配器实现：模拟一个聊天窗口的输入框、剪贴板和键盘，不需要显示服务器
+
+在设置环境变量 SKETCHBOOK_ADAPTER=headless 后由 get_os_adapter 返回，用于在服务器或 CI 上
+端到端地运行 Start() 并测量延迟（见 benchmarks/bench_end_to_end.py）。
+
+模拟的行为：
+  全选 + 剪切   输入框中的文字或图片在 cut_latency 秒后出现在剪贴板中，输入框清空
+  黏贴          剪贴板中的图片被记入 deliveries
+  其他按键      只记录
+每次按键与剪贴板访问都可以注入固定延迟与随机抖动。
+"""
+
+import queue
+import random
+import threading
+import time
+from output_encoder import ClipboardPayload
+from .memory_adapter import MemoryAdapter
+
+
+class HeadlessAdapter(MemoryAdapter):
+    """带模拟输入框与可注入延迟的内存适配器"""
+
+    def __init__(
+        self,
+        formats=("png",),
+        keystroke_latency=0.0,
+        cut_latency=0.0,
+        clipboard_latency=0.0,
+        jitter=0.0,
+        seed=None,
+    ):
+        super().__init__(formats)
+        from config import SELECT_ALL_HOTKEY, CUT_HOTKEY, PASTE_HOTKEY
+
+        self.select_all_hotkey = SELECT_ALL_HOTKEY
+        self.cut_hotkey = CUT_HOTKEY
+        self.paste_hotkey = PASTE_HOTKEY
+
+        # 注入的延迟（秒），每次实际延迟为 固定值 + [0, jitter) 的随机值
+        self.keystroke_latency = keystroke_latency
+        self.cut_latency = cut_latency
+        self.clipboard_latency = clipboard_latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+        # 模拟的输入框内容：文字或 PIL 图像
+        self.input_box = None
+        self._selected = False
+        # 最近一次剪切时输入框是否为空
+        self._cut_empty = False
+        # 按键记录：(时间, 按键组合)；黏贴记录：(时间, 图片格式, 字节数)，不保留图片数据以免长时间运行占用内存
+        self.keystroke_log = []
+        self.deliveries = []
+        self._delivered = threading.Condition()
+
+        self._lock = threading.RLock()
+        self._triggers = queue.Queue()
+        self.running = False
+
+    def _sleep(self, latency):
+        delay = latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def set_input(self, content):
+        """设置输入框内容（文字或 PIL 图像），模拟用户在触发热键前的输入"""
+        with self._lock:
+            self.input_box = content
+            self._selected = False
+
+    def get_clipboard_text(self):
+        self._sleep(self.clipboard_latency)
+        with self._lock:
+            return super().get_clipboard_text()
+
+    def set_clipboard_text(self, text):
+        self._sleep(self.clipboard_latency)
+        with self._lock:
+            super().set_clipboard_text(text)
+
+    def copy_image_to_clipboard(self, payload):
+        self._sleep(self.clipboard_latency)
+        with self._lock:
+            super().copy_image_to_clipboard(payload)
+
+    def try_get_image(self):
+        self._sleep(self.clipboard_latency)
+        with self._lock:
+            return super().try_get_image()
+
+    def clipboard_has_image(self):
+        with self._lock:
+            return super().clipboard_has_image()
+
+    def cut_was_empty(self):
+        with self._lock:
+            return self._cut_empty
+
+    def get_foreground_app(self):
+        return "headless"
+
+    def send_keystroke(self, key_combo):
+        self._sleep(self.keystroke_latency)
+        with self._lock:
+            self.keystrokes.append(key_combo)
+            self.keystroke_log.append((time.perf_counter(), key_combo))
+            if key_combo == self.select_all_hotkey:
+                self._selected = True
+            elif key_combo == self.cut_hotkey:
+                self._cut()
+            elif key_combo == self.paste_hotkey:
+                self._paste()
+
+    def _cut(self):
+        self._cut_empty = not self._selected or self.input_box is None
+        if self._cut_empty:
+            return
+        content, self.input_box, self._selected = self.input_box, None, False
+
+        def land():
+            with self._lock:
+                if isinstance(content, str):
+                    MemoryAdapter.set_clipboard_text(self, content)
+                else:
+                    # 聊天软件剪切出的图片，以未编码的 RGBA 像素保存
+                    rgba = content.convert("RGBA")
+                    self.clipboard_text = ""
+                    self.clipboard_image = ClipboardPayload("rgba", rgba.tobytes(), rgba.size)
+
+        if self.cut_latency > 0 or self.jitter > 0:
+            delay = self.cut_latency + self._random.random() * self.jitter
+            threading.Timer(delay, land).start()
+        else:
+            land()
+
+    def _paste(self):
+        payload = self.clipboard_image
+        if payload is None:
+            return
+        with self._delivered:
+            self.deliveries.append((time.perf_counter(), payload.format, len(payload.data)))
+            self._delivered.notify_all()
+
+    def wait_for_deliveries(self, count, timeout=None):
+        """等待累计黏贴次数达到 count，超时返回 False"""
+        with self._delivered:
+            return self._delivered.wait_for(lambda: len(self.deliveries) >= count, timeout)
+
+    def trigger(self):
+        """模拟按下热键"""
+        self._triggers.put(True)
+
+    def start_hotkey_listener(self, hotkey, start_func, block_hotkey=False):
+        """不监听真实键盘，依次处理 trigger() 产生的触发，直到 stop()"""
+        print(f"无界面模式：调用 trigger() 模拟热键 {hotkey}")
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    self._triggers.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    start_func()
+                except Exception as e:
+                    print(f"执行功能时出错: {e}")
+        except KeyboardInterrupt:
+            print("程序已被用户中断")
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
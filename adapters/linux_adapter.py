@@ -4,15 +4,37 @@ Linux操作系统适配器实现
 
 import sys
 import time
-import io
 import getpass
+import queue
 import threading
+from concurrent.futures import Future
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import QBuffer, QIODevice
+from PyQt5.QtCore import QByteArray, QMimeData
+from PIL import Image
 from .base_adapter import BaseOSAdapter
 
 
+def qimage_to_pil(q_image):
+    """
+    直接把 QImage 的像素包装为 PIL 图像，不经过 PNG 编码再解码。
+    像素与原来经 PNG 中转的结果一致：有透明通道时为 RGBA（非预乘），否则为 RGB。
+    """
+    if q_image.hasAlphaChannel():
+        mode, fmt = "RGBA", QImage.Format_RGBA8888
+    else:
+        mode, fmt = "RGB", QImage.Format_RGB888
+    if q_image.format() != fmt:
+        q_image = q_image.convertToFormat(fmt)
+    stride = q_image.bytesPerLine()
+    bits = q_image.constBits()
+    bits.setsize(stride * q_image.height())
+    # 每行按 4 字节对齐，需要按 bytesPerLine 读取；复制一份，使结果不再引用 QImage 的内存
+    size = (q_image.width(), q_image.height())
+    return Image.frombuffer(mode, size, bits, "raw", mode, stride, 1).copy()
+
+
+
 class LinuxAdapter(BaseOSAdapter):
     """Linux操作系统适配器"""
     
@@ -39,15 +61,21 @@ class LinuxAdapter(BaseOSAdapter):
             # 监听线程
             self.listener_thread = None
             
-            # 添加以下实例变量
-            self.is_processing = False
+            # 热键去抖：同一次按键可能产生多个事件（或按住时的自动重复），间隔小于此值的触发视为同一次。
+            # 获取输入与投递结果已由 main 中的 ui_lock 和有界的渲染队列串行化，这里不再拦截处理中的触发
             self.last_trigger_time = 0
-            self.TRIGGER_INTERVAL = 0.5
+            self.TRIGGER_INTERVAL = 0.05
+            self._trigger_lock = threading.Lock()
             
             # 在Linux上初始化QApplication
             self.app = QApplication.instance()
             if self.app is None:
                 self.app = QApplication([])
+
+            # Qt 剪贴板只能在创建 QApplication 的线程中访问，其他线程的访问通过队列转交给它
+            self._gui_thread = threading.current_thread()
+            self._gui_calls = queue.Queue()
+            self._gui_loop_running = False
         except ImportError as e:
             print(f"错误：在Linux系统上缺少必要的依赖。请运行 'pip install keyboard Pillow PyQt5' 和 'sudo apt-get install python3-xlib': {e}")
             sys.exit(1)
@@ -64,33 +92,25 @@ class LinuxAdapter(BaseOSAdapter):
         self.block_hotkey = block_hotkey
         
         # 重置状态变量
-        self.is_processing = False
         self.last_trigger_time = 0
         
         # 设置运行标志
         self.running = True
         
         def on_hotkey_press():
-            # 获取当前时间
-            current_time = time.time()
-            
-            # 如果距离上次触发时间太短或已经在处理中，直接返回
-            if current_time - self.last_trigger_time < self.TRIGGER_INTERVAL or self.is_processing:
-                return
-            
-            # 设置处理标记
-            self.is_processing = True
-            self.last_trigger_time = current_time
-            
+            # 距离上次触发太短视为同一次按键，直接返回
+            with self._trigger_lock:
+                current_time = time.monotonic()
+                if current_time - self.last_trigger_time < self.TRIGGER_INTERVAL:
+                    return
+                self.last_trigger_time = current_time
+
             try:
                 # 调用传入的函数
                 print(f"热键 {hotkey} 被触发，执行回调函数")
                 start_func()
             except Exception as e:
                 print(f"执行功能时出错: {e}")
-            finally:
-                # 确保无论如何都会重置处理标记
-                self.is_processing = False
         
         # 保存回调函数引用
         self.on_hotkey_press = on_hotkey_press
@@ -100,6 +120,10 @@ class LinuxAdapter(BaseOSAdapter):
             try:
                 # 注册热键
                 self._register_hotkey()
+                # 额外的热键不会在模拟按键时被移除
+                for extra_hotkey, func in self.extra_hotkeys:
+                    self.keyboard.add_hotkey(extra_hotkey, func)
+                    print(f"监听热键: {extra_hotkey}")
                 
                 # 开始监听键盘事件
                 while self.running:
@@ -120,13 +144,17 @@ class LinuxAdapter(BaseOSAdapter):
         
         # 主线程继续执行，等待用户中断
         try:
-            # 保持主线程运行
+            # 保持主线程运行，并处理 Qt 事件：
+            # 剪贴板中的图片/文字由本进程持有，需要事件循环才能响应其他程序的读取请求
+            self._gui_loop_running = True
             while self.running:
-                time.sleep(1)
+                self.app.processEvents()
+                self._run_gui_calls(0.01)
         except KeyboardInterrupt:
             print("程序已被用户中断")
         finally:
             # 停止热键监听
+            self._gui_loop_running = False
             self.running = False
             if self.listener_thread and self.listener_thread.is_alive():
                 self.listener_thread.join(timeout=1.0)
@@ -137,36 +165,65 @@ class LinuxAdapter(BaseOSAdapter):
         # Linux使用标准的热键命名，不需要特殊转换
         return hotkey
     
+    def _call_in_gui_thread(self, func, timeout=2.0):
+        """
+        在创建 QApplication 的线程中执行 func 并返回其结果。
+        主线程尚未进入事件循环时（例如启动阶段）直接在当前线程执行。
+        """
+        if threading.current_thread() is self._gui_thread or not self._gui_loop_running:
+            return func()
+        future = Future()
+        self._gui_calls.put((func, future))
+        return future.result(timeout)
+
+    def _run_gui_calls(self, timeout):
+        """在主线程中执行其他线程转交的剪贴板操作，最多等待 timeout 秒"""
+        try:
+            func, future = self._gui_calls.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func())
+                except BaseException as e:
+                    future.set_exception(e)
+            try:
+                func, future = self._gui_calls.get_nowait()
+            except queue.Empty:
+                return
+
+    def warm_up(self):
+        """初始化Qt剪贴板，第一次访问时需要与显示服务器建立连接"""
+        self._call_in_gui_thread(lambda: self.app.clipboard().mimeData())
+
+    def get_clipboard_text(self):
+        """通过 Qt 剪贴板读取文本，不再为每次读取启动 xclip/xsel 进程"""
+        return self._call_in_gui_thread(lambda: self.app.clipboard().text())
+
+    def set_clipboard_text(self, text):
+        """通过 Qt 剪贴板写入文本"""
+        self._call_in_gui_thread(lambda: self.app.clipboard().setText(text))
+
+    def clipboard_has_image(self):
+        """剪贴板中是否有图片（包括本程序放入的 image/png）"""
+        def has_image():
+            mime_data = self.app.clipboard().mimeData()
+            return mime_data.hasImage() or mime_data.hasFormat("image/png")
+
+        return self._call_in_gui_thread(has_image)
+
     def copy_png_bytes_to_clipboard(self, png_bytes):
-        """将PNG字节数据复制到Linux剪贴板"""
-        # 这部分代码保持不变
+        """以 image/png 类型把PNG字节数据直接放入Qt剪贴板，不写临时文件、不启动 xclip"""
+        def set_png():
+            mime_data = QMimeData()
+            mime_data.setData("image/png", QByteArray(png_bytes))
+            self.app.clipboard().setMimeData(mime_data)
+
         try:
-            # 在Linux上使用不同的剪贴板设置方式
-            import subprocess
-            import tempfile
-            import os
-            
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
-                f.write(png_bytes)
-                temp_filename = f.name
-            
-            # 使用系统命令将图片复制到剪贴板
-            # 对于GNOME桌面环境
-            subprocess.run(['xclip', '-selection', 'clipboard', '-t', 'image/png', '-i', temp_filename])
-            
-            # 清理临时文件
-            os.unlink(temp_filename)
-            
+            self._call_in_gui_thread(set_png)
         except Exception as e:
             print(f"复制PNG到剪贴板失败: {e}")
-            # 如果失败，回退到原来的PyQt5方法
-            try:
-                clipboard = self.app.clipboard()
-                image = QImage.fromData(png_bytes)
-                clipboard.setImage(image)
-            except Exception:
-                pass
 
     def send_keystroke(self, key_combo):
         """Linux 键盘模拟实现 - 使用keyboard库"""
@@ -193,25 +250,32 @@ class LinuxAdapter(BaseOSAdapter):
     
     def try_get_image(self):
         """尝试从Linux剪贴板获取图像"""
-        # 这部分代码保持不变
+        try:
+            return self._call_in_gui_thread(self._read_clipboard_image)
+        except Exception as e:
+            print(f"无法从剪贴板获取图像: {e}")
+        return None
+
+    def _read_clipboard_image(self):
+        """在主线程中读取剪贴板图像"""
         try:
             clipboard = self.app.clipboard()
             mime_data = clipboard.mimeData()
             
             # 检查剪贴板中是否有图像数据
+            q_image = None
             if mime_data.hasImage():
-                # 获取QPixmap
-                pixmap = clipboard.pixmap()
-                if not pixmap.isNull():
-                    # 将QPixmap转换为QImage
-                    q_image = pixmap.toImage()
-                    
-                    # 将QImage转换为PIL Image
-                    buffer = QBuffer()
-                    buffer.open(QIODevice.WriteOnly)
-                    q_image.save(buffer, "PNG")
-                    pil_image = self.Image.open(io.BytesIO(buffer.data()))
-                    return pil_image
+                q_image = clipboard.image()
+            elif mime_data.hasFormat("image/png"):
+                # 剪贴板由本程序持有时只有原始的 image/png 数据
+                q_image = QImage.fromData(mime_data.data("image/png"), "PNG")
+            if q_image is not None and not q_image.isNull():
+                # 直接读取像素转换为PIL Image
+                start = time.perf_counter()
+                pil_image = qimage_to_pil(q_image)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"剪贴板图像 {pil_image.width}x{pil_image.height}，转换耗时 {elapsed_ms:.1f} ms")
+                return pil_image
         except Exception as e:
             print(f"无法从剪贴板获取图像: {e}")
         return None
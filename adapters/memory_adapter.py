@@ -0,0 +1,72 @@
+"""
+内存适配器实现：剪贴板与键盘都在内存中模拟，不依赖任何系统接口
+
+用于在任意系统上验证渲染与剪贴板格式协商，例如模拟 Windows 的 CF_DIB 偏好：
+    adapter = MemoryAdapter(formats=("dib", "png"))
+"""
+
+import io
+from PIL import Image
+from output_encoder import ClipboardPayload
+from .base_adapter import BaseOSAdapter
+
+
+class MemoryAdapter(BaseOSAdapter):
+    """在内存中保存剪贴板内容并记录模拟按键的适配器"""
+
+    def __init__(self, formats=("png",)):
+        self.clipboard_image_formats = tuple(formats)
+        # 剪贴板内容：文本与图片互斥，写入一种会清除另一种
+        self.clipboard_text = ""
+        self.clipboard_image = None
+        # 模拟发送的按键组合，按顺序记录
+        self.keystrokes = []
+
+    def get_clipboard_text(self):
+        return self.clipboard_text
+
+    def set_clipboard_text(self, text):
+        self.clipboard_text = text
+        self.clipboard_image = None
+
+    def copy_png_bytes_to_clipboard(self, png_bytes):
+        size = Image.open(io.BytesIO(png_bytes)).size
+        self.clipboard_text = ""
+        self.clipboard_image = ClipboardPayload("png", png_bytes, size)
+
+    def copy_image_to_clipboard(self, payload):
+        if payload.format not in self.clipboard_image_formats:
+            raise ValueError(f"不支持的剪贴板图片格式: {payload.format}")
+        self.clipboard_text = ""
+        self.clipboard_image = payload
+
+    def get_clipboard_image(self):
+        """把剪贴板中的图片解码为 PIL 图像，没有图片时返回 None"""
+        payload = self.clipboard_image
+        if payload is None:
+            return None
+        if payload.format == "png":
+            return Image.open(io.BytesIO(payload.data))
+        if payload.format == "dib":
+            # 补上 14 字节的 BMP 文件头（像素数据紧跟在 40 字节的信息头之后）
+            header = b"BM" + (len(payload.data) + 14).to_bytes(4, "little") + b"\x00\x00\x00\x00\x36\x00\x00\x00"
+            return Image.open(io.BytesIO(header + payload.data))
+        return Image.frombytes("RGBA", payload.size, payload.data)
+
+    def clipboard_has_image(self):
+        return self.clipboard_image is not None
+
+    def send_keystroke(self, key_combo):
+        self.keystrokes.append(key_combo)
+
+    def try_get_image(self):
+        return self.get_clipboard_image()
+
+    def start_hotkey_listener(self, hotkey, start_func, block_hotkey=False):
+        raise NotImplementedError("内存适配器不监听热键，请直接调用处理函数")
+
+    def adapt_hotkey_for_linux(self, hotkey):
+        return hotkey
+
+    def adapt_hotkey_for_macos(self, hotkey):
+        return hotkey
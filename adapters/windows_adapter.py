@@ -21,16 +21,49 @@ class WindowsAdapter(BaseOSAdapter):
             print(f"错误：在Windows系统上缺少必要的依赖。请运行 'pip install keyboard pywin32 Pillow': {str(e)}")
             sys.exit(1)
 
+    # 剪贴板使用 CF_DIB，渲染阶段直接输出 DIB，省去 PNG 编码再解码
+    clipboard_image_formats = ("dib", "png")
+
     def copy_png_bytes_to_clipboard(self, png_bytes):
         image = self.Image.open(io.BytesIO(png_bytes))
         with io.BytesIO() as output:
             image.convert("RGB").save(output, "BMP")
             bmp_data = output.getvalue()[14:]
+        self._set_dib(bmp_data)
+
+    def copy_image_to_clipboard(self, payload):
+        if payload.format == "dib":
+            self._set_dib(payload.data)
+        else:
+            super().copy_image_to_clipboard(payload)
+
+    def _set_dib(self, dib_data):
         self.win32clipboard.OpenClipboard()
         self.win32clipboard.EmptyClipboard()
-        self.win32clipboard.SetClipboardData(self.win32clipboard.CF_DIB, bmp_data)
+        self.win32clipboard.SetClipboardData(self.win32clipboard.CF_DIB, dib_data)
         self.win32clipboard.CloseClipboard()
 
+    def get_foreground_app(self):
+        """返回前台窗口所属进程的可执行文件名"""
+        try:
+            import os
+            import win32api
+            import win32con
+            import win32gui
+            import win32process
+            _, pid = win32process.GetWindowThreadProcessId(win32gui.GetForegroundWindow())
+            handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ, False, pid)
+            try:
+                return os.path.basename(win32process.GetModuleFileNameEx(handle, 0)).lower()
+            finally:
+                win32api.CloseHandle(handle)
+        except Exception:
+            return None
+
+    def clipboard_has_image(self):
+        """剪贴板中是否有 CF_DIB 图片（查询格式无需打开剪贴板）"""
+        return bool(self.win32clipboard.IsClipboardFormatAvailable(self.win32clipboard.CF_DIB))
+
     def send_keystroke(self, key_combo):
         self.keyboard.send(key_combo)
 
@@ -60,4 +93,7 @@ class WindowsAdapter(BaseOSAdapter):
         print("Starting...")
         print(f"Hot key bind: {str(bool(ok))}")
         print(f"监听热键: {hotkey}")
+        for extra_hotkey, func in self.extra_hotkeys:
+            self.keyboard.add_hotkey(extra_hotkey, func)
+            print(f"监听热键: {extra_hotkey}")
         self.keyboard.wait()
\ No newline at end of file
@@ -0,0 +1,136 @@
+# filename: asset_cache.py
+"""
+已解码图片资源的进程级缓存
+
+底图和置顶图层每次触发热键都要重新解码 PNG 并转换为 RGBA，
+这里按 (路径, mtime, 文件大小) 缓存解码结果，文件被修改后会自动重新加载；
+缓存按内存预算做 LRU 淘汰。
+
+注意：缓存返回的图像是共享对象，调用方只能读取，需要修改时请先 copy()。
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from PIL import Image
+
+# 默认内存预算（字节）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _image_nbytes(img: Image.Image) -> int:
+    """估算图像解码后占用的内存"""
+    return img.width * img.height * len(img.getbands())
+
+
+class AssetCache:
+    """按路径 + mtime/size 缓存 RGBA 图像，超出内存预算时淘汰最久未使用的条目"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (文件戳, 图像)；文件戳为 (mtime_ns, size)，合成图则为两者的元组
+        self._entries: "OrderedDict[str, Tuple[tuple, Image.Image]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> Image.Image:
+        """
+        返回 path 对应的 RGBA 图像（只读，共享）。
+        文件不存在时与 Image.open 一样抛出异常。
+        """
+        key = os.path.abspath(path)
+        stamp = self._stamp(key)
+        img = self._lookup(key, stamp)
+        if img is not None:
+            return img
+
+        # 在锁外解码，避免阻塞其他线程读取已缓存的资源
+        with Image.open(key) as src:
+            img = src.convert("RGBA")
+        img.load()
+        self._store(key, stamp, img)
+        return img
+
+    def get_composite(self, base_path: str, overlay_path: str) -> Image.Image:
+        """
+        返回底图叠加置顶图层后的静态合成图（只读，共享），任一文件变化都会重新合成。
+        """
+        base_key, overlay_key = os.path.abspath(base_path), os.path.abspath(overlay_path)
+        key = base_key + "\0" + overlay_key
+        stamp = (self._stamp(base_key), self._stamp(overlay_key))
+        img = self._lookup(key, stamp)
+        if img is not None:
+            return img
+
+        overlay = self.get(overlay_key)
+        img = self.get(base_key).copy()
+        img.paste(overlay, (0, 0), overlay)
+        self._store(key, stamp, img)
+        return img
+
+    def get_optional(self, path: Optional[str]) -> Optional[Image.Image]:
+        """文件不存在时返回 None，用于置顶图层等可选资源"""
+        if not path or not os.path.isfile(path):
+            return None
+        return self.get(path)
+
+    def preload(self, paths: Iterable[str]) -> None:
+        """预先解码一组资源，不存在的文件会被跳过"""
+        for p in paths:
+            try:
+                self.get_optional(p)
+            except Exception as e:
+                print(f"预加载图片失败 {p}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _stamp(key: str) -> Tuple[int, int]:
+        st = os.stat(key)
+        return st.st_mtime_ns, st.st_size
+
+    def _lookup(self, key: str, stamp) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def _store(self, key: str, stamp, img: Image.Image) -> None:
+        with self._lock:
+            self.misses += 1
+            self._discard(key)
+            nbytes = _image_nbytes(img)
+            # 单张图片超出预算时不缓存，直接返回
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (stamp, img)
+                self._bytes += nbytes
+                self._evict()
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= _image_nbytes(entry[1])
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, img) = self._entries.popitem(last=False)
+            self._bytes -= _image_nbytes(img)
+
+
+# 全局共享的资源缓存
+asset_cache = AssetCache()
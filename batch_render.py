@@ -0,0 +1,212 @@
+# filename: batch_render.py
+"""
+批量渲染：从 JSONL 文件逐行读取任务，在进程池中渲染并写出图片，不需要热键和剪贴板
+
+每行是一个 JSON 对象：
+  {"text": "今天也要【好好画画】哦！", "expression": "开心", "output": "out/0001.png"}
+  {"image": "inputs/cat.jpg", "expression": "#生气#"}
+  text / image 二选一；image 为图片路径。
+  expression 为 BASEIMAGE_MAPPING 中的差分关键词（可省略两侧的 #）；省略时与热键模式一样识别文字中的 #差分名#，
+  否则使用 BASEIMAGE_FILE。
+  output 为输出路径，省略时为 <--output-dir>/<行号>.<扩展名>，扩展名取自编码方案的输出格式（png/webp）。
+相对路径均相对于 JSONL 文件所在目录（从标准输入读取时为当前目录）。
+
+输入按需读取，同时在途的任务数有上限，处理几万行也不会一次性读入内存；
+每个子进程启动时预先解码底图与置顶图层，之后的任务复用进程内的缓存。
+处理结果按输入顺序输出（--results 指定时写为 JSONL），结束后打印吞吐量与失败数。
+
+用法:
+  python batch_render.py stickers.jsonl --output-dir out
+  python batch_render.py stickers.jsonl -j 8 --results results.jsonl
+  cat stickers.jsonl | python batch_render.py - --output-dir out
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import Iterator, List, NamedTuple, Optional, TextIO
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class BatchItem(NamedTuple):
+    """一行输入：line 为行号（从 1 开始），record 为解析后的 JSON（解析失败时为 None）"""
+    line: int
+    record: Optional[dict]
+    error: str = ""
+
+
+class BatchResult(NamedTuple):
+    line: int
+    ok: bool
+    output: str = ""
+    bytes: int = 0
+    ms: float = 0.0
+    error: str = ""
+
+
+def read_items(stream: TextIO) -> Iterator[BatchItem]:
+    """逐行读取 JSONL，空行跳过；解析失败的行也会产出，以便在结果中报告"""
+    for line, raw in enumerate(stream, 1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield BatchItem(line, None, f"JSON 解析失败: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield BatchItem(line, None, "每行必须是一个 JSON 对象")
+            continue
+        yield BatchItem(line, record)
+
+
+# 子进程中的渲染器与设置，由 _init_worker 创建
+_renderer = None
+_worker_options: dict = {}
+
+
+def _init_worker(encoder: str, base_dir: str, output_dir: str) -> None:
+    """子进程初始化：切换到程序目录（config 中的资源路径相对于此），创建渲染器并预先解码资源"""
+    global _renderer
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from output_encoder import ENCODER_FORMATS
+    from renderer import SketchbookRenderer
+
+    _worker_options.update(base_dir=base_dir, output_dir=output_dir, extension=ENCODER_FORMATS[encoder].lower())
+    _renderer = SketchbookRenderer(encoder=encoder)
+    _renderer.preload()
+
+
+def render_item(item: BatchItem) -> BatchResult:
+    """渲染一行输入并写出图片；所有错误都转为失败结果，不会中断整个批次"""
+    if item.record is None:
+        return BatchResult(item.line, False, error=item.error)
+    start = time.perf_counter()
+    try:
+        data, output = _render_record(item)
+    except Exception as e:
+        return BatchResult(item.line, False, error=f"{type(e).__name__}: {e}")
+    return BatchResult(item.line, True, output, len(data), (time.perf_counter() - start) * 1000)
+
+
+def _render_record(item: BatchItem):
+    record = item.record
+    text, image_path = record.get("text"), record.get("image")
+    if (text is None) == (image_path is None):
+        raise ValueError("text 与 image 必须且只能提供一个")
+
+    if text is not None:
+        data = _renderer.render_text(str(text), record.get("expression"))
+    else:
+        data = _renderer.render_image(os.path.join(_worker_options["base_dir"], image_path), record.get("expression"))
+
+    output = record.get("output")
+    if output:
+        output = os.path.join(_worker_options["base_dir"], output)
+    else:
+        output = os.path.join(_worker_options["output_dir"], f"{item.line:06d}.{_worker_options['extension']}")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(data)
+    return data, output
+
+
+def run_batch(items: Iterator[BatchItem], workers: int, encoder: str, base_dir: str, output_dir: str,
+              max_pending: int = 0) -> Iterator[BatchResult]:
+    """
+    按输入顺序产出每一行的结果。
+    workers 为 0 时在当前进程中依次渲染；否则使用进程池，同时在途的任务不超过 max_pending（默认 workers 的 4 倍）。
+    """
+    if workers <= 0:
+        _init_worker(encoder, base_dir, output_dir)
+        for item in items:
+            yield render_item(item)
+        return
+
+    max_pending = max_pending or workers * 4
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(encoder, base_dir, output_dir)) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.apply_async(render_item, (item,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def main() -> int:
+    from output_encoder import ENCODER_FORMATS
+    from config import OUTPUT_ENCODER
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL 输入文件，- 表示标准输入")
+    parser.add_argument("--output-dir", default="out", help="未指定 output 的行写入此目录（默认 out）")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="渲染进程数，0 表示在当前进程中渲染（默认 CPU 核数）")
+    parser.add_argument("--encoder", choices=sorted(ENCODER_FORMATS), default=OUTPUT_ENCODER, help="输出编码方案")
+    parser.add_argument("--results", help="按输入顺序写入每一行结果的 JSONL 文件")
+    parser.add_argument("--max-pending", type=int, default=0, help="同时在途的任务数上限（默认进程数的 4 倍）")
+    args = parser.parse_args()
+
+    # 命令行中的路径相对于当前目录，渲染时切换到程序目录
+    if args.input == "-":
+        stream, base_dir = sys.stdin, os.getcwd()
+    else:
+        stream = open(args.input, encoding="utf-8")
+        base_dir = os.path.dirname(os.path.abspath(args.input))
+    output_dir = os.path.abspath(args.output_dir)
+    results_file = open(args.results, "w", encoding="utf-8") if args.results else None
+    os.chdir(ROOT)
+
+    done = failed = total_bytes = 0
+    times: List[float] = []
+    start = time.perf_counter()
+    try:
+        for result in run_batch(read_items(stream), args.workers, args.encoder, base_dir, output_dir,
+                                args.max_pending):
+            done += 1
+            if result.ok:
+                times.append(result.ms)
+                total_bytes += result.bytes
+            else:
+                failed += 1
+                print(f"第 {result.line} 行失败: {result.error}")
+            if results_file is not None:
+                results_file.write(json.dumps(result._asdict(), ensure_ascii=False) + "\n")
+            if done % 1000 == 0:
+                print(f"已完成 {done} 行，{done / (time.perf_counter() - start):.1f} 行/秒")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if results_file is not None:
+            results_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"共 {done} 行，成功 {done - failed}，失败 {failed}，耗时 {elapsed:.2f} s，"
+          f"{done / elapsed if elapsed > 0 else 0:.1f} 行/秒，输出 {total_bytes / 1024 / 1024:.1f} MB")
+    if times:
+        print(f"单行渲染耗时: p50 {_percentile(times, 50):.1f} ms, p95 {_percentile(times, 95):.1f} ms, "
+              f"max {max(times):.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# filename: benchmarks/bench_clipboard_formats.py
+"""
+剪贴板格式协商的耗时对比，使用内存适配器，可在任意系统上运行：
+  png      渲染后编码为 PNG（Linux/macOS）
+  png>dib  原来的 Windows 路径：编码为 PNG，适配器再解码并转为 DIB
+  dib      渲染阶段直接输出 DIB（现在的 Windows 路径）
+  rgba     未编码的 RGBA 像素
+
+每种方式写入剪贴板后都会解码回来，与 PNG 方式的像素比较。
+
+用法: python benchmarks/bench_clipboard_formats.py [次数]
+"""
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from PIL import Image  # noqa: E402
+from config import BASEIMAGE_FILE, BASE_OVERLAY_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, FONT_FILE  # noqa: E402
+from adapters.memory_adapter import MemoryAdapter  # noqa: E402
+from output_encoder import ClipboardPayload  # noqa: E402
+from render_pipeline import RenderJob, run_render_job  # noqa: E402
+
+TEXT = "今天也要【好好画画】哦！The quick brown fox."
+
+
+def _png_then_dib(adapter: MemoryAdapter, job: RenderJob) -> None:
+    png = run_render_job(job._replace(formats=("png",)))
+    image = Image.open(io.BytesIO(png.data))
+    with io.BytesIO() as output:
+        image.convert("RGB").save(output, "BMP")
+        adapter.copy_image_to_clipboard(ClipboardPayload("dib", output.getvalue()[14:], image.size))
+
+
+def main(n: int = 20) -> None:
+    kwargs = dict(image_source=BASEIMAGE_FILE, image_overlay=BASE_OVERLAY_FILE, top_left=TEXT_BOX_TOPLEFT,
+                  bottom_right=IMAGE_BOX_BOTTOMRIGHT, text=TEXT, max_font_height=64, font_path=FONT_FILE)
+    expected = Image.open(io.BytesIO(run_render_job(RenderJob("text", kwargs)).data)).convert("RGB").tobytes()
+
+    variants = [
+        ("png", ("png",), None),
+        ("png>dib", ("dib",), _png_then_dib),
+        ("dib", ("dib", "png"), None),
+        ("rgba", ("rgba",), None),
+    ]
+    for name, formats, deliver in variants:
+        adapter = MemoryAdapter(formats)
+        job = RenderJob("text", kwargs, adapter.clipboard_image_formats)
+
+        def once():
+            if deliver is not None:
+                deliver(adapter, job)
+            else:
+                adapter.copy_image_to_clipboard(run_render_job(job))
+
+        once()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            once()
+        ms = (time.perf_counter() - t0) / n * 1000
+        same = adapter.get_clipboard_image().convert("RGB").tobytes() == expected
+        print(f"{name:>8}: {ms:7.2f} ms, {len(adapter.clipboard_image.data) / 1024:7.1f} KB, "
+              f"{'一致' if same else '不一致'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,83 @@
+# filename: benchmarks/bench_clipboard_image.py
+"""
+剪贴板图像 QImage -> PIL 转换耗时对比（需要 PyQt5）：
+  png     原来的方式：QImage 编码为 PNG 写入 QBuffer，再用 Image.open 解码
+  direct  qimage_to_pil：转换为 RGBA8888/RGB888 后直接读取像素
+
+覆盖剪贴板中常见的几种 QImage 格式，并校验两种方式得到的像素完全一致。
+
+用法: python benchmarks/bench_clipboard_image.py [次数]
+"""
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+# 不需要显示服务器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PIL import Image  # noqa: E402
+from PyQt5.QtGui import QImage  # noqa: E402
+from PyQt5.QtCore import QBuffer, QIODevice  # noqa: E402
+from adapters.linux_adapter import qimage_to_pil  # noqa: E402
+
+SIZES = [(640, 480), (1920, 1080), (3840, 2160)]
+
+FORMATS = [
+    ("ARGB32_Premultiplied", QImage.Format_ARGB32_Premultiplied),
+    ("ARGB32", QImage.Format_ARGB32),
+    ("RGB32", QImage.Format_RGB32),
+    ("RGB888", QImage.Format_RGB888),
+]
+
+
+def _via_png(q_image: QImage) -> Image.Image:
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    q_image.save(buffer, "PNG")
+    return Image.open(io.BytesIO(buffer.data())).copy()
+
+
+def _sample(size, fmt) -> QImage:
+    # 渐变加噪声，带半透明区域，接近截图/表情包的内容
+    w, h = size
+    rgba = Image.merge("RGBA", (
+        Image.linear_gradient("L").resize(size),
+        Image.effect_noise(size, 64).convert("L"),
+        Image.linear_gradient("L").rotate(90).resize(size),
+        Image.radial_gradient("L").resize(size),
+    ))
+    data = rgba.tobytes()
+    q_image = QImage(data, w, h, w * 4, QImage.Format_RGBA8888)
+    return q_image.convertToFormat(fmt)
+
+
+def _bench(fn, arg, n: int) -> float:
+    fn(arg)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main(n: int = 5) -> None:
+    for size in SIZES:
+        for name, fmt in FORMATS:
+            q_image = _sample(size, fmt)
+            expected = _via_png(q_image)
+            actual = qimage_to_pil(q_image)
+            # 结果必须逐像素一致
+            assert actual.mode == expected.mode, (actual.mode, expected.mode)
+            assert actual.tobytes() == expected.tobytes(), (size, name)
+
+            png_ms = _bench(_via_png, q_image, n)
+            direct_ms = _bench(qimage_to_pil, q_image, n)
+            print(f"{size[0]}x{size[1]} {name:>20}: png {png_ms:8.2f} ms, direct {direct_ms:7.2f} ms, "
+                  f"{png_ms / direct_ms:6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
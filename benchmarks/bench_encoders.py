@@ -0,0 +1,47 @@
+# filename: benchmarks/bench_encoders.py
+"""
+各输出编码方案的耗时与体积对比（使用典型的文字渲染结果）
+
+用法: python benchmarks/bench_encoders.py [次数]
+"""
+import os
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from PIL import Image  # noqa: E402
+from config import BASEIMAGE_FILE, BASE_OVERLAY_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, FONT_FILE  # noqa: E402
+import output_encoder  # noqa: E402
+from text_fit_draw import draw_text_auto  # noqa: E402
+
+TEXT = "今天也要【好好画画】哦！The quick brown fox."
+
+
+def main(n: int = 20) -> None:
+    reference = draw_text_auto(BASEIMAGE_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, TEXT,
+                               max_font_height=64, font_path=FONT_FILE, image_overlay=BASE_OVERLAY_FILE)
+    expected = Image.open(BytesIO(reference)).convert("RGBA").tobytes()
+
+    variants = [(p, False) for p in output_encoder.ENCODER_FORMATS] + [("small", True)]
+    for profile, quantize in variants:
+        output_encoder.small_quantize = quantize
+        t0 = time.perf_counter()
+        for _ in range(n):
+            data = draw_text_auto(BASEIMAGE_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, TEXT,
+                                  max_font_height=64, font_path=FONT_FILE, image_overlay=BASE_OVERLAY_FILE,
+                                  encoder=profile)
+        render_ms = (time.perf_counter() - t0) / n * 1000
+        stats = output_encoder.encode_stats[profile]
+        lossless = Image.open(BytesIO(data)).convert("RGBA").tobytes() == expected
+        name = profile + ("+quantize" if quantize else "")
+        print(f"{name:>16}: 渲染 {render_ms:7.2f} ms, 编码 {stats['last_ms']:7.2f} ms, "
+              f"{len(data) / 1024:7.1f} KB, {'无损' if lossless else '有损'}")
+    output_encoder.small_quantize = False
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,116 @@
+# filename: benchmarks/bench_end_to_end.py
+"""
+端到端延迟与吞吐量测试：使用无界面适配器反复调用 main.Start()，不需要显示服务器
+
+每次触发前往模拟输入框放入一段文字（或一张图片），延迟从调用 Start() 开始计算，
+到渲染结果被黏贴（模拟的 ctrl+v 收到图片）为止。
+  sequential  等上一次黏贴完成再触发，测量单次延迟
+  burst       连续触发，测量吞吐量与排队后的尾延迟
+
+用法: python benchmarks/bench_end_to_end.py [-n 2000] [--mode burst] [--sync] [--cut-latency 20] ...
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["SKETCHBOOK_ADAPTER"] = "headless"
+
+from PIL import Image  # noqa: E402
+import main  # noqa: E402
+from render_pipeline import RenderPipeline  # noqa: E402
+from warmup import SAMPLE_TEXTS, warm_up  # noqa: E402
+
+EXTRA_TEXTS = [
+    "今天吃什么",
+    "【重要】明天早上九点开会，记得带电脑。",
+    "Hello, world! 这是一段中英混排的文字。",
+    "第一行\n第二行\n第三行",
+]
+
+
+def _percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _inputs(n: int, image_ratio: float, seed: int):
+    rng = random.Random(seed)
+    texts = SAMPLE_TEXTS + EXTRA_TEXTS
+    images = [Image.new("RGBA", size, color) for size, color in (
+        ((64, 64), (255, 0, 0, 255)), ((800, 600), (0, 128, 255, 255)), ((1920, 1080), (0, 0, 0, 128)))]
+    for _ in range(n):
+        if rng.random() < image_ratio:
+            yield rng.choice(images)
+        else:
+            # 加上序号，避免所有触发都命中排版缓存
+            yield rng.choice(texts) + str(rng.randrange(100))
+
+
+def _summary(name: str, values) -> str:
+    ms = [v * 1000 for v in values]
+    return (f"{name}: p50 {_percentile(ms, 50):7.2f} ms, p95 {_percentile(ms, 95):7.2f} ms, "
+            f"p99 {_percentile(ms, 99):7.2f} ms, max {max(ms):7.2f} ms")
+
+
+def run(args) -> None:
+    main.setup()
+    adapter = main.os_adapter
+    adapter.keystroke_latency = args.keystroke_latency / 1000
+    adapter.cut_latency = args.cut_latency / 1000
+    adapter.clipboard_latency = args.clipboard_latency / 1000
+    adapter.jitter = args.jitter / 1000
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        warm_up()
+        if not args.sync:
+            main.render_pipeline = RenderPipeline(main.deliver_result, main.RENDER_QUEUE_SIZE).start()
+
+        starts, capture = [], []
+        begin = time.perf_counter()
+        for i, content in enumerate(_inputs(args.n, args.image_ratio, args.seed)):
+            adapter.set_input(content)
+            t0 = time.perf_counter()
+            main.Start()
+            starts.append(t0)
+            capture.append(time.perf_counter() - t0)
+            if args.mode == "sequential" and not adapter.wait_for_deliveries(i + 1, timeout=10):
+                raise RuntimeError(f"第 {i + 1} 次触发没有黏贴结果")
+        if not adapter.wait_for_deliveries(args.n, timeout=60):
+            raise RuntimeError(f"只完成了 {len(adapter.deliveries)}/{args.n} 次黏贴")
+        total = time.perf_counter() - begin
+        if main.render_pipeline is not None:
+            main.render_pipeline.stop()
+
+    # 黏贴按触发顺序完成，第 i 次黏贴对应第 i 次触发
+    latency = [t - s for (t, _, _), s in zip(adapter.deliveries, starts)]
+    print(f"{args.n} 次触发（{args.mode}，{'同步' if args.sync else '后台'}渲染），"
+          f"共 {total:.2f} s，吞吐量 {args.n / total:.1f} 次/秒")
+    print(_summary("Start() 返回", capture))
+    print(_summary("端到端", latency))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="触发次数")
+    parser.add_argument("--mode", choices=("sequential", "burst"), default="sequential")
+    parser.add_argument("--sync", action="store_true", help="在 Start() 中同步渲染（不使用后台流水线）")
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="图片输入所占比例")
+    parser.add_argument("--keystroke-latency", type=float, default=0.0, help="每次按键的延迟（毫秒）")
+    parser.add_argument("--cut-latency", type=float, default=0.0, help="剪切后内容出现在剪贴板的延迟（毫秒）")
+    parser.add_argument("--clipboard-latency", type=float, default=0.0, help="每次剪贴板访问的延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="每次注入延迟附加的随机抖动上限（毫秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main_cli()
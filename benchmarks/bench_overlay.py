@@ -0,0 +1,69 @@
+# filename: benchmarks/bench_overlay.py
+"""
+置顶图层合成耗时对比：
+  before  整张画布 paste(overlay, (0, 0), overlay)
+  sparse  整张画布，但只处理非空分块
+  region  只在文字框内处理非空分块（渲染器实际使用的方式）
+
+用法: python benchmarks/bench_overlay.py [次数]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from config import BASEIMAGE_FILE, BASE_OVERLAY_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT  # noqa: E402
+from asset_cache import asset_cache  # noqa: E402
+from compositing import OverlayIndex  # noqa: E402
+
+
+def _bench(fn, n: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main(n: int = 200) -> None:
+    base = asset_cache.get(BASEIMAGE_FILE)
+    overlay = asset_cache.get(BASE_OVERLAY_FILE)
+
+    t0 = time.perf_counter()
+    index = OverlayIndex(overlay)
+    build_ms = (time.perf_counter() - t0) * 1000
+    total_tiles = -(-overlay.width // 32) * -(-overlay.height // 32)
+    print(f"底图 {base.size}, 置顶图层 bbox={index.bbox}, 非空分块 {len(index.tiles)}/{total_tiles}, 建索引 {build_ms:.2f} ms")
+
+    full = (0, 0) + base.size
+    box = TEXT_BOX_TOPLEFT + IMAGE_BOX_BOTTOMRIGHT
+
+    def before():
+        img = base.copy()
+        img.paste(overlay, (0, 0), overlay)
+        return img
+
+    def sparse():
+        img = base.copy()
+        index.composite(img, overlay, full)
+        return img
+
+    def region():
+        crop = base.crop(box)
+        index.composite(crop, overlay, box)
+        return crop
+
+    # 结果必须逐字节一致
+    assert before().tobytes() == sparse().tobytes()
+    expected = before().crop(box)
+    assert expected.tobytes() == region().tobytes()
+
+    for name, fn in (("before", before), ("sparse", sparse), ("region", region)):
+        print(f"{name:>7}: {_bench(fn, n):.3f} ms/次")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
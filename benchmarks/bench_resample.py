@@ -0,0 +1,79 @@
+# filename: benchmarks/bench_resample.py
+"""
+图片模式各缩放质量档位的耗时与画质对比（见 image_fit_paste.RESAMPLE_TIERS）
+
+输入覆盖不同尺寸的已解码 RGB/RGBA 图片，以及尚未解码的 JPEG（可以利用 draft）。
+JPEG 的耗时包含解码；画质以 exact 档位的结果为参照，给出平均/最大逐通道误差。
+
+用法: python benchmarks/bench_resample.py [次数]
+"""
+import os
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from PIL import Image, ImageChops, ImageStat  # noqa: E402
+from config import TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT  # noqa: E402
+from image_fit_paste import RESAMPLE_TIERS, resize_contained  # noqa: E402
+
+SIZES = [(800, 600), (2000, 1500), (6000, 4000)]
+PADDING = 12
+
+
+def _sample(size) -> Image.Image:
+    # 渐变加平滑的噪声纹理，接近照片的细节程度
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise((size[0] // 4, size[1] // 4), 48).convert("L").resize(size, Image.BILINEAR)
+    return Image.merge("RGB", (gradient, noise, gradient.rotate(180)))
+
+
+def _target(size):
+    region_w = IMAGE_BOX_BOTTOMRIGHT[0] - TEXT_BOX_TOPLEFT[0] - 2 * PADDING
+    region_h = IMAGE_BOX_BOTTOMRIGHT[1] - TEXT_BOX_TOPLEFT[1] - 2 * PADDING
+    scale = min(region_w / size[0], region_h / size[1])
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def _bench(fn, n: int):
+    result = fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1000, result
+
+
+def _error(a: Image.Image, b: Image.Image):
+    diff = ImageChops.difference(a.convert("RGB"), b.convert("RGB"))
+    mean = sum(ImageStat.Stat(diff).mean) / 3
+    peak = max(hi for _, hi in diff.getextrema())
+    return mean, peak
+
+
+def main(n: int = 5) -> None:
+    for size in SIZES:
+        rgb = _sample(size)
+        inputs = {"RGB": lambda: rgb, "RGBA": lambda: rgba}
+        rgba = rgb.convert("RGBA")
+        buf = BytesIO()
+        rgb.save(buf, format="JPEG", quality=90)
+        jpeg = buf.getvalue()
+        inputs["JPEG"] = lambda: Image.open(BytesIO(jpeg))
+        target = _target(size)
+
+        for kind, make in inputs.items():
+            reference = None
+            for quality in RESAMPLE_TIERS:
+                ms, out = _bench(lambda: resize_contained(make(), target, quality), n)
+                if reference is None:
+                    reference = out
+                mean, peak = _error(out, reference)
+                print(f"{size[0]}x{size[1]} -> {target[0]}x{target[1]} {kind:>4} {quality:>8}: "
+                      f"{ms:8.2f} ms, 误差 平均 {mean:5.2f} 最大 {peak:3d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,169 @@
+# filename: benchmarks/bench_service.py
+"""
+渲染服务（render_service.py）压力测试
+
+开启 -c 个保持连接（keep-alive）的客户端，共发送 -n 个请求，统计吞吐量与延迟分位数；
+被服务拒绝（503）的请求单独计数，不计入延迟。
+传入 --start 时自动在本机启动一个服务实例，测试结束后关闭。
+
+用法:
+  python benchmarks/bench_service.py --start -j 4 -n 2000 -c 16
+  python benchmarks/bench_service.py --port 8765 -n 5000 -c 64 --image-ratio 0.2
+  python benchmarks/bench_service.py --unix /tmp/sketchbook.sock -n 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXTS = [
+    "好的",
+    "今天也要【好好画画】哦！",
+    "明天 10:30 开会，主题是 Q3 roadmap，记得带上 laptop 和 charger。",
+    "很长的段落会用到更小的字号。" * 6,
+]
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _sample_image() -> bytes:
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.linear_gradient("L").resize((640, 480)).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _requests(n: int, image_ratio: float, seed: int) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    image = _sample_image() if image_ratio > 0 else b""
+    result = []
+    for i in range(n):
+        if rng.random() < image_ratio:
+            result.append(("/render/image", image))
+        else:
+            # 加上序号，避免所有请求都命中排版缓存
+            body = {"text": rng.choice(TEXTS) + str(i % 100)}
+            result.append(("/render/text", json.dumps(body, ensure_ascii=False).encode()))
+    return result
+
+
+async def _open(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def _send(reader, writer, host: str, path: str, body: bytes) -> Tuple[int, bytes]:
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(args, queue: "asyncio.Queue", latencies: List[float], counts: dict) -> None:
+    reader, writer = await _open(args)
+    try:
+        while True:
+            try:
+                path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                status, _ = await _send(reader, writer, args.host, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                counts["errors"] += 1
+                print(f"连接出错: {e}")
+                writer.close()
+                reader, writer = await _open(args)
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            elif status == 503:
+                counts["rejected"] += 1
+            else:
+                counts["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def run(args) -> None:
+    queue: "asyncio.Queue" = asyncio.Queue()
+    for item in _requests(args.n, args.image_ratio, args.seed):
+        queue.put_nowait(item)
+    latencies: List[float] = []
+    counts = {"rejected": 0, "errors": 0}
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(_client(args, queue, latencies, counts) for _ in range(args.concurrency)))
+    total = time.perf_counter() - begin
+
+    ms = [v * 1000 for v in latencies]
+    print(f"{args.n} 个请求，{args.concurrency} 个连接，共 {total:.2f} s")
+    print(f"成功 {len(ms)}，拒绝(503) {counts['rejected']}，错误 {counts['errors']}，"
+          f"吞吐量 {len(ms) / total:.1f} 请求/秒")
+    if ms:
+        print(f"延迟: p50 {_percentile(ms, 50):.2f} ms, p95 {_percentile(ms, 95):.2f} ms, "
+              f"p99 {_percentile(ms, 99):.2f} ms, max {max(ms):.2f} ms")
+
+
+def _start_server(args) -> subprocess.Popen:
+    command = [sys.executable, os.path.join(ROOT, "render_service.py"), "-j", str(args.workers),
+               "--max-queue", str(args.max_queue)]
+    command += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    # 服务在进程池启动完成后才会输出第一行
+    line = server.stdout.readline()
+    if not line:
+        raise RuntimeError("渲染服务启动失败")
+    print(line.strip())
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="连接 Unix 套接字")
+    parser.add_argument("-n", type=int, default=2000, help="请求总数")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="并发连接数")
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="图片请求所占比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", action="store_true", help="自动启动一个本地服务实例")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="--start 时的渲染进程数")
+    parser.add_argument("--max-queue", type=int, default=16, help="--start 时的排队上限")
+    args = parser.parse_args()
+
+    server: Optional[subprocess.Popen] = _start_server(args) if args.start else None
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# filename: benchmarks/bench_suite.py
+"""
+draw_text_auto / paste_image_auto 基准测试套件（不需要网络，输入全部由固定规则生成）
+
+覆盖：
+  text/<输入>/<cold|warm>          短/长、中文/英文/混排、大量括号、大量换行的文字
+  image/<尺寸>-<模式>/<cold|warm>   不同尺寸的 RGB/RGBA/P 图片
+  expr/<关键词>/<text|image>/<cold|warm>   BASEIMAGE_MAPPING 中的每个差分
+cold 在每次调用前清空所有缓存（底图、字体、排版、PNG 静态行），warm 先调用一次再计时。
+
+每个用例默认在独立的子进程中运行，以便测量该用例的峰值内存（RSS 增量）。
+结果写为 JSON（每个用例的 p50/p95/p99/平均/最小耗时与峰值内存）；
+传入 --baseline 时与之前保存的结果比较，耗时或内存超过阈值的用例会被标记为退化，并以返回码 1 退出。
+
+用法:
+  python benchmarks/bench_suite.py -o results.json
+  python benchmarks/bench_suite.py -o new.json --baseline results.json
+  python benchmarks/bench_suite.py --filter text/ --in-process
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import PIL  # noqa: E402
+from PIL import Image  # noqa: E402
+from config import BASEIMAGE_MAPPING, BASEIMAGE_FILE, BASE_OVERLAY_FILE, FONT_FILE, \
+    TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT  # noqa: E402
+
+TEXT_INPUTS: Dict[str, str] = {
+    "short-cjk": "好的",
+    "short-latin": "OK!",
+    "long-cjk": "今天天气很好，我们一起去公园散步吧。路边的花开得正好，湖面上有几只小船慢慢划过。" * 4,
+    "long-latin": "The quick brown fox jumps over the lazy dog while the sketchbook keeps drawing. " * 5,
+    "mixed": "明天 10:30 开会，主题是 Q3 roadmap，记得带上 laptop 和 charger。",
+    "bracket-heavy": "【重点】[注意]【必看】[重要]【提醒】" * 4,
+    "many-newlines": "\n".join(f"第{i}行 line {i}" for i in range(1, 21)),
+}
+
+IMAGE_SIZES = [(64, 64), (800, 600), (3000, 2000)]
+IMAGE_MODES = ["RGB", "RGBA", "P"]
+
+EXPR_TEXT = "今天也要【好好画画】哦！"
+EXPR_IMAGE = ((800, 600), "RGBA")
+
+MAX_FONT_HEIGHT = 64
+PADDING = 12
+
+
+class Case(NamedTuple):
+    name: str
+    kind: str  # "text" 或 "image"
+    base: str
+    text: str = ""
+    image_size: tuple = (0, 0)
+    image_mode: str = ""
+    cold: bool = False
+
+
+def build_cases() -> List[Case]:
+    cases = []
+    for cold in (True, False):
+        suffix = "cold" if cold else "warm"
+        for name, text in TEXT_INPUTS.items():
+            cases.append(Case(f"text/{name}/{suffix}", "text", BASEIMAGE_FILE, text=text, cold=cold))
+        for size in IMAGE_SIZES:
+            for mode in IMAGE_MODES:
+                cases.append(Case(f"image/{size[0]}x{size[1]}-{mode}/{suffix}", "image", BASEIMAGE_FILE,
+                                  image_size=size, image_mode=mode, cold=cold))
+        for keyword, base in BASEIMAGE_MAPPING.items():
+            expr = keyword.strip("#")
+            cases.append(Case(f"expr/{expr}/text/{suffix}", "text", base, text=EXPR_TEXT, cold=cold))
+            cases.append(Case(f"expr/{expr}/image/{suffix}", "image", base,
+                              image_size=EXPR_IMAGE[0], image_mode=EXPR_IMAGE[1], cold=cold))
+    return cases
+
+
+def make_image(size, mode: str) -> Image.Image:
+    """固定规则生成的测试图片：渐变加平滑纹理，RGBA 带半透明区域"""
+    gradient = Image.linear_gradient("L").resize(size)
+    texture = Image.radial_gradient("L").resize((max(1, size[0] // 4), max(1, size[1] // 4))).resize(size)
+    img = Image.merge("RGBA", (gradient, texture, gradient.rotate(180), Image.radial_gradient("L").resize(size)))
+    if mode == "RGBA":
+        return img
+    rgb = img.convert("RGB")
+    if mode == "P":
+        return rgb.quantize(64)
+    return rgb
+
+
+def clear_caches() -> None:
+    """清空渲染相关的所有缓存"""
+    import compositing
+    import output_encoder
+    import text_fit_draw
+    from asset_cache import asset_cache
+    from font_cache import font_cache
+    from png_encoder import png_encoder
+
+    asset_cache.clear()
+    font_cache.clear()
+    text_fit_draw.layout_cache.clear()
+    compositing.overlay_indices.clear()
+    png_encoder.clear()
+    output_encoder._fast_png_encoder.clear()
+
+
+def _peak_rss_kb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位为字节，Linux 为 KB
+    return peak / 1024 if sys.platform == "darwin" else float(peak)
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_case(case: Case, iterations: int) -> dict:
+    from text_fit_draw import draw_text_auto
+    from image_fit_paste import paste_image_auto
+
+    content = make_image(case.image_size, case.image_mode) if case.kind == "image" else None
+
+    def call():
+        if case.kind == "text":
+            return draw_text_auto(case.base, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, case.text,
+                                  max_font_height=MAX_FONT_HEIGHT, font_path=FONT_FILE,
+                                  image_overlay=BASE_OVERLAY_FILE)
+        return paste_image_auto(case.base, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, content,
+                                padding=PADDING, allow_upscale=True, image_overlay=BASE_OVERLAY_FILE)
+
+    rss_before = _peak_rss_kb()
+    if not case.cold:
+        call()
+    times = []
+    for _ in range(iterations):
+        if case.cold:
+            clear_caches()
+        t0 = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - t0) * 1000)
+    rss_after = _peak_rss_kb()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(times, 50), 4),
+        "p95_ms": round(_percentile(times, 95), 4),
+        "p99_ms": round(_percentile(times, 99), 4),
+        "mean_ms": round(sum(times) / len(times), 4),
+        "min_ms": round(min(times), 4),
+        "peak_rss_kb": None if rss_before is None else round(rss_after - rss_before, 1),
+    }
+
+
+def _run_case_task(args) -> dict:
+    return run_case(*args)
+
+
+def run_suite(cases: List[Case], warm_iterations: int, cold_iterations: int, isolate: bool) -> Dict[str, dict]:
+    tasks = [(case, cold_iterations if case.cold else warm_iterations) for case in cases]
+    results = {}
+    if isolate:
+        # 每个用例使用全新的子进程，峰值内存互不影响，cold 用例也不会受之前加载的模块状态影响
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            for case, result in zip(cases, pool.imap(_run_case_task, tasks)):
+                results[case.name] = result
+                print(f"{case.name:<40} p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms")
+    else:
+        for case, task in zip(cases, tasks):
+            result = results[case.name] = _run_case_task(task)
+            print(f"{case.name:<40} p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            min_ms: float, memory_threshold: float) -> List[str]:
+    """返回退化的用例说明；耗时同时比较 p50 与 p95，差值小于 min_ms 的波动忽略"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] > old[key] * (1 + threshold) and result[key] - old[key] >= min_ms:
+                regressions.append(f"{name}: {key} {old[key]:.2f} -> {result[key]:.2f} ms "
+                                   f"(+{(result[key] / old[key] - 1) * 100:.0f}%)")
+        new_mem, old_mem = result.get("peak_rss_kb"), old.get("peak_rss_kb")
+        if new_mem is not None and old_mem is not None and new_mem > max(old_mem, 1024) * (1 + memory_threshold):
+            regressions.append(f"{name}: peak_rss_kb {old_mem:.0f} -> {new_mem:.0f} KB")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--baseline", help="用于比较的基准结果 JSON")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--warm-iterations", type=int, default=30)
+    parser.add_argument("--cold-iterations", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.15, help="耗时退化阈值（比例）")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="小于该值的耗时差异视为波动")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="峰值内存退化阈值（比例）")
+    parser.add_argument("--in-process", action="store_true", help="在当前进程中运行所有用例（更快，但峰值内存不准确）")
+    args = parser.parse_args()
+
+    cases = [c for c in build_cases() if args.filter in c.name]
+    results = run_suite(cases, args.warm_iterations, args.cold_iterations, not args.in_process)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "isolated": not args.in_process,
+        },
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+        regressions = compare(results, baseline, args.threshold, args.min_ms, args.memory_threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 项退化:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("与基准相比没有退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
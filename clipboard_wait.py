@@ -0,0 +1,85 @@
+# filename: clipboard_wait.py
+"""
+自适应的剪贴板等待
+
+模拟剪切后不再固定 sleep(DELAY)，而是以逐渐变长的间隔轮询剪贴板，内容一出现就立即返回。
+每个前台应用的剪切延迟都会被记录下来，用于调整该应用的超时时间：
+还没有样本的应用使用 min_timeout（即 DELAY，与原来的固定等待相同），慢的应用会自动放宽，但不超过 max_timeout。
+剪切不出文字（图片模式、输入框为空）时不会留下样本，因此这些触发的等待不会超过原来的 DELAY；
+调用方还可以传入 done 判断，例如剪贴板中已经出现图片时立即停止等待。
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+# 每个应用保留的延迟样本数
+_SAMPLES_PER_APP = 32
+
+# 超时为最近延迟最大值的倍数
+_TIMEOUT_FACTOR = 3.0
+
+
+class AdaptiveClipboardWait:
+    """轮询等待剪贴板变化，并按前台应用记录延迟、调整超时"""
+
+    def __init__(
+        self,
+        min_timeout: float = 0.1,
+        max_timeout: float = 1.0,
+        poll_start: float = 0.005,
+        poll_max: float = 0.02,
+    ):
+        self.min_timeout = min_timeout
+        self.max_timeout = max(min_timeout, max_timeout)
+        self.poll_start = poll_start
+        self.poll_max = poll_max
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, app: Optional[str]) -> float:
+        """根据该应用的历史延迟计算超时；没有样本时使用 min_timeout"""
+        with self._lock:
+            samples = self._latencies.get(app or "")
+            if not samples:
+                return self.min_timeout
+            worst = max(samples)
+        return max(self.min_timeout, min(self.max_timeout, worst * _TIMEOUT_FACTOR))
+
+    def record(self, app: Optional[str], latency: float) -> None:
+        with self._lock:
+            samples = self._latencies.setdefault(app or "", deque(maxlen=_SAMPLES_PER_APP))
+            samples.append(latency)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """每个应用的样本数、平均延迟与最大延迟（秒）"""
+        with self._lock:
+            return {
+                app or "<unknown>": {"count": len(s), "mean": sum(s) / len(s), "max": max(s)}
+                for app, s in self._latencies.items() if s
+            }
+
+    def wait_for_change(
+        self,
+        read: Callable[[], Optional[str]],
+        baseline: Optional[str] = "",
+        app: Optional[str] = None,
+        done: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[Optional[str], float]:
+        """
+        轮询 read() 直到结果不同于 baseline、done() 返回 True 或超时，返回 (最后读到的内容, 等待时间)。
+        read 读取失败时应返回 baseline。只有检测到变化时才会记录延迟。
+        """
+        timeout = self.timeout_for(app)
+        start = time.perf_counter()
+        interval = self.poll_start
+        while True:
+            value = read()
+            elapsed = time.perf_counter() - start
+            if value != baseline:
+                self.record(app, elapsed)
+                return value, elapsed
+            if elapsed >= timeout or (done is not None and done()):
+                return value, elapsed
+            time.sleep(min(interval, timeout - elapsed))
+            interval = min(interval * 2, self.poll_max)
@@ -0,0 +1,237 @@
+# filename: compositing.py
+"""
+脏矩形合成
+
+每次渲染真正变化的只有文字/图片框附近的一小块区域。这里保持底图不变，
+只在该区域的裁剪图上绘制内容并叠加对应部分的置顶图层，再贴回“底图 + 置顶图层”的静态合成图。
+置顶图层的叠加是逐像素的，因此结果与整张画布绘制后再整体叠加完全一致。
+
+置顶图层大部分是全透明的，加载时会预先分析出不透明范围和非空分块，合成时只处理这些分块。
+"""
+import threading
+import weakref
+from typing import Callable, List, Optional, Tuple, Union
+from PIL import Image
+from asset_cache import AssetCache, asset_cache
+
+Rect = Tuple[int, int, int, int]
+
+# 置顶图层分块边长（像素）
+OVERLAY_TILE = 32
+
+
+class OverlayIndex:
+    """
+    置顶图层的稀疏索引：蒙版非零范围 bbox 以及非空分块列表。
+    全透明分块叠加后像素不变，可以直接跳过；全不透明分块无需蒙版，直接覆盖。
+    """
+
+    def __init__(self, overlay: Image.Image, tile: int = OVERLAY_TILE):
+        # 不持有图层本身，避免缓存让图层无法回收
+        self.mask = _overlay_mask(overlay)
+        self.bbox: Optional[Rect] = None
+        # [(分块矩形, 是否全不透明), ...]
+        self.tiles: List[Tuple[Rect, bool]] = []
+        if self.mask is None:
+            return
+        self.bbox = self.mask.getbbox()
+        if self.bbox is None:
+            return
+        l, t, r, b = self.bbox
+        # 分块按 tile 对齐到画布网格
+        for ty in range(t - t % tile, b, tile):
+            for tx in range(l - l % tile, r, tile):
+                rect = (tx, ty, min(tx + tile, overlay.width), min(ty + tile, overlay.height))
+                lo, hi = self.mask.crop(rect).getextrema()
+                if hi == 0:
+                    continue
+                self.tiles.append((rect, lo == 255))
+
+    def composite(self, dst: Image.Image, overlay: Image.Image, rect: Rect) -> None:
+        """把置顶图层落在 rect 内的部分叠加到 dst 上，dst 的 (0, 0) 对应画布上的 (rect[0], rect[1])"""
+        if self.mask is None:
+            # 无法建立索引（例如没有 alpha 通道），按原方式整体叠加
+            part = overlay.crop(rect)
+            dst.paste(part, (0, 0), part)
+            return
+        ox, oy = rect[0], rect[1]
+        for tile_rect, opaque in self.tiles:
+            l, t = max(tile_rect[0], rect[0]), max(tile_rect[1], rect[1])
+            r, b = min(tile_rect[2], rect[2]), min(tile_rect[3], rect[3])
+            if l >= r or t >= b:
+                continue
+            box = (l, t, r, b)
+            if opaque:
+                dst.paste(overlay.crop(box), (l - ox, t - oy))
+            else:
+                dst.paste(overlay.crop(box), (l - ox, t - oy), self.mask.crop(box))
+
+
+def _overlay_mask(overlay: Image.Image) -> Optional[Image.Image]:
+    """paste(overlay, mask=overlay) 实际使用的蒙版"""
+    if overlay.mode in ("RGBA", "LA", "RGBa", "La", "PA"):
+        return overlay.getchannel("A")
+    if overlay.mode in ("L", "1"):
+        return overlay.convert("L")
+    return None
+
+
+class OverlayIndexCache:
+    """
+    按图层对象缓存 OverlayIndex，不持有图层本身，图层被回收后条目随之失效。
+    索引只由图层像素决定，多个渲染器共享同一个缓存也不会互相影响；带锁，可在多个线程中使用。
+    """
+
+    def __init__(self):
+        # id(图层) -> (图层的弱引用, 索引)；Image 对象不可哈希，因此按 id 索引并用弱引用确认仍是同一对象
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+        # 已回收图层的 (id, 弱引用)。弱引用回调可能在任意线程、任意时刻（包括持有锁时）触发，
+        # 因此回调只做登记，实际删除在下次持锁访问时进行
+        self._dead: list = []
+
+    def get(self, overlay: Image.Image) -> OverlayIndex:
+        """取置顶图层的索引；缓存中的图层对象是共享的，索引只会计算一次（并发未命中时以先写入的为准）"""
+        key = id(overlay)
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is overlay:
+                return entry[1]
+        index = OverlayIndex(overlay)
+        ref = weakref.ref(overlay, lambda r, k=key: self._dead.append((k, r)))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is overlay:
+                return entry[1]
+            self._entries[key] = (ref, index)
+        return index
+
+    def _purge(self) -> None:
+        while self._dead:
+            key, ref = self._dead.pop()
+            entry = self._entries.get(key)
+            # id 可能已被新的图层复用，只删除对应已回收图层的条目
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dead.clear()
+
+
+# 全局共享的置顶图层索引缓存
+overlay_indices = OverlayIndexCache()
+
+
+def get_overlay_index(overlay: Image.Image) -> OverlayIndex:
+    """从全局缓存取置顶图层的索引"""
+    return overlay_indices.get(overlay)
+
+
+class Layers:
+    """一次渲染用到的图层：底图、置顶图层（可能为 None）以及两者的静态合成图，均为只读"""
+
+    def __init__(self, base: Image.Image, overlay: Optional[Image.Image], static: Image.Image,
+                 static_cached: bool = False):
+        self.base = base
+        self.overlay = overlay
+        self.static = static
+        # 静态合成图是否来自资源缓存（长期存在且不会被修改）
+        self.static_cached = static_cached
+        self.overlay_index = get_overlay_index(overlay) if overlay is not None else None
+
+    @property
+    def reusable_static(self) -> Optional[Image.Image]:
+        """
+        可供 PNG 增量编码复用静态行的静态图（见 png_encoder）；
+        由调用方传入的图像可能被修改，每次合成的副本也不会再次出现，这两种情况返回 None。
+        """
+        return self.static if self.static_cached else None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.base.size
+
+
+def resolve_layers(
+    image_source: Union[str, Image.Image],
+    image_overlay: Union[str, Image.Image, None],
+    assets: Optional[AssetCache] = None,
+) -> Layers:
+    """
+    解析底图与置顶图层；路径来源走资源缓存（assets，默认为全局缓存），静态合成图也会被缓存。
+    置顶图层路径不存在时打印警告并忽略。
+    """
+    if assets is None:
+        assets = asset_cache
+    if isinstance(image_source, Image.Image):
+        base = image_source
+    else:
+        base = assets.get(image_source)
+
+    overlay = None
+    if image_overlay is not None:
+        if isinstance(image_overlay, Image.Image):
+            overlay = image_overlay
+        else:
+            overlay = assets.get_optional(image_overlay)
+            if overlay is None:
+                print("Warning: overlay image is not exist.")
+
+    cached = isinstance(image_source, str)
+    if overlay is None:
+        static = base
+    elif cached and isinstance(image_overlay, str):
+        static = assets.get_composite(image_source, image_overlay)
+    else:
+        static = base.copy()
+        get_overlay_index(overlay).composite(static, overlay, (0, 0) + static.size)
+        cached = False
+    return Layers(base, overlay, static, cached)
+
+
+def clamp_rect(rect: Rect, size: Tuple[int, int]) -> Rect:
+    """将矩形裁剪到画布范围内"""
+    w, h = size
+    l, t, r, b = rect
+    l, t = max(0, min(w, l)), max(0, min(h, t))
+    r, b = max(l, min(w, r)), max(t, min(h, b))
+    return l, t, r, b
+
+
+def union_rect(a: Rect, b: Rect) -> Rect:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def render_region(layers: Layers, rect: Rect, render: Callable[[Image.Image, int, int], None]) -> Image.Image:
+    """
+    只在 rect 内渲染内容，返回完整的新画布。
+    render(crop, ox, oy) 在底图裁剪出的 crop 上绘制，画布坐标 (x, y) 对应 crop 上的 (x - ox, y - oy)。
+    rect 必须覆盖所有可能被绘制的像素。
+    """
+    if layers.base.mode == "P":
+        # 调色板图像绘制时可能新增调色板颜色，裁剪图的调色板无法贴回，退回整张画布绘制
+        img = layers.base.copy()
+        render(img, 0, 0)
+        if layers.overlay is not None:
+            img.paste(layers.overlay, (0, 0), layers.overlay)
+        return img
+
+    rect = clamp_rect(rect, layers.size)
+    ox, oy = rect[0], rect[1]
+    crop = layers.base.crop(rect)
+    if crop.width and crop.height:
+        render(crop, ox, oy)
+        if layers.overlay_index is not None:
+            layers.overlay_index.composite(crop, layers.overlay, rect)
+
+    out = layers.static.copy()
+    out.paste(crop, (ox, oy))
+    return out
@@ -93,4 +93,70 @@ AUTO_PASTE_IMAGE= True
 
 # 生成图片后是否自动发送(模拟回车键输入), 只有开启自动黏贴才生效
 # 此值为布尔值, True 或 False
-AUTO_SEND_IMAGE= False
\ No newline at end of file
+AUTO_SEND_IMAGE= False
+
+# 已解码底图/置顶图层缓存的内存上限, 超出后按最久未使用淘汰
+# 此值为数字, 单位为 MB
+ASSET_CACHE_MAX_MB= 64
+
+# 生成图片的编码方案, 在编码速度和图片体积之间取舍
+#   "default": PNG, 默认压缩等级
+#   "fast": PNG, 最低压缩等级, 编码最快但图片较大
+#   "small": PNG, 开启 optimize, 图片最小但编码较慢
+#   "lossless-webp": 无损 WebP, 体积比 PNG 小约三成; 剪贴板只接受 PNG, 热键模式下会退回 "default"
+# 此值为字符串
+OUTPUT_ENCODER= "default"
+
+# "small" 方案是否先量化为 8 位调色板(最多 256 色), 图片更小但颜色可能有细微损失
+# 此值为布尔值, True 或 False
+SMALL_ENCODER_QUANTIZE= False
+
+# 启动时是否在后台线程中预热(解码底图、加载字体、试渲染一次), 关闭则预热完成后才开始监听热键
+# 此值为布尔值, True 或 False
+WARM_UP_IN_BACKGROUND= True
+
+# 是否在后台渲染, 开启后热键只负责获取文字/图片并排队, 渲染和黏贴在后台按触发顺序完成
+# 此值为布尔值, True 或 False
+RENDER_IN_BACKGROUND= True
+
+# 后台渲染队列的最大长度, 队列满时新的触发会等待
+# 此值为正整数
+RENDER_QUEUE_SIZE= 8
+
+# 图片模式使用的渲染进程数, 大图缩放较耗 CPU 时可以开启; 0 表示在渲染线程中直接处理
+# 此值为非负整数
+IMAGE_RENDER_PROCESSES= 0
+
+# 剪切后等待剪贴板出现内容的最长时间, 内容一出现就会立即继续
+# 程序会按前台应用记录实际延迟并自动调整等待时间, 没有记录的应用最多等待 DELAY, 放宽后也不会超过此值
+# 此值为数字, 单位为秒
+CLIPBOARD_TIMEOUT= 1.0
+
+# 图片模式的缩放质量档位, 大图会先按整数倍快速缩小再精细缩放
+#   "exact": 直接用 LANCZOS 缩放整张原图, 与旧版完全一致, 大图较慢
+#   "balanced": 先缩小到目标尺寸的约 3 倍再用 LANCZOS, 画质与 exact 看不出差别
+#   "fast": 尽量缩小后用双线性插值, 最快, 画质略软
+# 此值为字符串
+IMAGE_RESAMPLE_QUALITY= "balanced"
+
+# 是否记录各阶段耗时(剪切、排版、绘制、编码、写剪贴板、黏贴等), 开启后每次触发会输出一行耗时汇总
+# 此值为布尔值, True 或 False
+STAGE_TIMING= False
+
+# 开启耗时记录时, 每次触发后把各阶段的耗时直方图写入此文件; 以 .prom 结尾时为 Prometheus 文本格式, 否则为 JSON
+# 此值为字符串, 代表相对main的相对路径; 留空则不写入
+STAGE_TIMING_FILE= ""
+
+# 性能剖析热键, 按下后接下来的 PROFILE_TRIGGERS 次触发会在 cProfile 下运行, 结果保存到 PROFILE_DIR
+# 每次触发保存 .prof(cProfile 结果)、.collapsed.txt(折叠调用栈, 可生成火焰图)和 .report.txt(排版/绘制中最耗时的函数)
+# 也可以在启动前设置环境变量 SKETCHBOOK_PROFILE=次数 来剖析启动后的前几次触发
+# 此值为字符串; 留空则不启用
+PROFILE_HOTKEY= ""
+
+# 每按一次剖析热键所剖析的触发次数
+# 此值为正整数
+PROFILE_TRIGGERS= 1
+
+# 剖析结果的保存目录
+# 此值为字符串, 代表相对main的相对路径
+PROFILE_DIR= "profiles"
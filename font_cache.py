@@ -0,0 +1,107 @@
+# filename: font_cache.py
+"""
+FreeType 字体对象缓存
+
+字号搜索时每个候选字号都要 ImageFont.truetype 一次，会反复打开并解析字体文件，
+这里按 (字体路径, 字号) 缓存字体对象，条目数超出上限时淘汰最久未使用的。
+每个字体对象的宽度表（见 text_measure）也保存在这里，字体被淘汰后宽度表随之释放。
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+from PIL import ImageFont
+from text_measure import AdvanceTable
+
+FontType = Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]
+
+# 默认最多缓存的字体对象个数
+DEFAULT_MAX_ENTRIES = 128
+
+# 找不到指定字体时依次尝试的后备字体
+FALLBACK_FONT = "DejaVuSans.ttf"
+
+
+class FontCache:
+    """按 (路径, 字号) 缓存字体对象，带 LRU 淘汰与命中统计"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Optional[str], int], FontType]" = OrderedDict()
+        self._lock = threading.Lock()
+        # id(缓存中的字体对象) -> {字形模式: 宽度表}，与 _entries 中的条目同时加入、同时删除。
+        # 宽度表持有字体对象，不能用以字体为键的弱引用字典保存（值引用键，字体永远不会被回收）
+        self._tables: Dict[int, Dict[str, AdvanceTable]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, font_path: Optional[str], size: int) -> FontType:
+        """
+        返回指定字号的字体；font_path 不存在时依次回退到 DejaVuSans 和 Pillow 默认字体。
+        """
+        path = font_path if font_path and os.path.exists(font_path) else None
+        key = (path, size)
+        with self._lock:
+            font = self._entries.get(key)
+            if font is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return font
+
+        font = self._load(path, size)
+
+        with self._lock:
+            self.misses += 1
+            cached = self._entries.get(key)
+            if cached is not None:
+                # 其他线程同时加载了同一字体，以先写入的为准
+                self._entries.move_to_end(key)
+                return cached
+            self._entries[key] = font
+            self._tables[id(font)] = {}
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._tables.pop(id(evicted), None)
+        return font
+
+    def advance_table(self, font: FontType, mode: str = "L") -> AdvanceTable:
+        """
+        取字体对象在指定字形模式下的宽度表，字体对象由本缓存复用，因此表也会跨渲染复用。
+        不在缓存中（已被淘汰或来自别处）的字体返回不保存的新表。
+        """
+        with self._lock:
+            per_font = self._tables.get(id(font))
+            if per_font is None:
+                return AdvanceTable(font, mode)
+            table = per_font.get(mode)
+            if table is None:
+                table = per_font[mode] = AdvanceTable(font, mode)
+            return table
+
+    @staticmethod
+    def _load(path: Optional[str], size: int) -> FontType:
+        if path:
+            return ImageFont.truetype(path, size=size)
+        try:
+            return ImageFont.truetype(FALLBACK_FONT, size=size)
+        except Exception:
+            return ImageFont.load_default()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局共享的字体缓存
+font_cache = FontCache()
+
+
+def load_font(font_path: Optional[str], size: int) -> FontType:
+    """从全局缓存获取字体"""
+    return font_cache.get(font_path, size)
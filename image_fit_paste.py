@@ -1,13 +1,49 @@
 # filename: image_fit_paste.py
-from io import BytesIO
-from typing import Tuple, Literal, Union
+from typing import Dict, Optional, Tuple, Literal, Union
 from PIL import Image
-import os
+from asset_cache import AssetCache
+from compositing import render_region, resolve_layers, union_rect
+from output_encoder import RenderedImage, encode_rendered
+from stage_timer import span
 
 Align = Literal["left", "center", "right"]
 VAlign = Literal["top", "middle", "bottom"]
 
-def paste_image_auto(
+# 缩放质量档位 -> (预缩小后至少保留的目标尺寸倍数, 最后一步的滤波器)
+# 大图先按整数倍缩小（JPEG 在解码时由 draft 完成，其余用 reduce 的盒式平均），
+# 再用滤波器缩放到目标尺寸；倍数为 None 表示不预缩小，与原来的单次 LANCZOS 逐像素一致。
+RESAMPLE_TIERS: Dict[str, Tuple[Optional[float], int]] = {
+    "exact": (None, Image.LANCZOS),
+    "balanced": (3.0, Image.LANCZOS),
+    "fast": (1.0, Image.BILINEAR),
+}
+
+# reduce 能按通道正确求平均的模式；其他模式不预缩小
+_REDUCE_MODES = frozenset({"L", "LA", "La", "RGB", "RGBA", "RGBa", "RGBX", "CMYK", "YCbCr", "I", "F"})
+
+
+def resize_contained(img: Image.Image, size: Tuple[int, int], quality: str = "balanced") -> Image.Image:
+    """
+    按质量档位把 img 缩放到 size。
+    img 为尚未解码的 JPEG（Image.open 的结果）时会先调用 draft 以缩小后的尺寸解码，img 本身会被修改。
+    """
+    if quality not in RESAMPLE_TIERS:
+        raise ValueError(f"未知的缩放质量档位: {quality}")
+    gap, resample = RESAMPLE_TIERS[quality]
+    if gap is None or img.mode not in _REDUCE_MODES:
+        # 调色板、1 位、16 位等模式 reduce 不支持或会对调色板索引求平均，按原来的单次缩放处理
+        return img.resize(size, resample)
+    w, h = size
+    if img.width > w and img.height > h:
+        # 只有 JPEG 支持 draft，其他格式或已解码的图片不受影响
+        img.draft(img.mode, (int(w * gap), int(h * gap)))
+    # 不使用 resize 的 reducing_gap 参数：RGBA/LA 图片的 resize 会忽略它
+    factor = (int(img.width / w / gap), int(img.height / h / gap))
+    if factor[0] > 1 or factor[1] > 1:
+        img = img.reduce((max(1, factor[0]), max(1, factor[1])))
+    return img.resize(size, resample)
+
+def render_image_auto(
     image_source: Union[str, Image.Image],
     top_left: Tuple[int, int],
     bottom_right: Tuple[int, int],
@@ -18,7 +54,9 @@ def paste_image_auto(
     allow_upscale: bool = False,
     keep_alpha: bool = True,
     image_overlay: Union[str, Image.Image,None]=None,
-) -> bytes:
+    resample_quality: str = "balanced",
+    assets: Optional[AssetCache] = None,
+) -> RenderedImage:
     """
     在指定矩形内放置一张图片（content_image），按比例缩放至“最大但不超过”该矩形。
     - base_image: 底图（会被复制，原图不改）
@@ -28,22 +66,16 @@ def paste_image_auto(
     - padding: 矩形内边距（像素），四边统一
     - allow_upscale: 是否允许放大（默认只缩小不放大）
     - keep_alpha: True 时保留透明通道并用其作为粘贴蒙版
+    - resample_quality: 缩放质量档位（见 RESAMPLE_TIERS），"exact" 与原来的单次 LANCZOS 一致
+    - assets: 底图与置顶图层的资源缓存，默认为全局缓存
 
-    返回：最终 PNG 的 bytes。
+    返回：未编码的渲染结果，由调用方选择输出格式（见 output_encoder）。
     """
     if not isinstance(content_image, Image.Image):
         raise TypeError("content_image 必须为 PIL.Image.Image")
 
-    if isinstance(image_source, Image.Image):
-        img = image_source.copy()
-    else:
-        img = Image.open(image_source).convert("RGBA")
-
-    if image_overlay is not None:
-        if isinstance(image_overlay, Image.Image):
-            img_overlay = image_overlay.copy()
-        else:
-            img_overlay = Image.open(image_overlay).convert("RGBA") if os.path.isfile(image_overlay) else None
+    with span("layers"):
+        layers = resolve_layers(image_source, image_overlay, assets)
 
     x1, y1 = top_left
     x2, y2 = bottom_right
@@ -70,8 +102,9 @@ def paste_image_auto(
     new_w = max(1, int(round(cw * scale)))
     new_h = max(1, int(round(ch * scale)))
 
-    # 选择高质量插值
-    resized = content_image.resize((new_w, new_h), Image.LANCZOS)
+    # 大图先按整数倍快速缩小，再用高质量插值缩放到目标尺寸
+    with span("resize"):
+        resized = resize_contained(content_image, (new_w, new_h), resample_quality)
 
     # 计算粘贴坐标（考虑对齐与 padding）
     if align == "left":
@@ -88,20 +121,53 @@ def paste_image_auto(
     else:  # "bottom"
         py = y2 - padding - new_h
 
-    # 处理透明度：若 keep_alpha=True 且有 alpha，则用 alpha 作为 mask 粘贴
-    if keep_alpha and ("A" in resized.getbands()):
-        img.paste(resized, (px, py), resized)
-    else:
-        # 没有 alpha 就直接粘贴（会覆盖底图该区域）
-        img.paste(resized, (px, py))
-
-    # 覆盖置顶图层（如果有）
-    if image_overlay is not None and img_overlay is not None:
-        img.paste(img_overlay, (0, 0), img_overlay)
-    elif image_overlay is not None and img_overlay is None:
-        print("Warning: overlay image is not exist.")
-
-    # 输出 PNG bytes
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    # 只在文字框与粘贴区域的并集内合成
+    rect = union_rect((x1, y1, x2, y2), (px, py, px + new_w, py + new_h))
+
+    def render(crop: Image.Image, ox: int, oy: int) -> None:
+        # 处理透明度：若 keep_alpha=True 且有 alpha，则用 alpha 作为 mask 粘贴
+        if keep_alpha and ("A" in resized.getbands()):
+            crop.paste(resized, (px - ox, py - oy), resized)
+        else:
+            # 没有 alpha 就直接粘贴（会覆盖底图该区域）
+            crop.paste(resized, (px - ox, py - oy))
+
+    with span("draw"):
+        img = render_region(layers, rect, render)
+
+    # 变化区域以上的行与静态图相同，静态图来自资源缓存时 PNG 编码可复用其压缩结果
+    return RenderedImage(img, layers.reusable_static, rect[1])
+
+
+def paste_image_auto(
+    image_source: Union[str, Image.Image],
+    top_left: Tuple[int, int],
+    bottom_right: Tuple[int, int],
+    content_image: Image.Image,
+    align: Align = "center",
+    valign: VAlign = "middle",
+    padding: int = 0,
+    allow_upscale: bool = False,
+    keep_alpha: bool = True,
+    image_overlay: Union[str, Image.Image,None]=None,
+    encoder: str = "default",
+    resample_quality: str = "balanced",
+) -> bytes:
+    """
+    在指定矩形内放置一张图片（content_image），按比例缩放至“最大但不超过”该矩形。
+    - base_image: 底图（会被复制，原图不改）
+    - top_left / bottom_right: 指定矩形区域（左上/右下坐标）
+    - content_image: 待放入的图片（PIL.Image.Image）
+    - align / valign: 水平/垂直对齐方式
+    - padding: 矩形内边距（像素），四边统一
+    - allow_upscale: 是否允许放大（默认只缩小不放大）
+    - keep_alpha: True 时保留透明通道并用其作为粘贴蒙版
+    - encoder: 输出编码方案（见 output_encoder）
+    - resample_quality: 缩放质量档位（见 RESAMPLE_TIERS），"exact" 与原来的单次 LANCZOS 一致
+
+    返回：编码后的图片 bytes（默认为 PNG）。
+    """
+    rendered = render_image_auto(image_source, top_left, bottom_right, content_image, align, valign, padding,
+                                 allow_upscale, keep_alpha, image_overlay, resample_quality)
+    # 编码输出，PNG 方案下静态行（变化区域以上）的压缩结果会被缓存复用
+    return encode_rendered(rendered, encoder)
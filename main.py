@@ -1,42 +1,88 @@
-import pyperclip
+import itertools
 import platform
+import threading
 import time  # 添加time模块导入
 
-# 导入操作系统适配器
-from os_adapters import os_adapter
-
 # 导入配置和功能模块
 from config import DELAY, BASEIMAGE_MAPPING, FONT_FILE, BASEIMAGE_FILE, AUTO_SEND_IMAGE, AUTO_PASTE_IMAGE, BLOCK_HOTKEY, HOTKEY, \
     SEND_HOTKEY, PASTE_HOTKEY, CUT_HOTKEY, SELECT_ALL_HOTKEY, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, \
-    BASE_OVERLAY_FILE, USE_BASE_OVERLAY
-from text_fit_draw import draw_text_auto
-from image_fit_paste import paste_image_auto
+    BASE_OVERLAY_FILE, USE_BASE_OVERLAY, ASSET_CACHE_MAX_MB, OUTPUT_ENCODER, SMALL_ENCODER_QUANTIZE, \
+    WARM_UP_IN_BACKGROUND, RENDER_IN_BACKGROUND, RENDER_QUEUE_SIZE, IMAGE_RENDER_PROCESSES, \
+    CLIPBOARD_TIMEOUT, IMAGE_RESAMPLE_QUALITY, STAGE_TIMING, STAGE_TIMING_FILE, PROFILE_HOTKEY, PROFILE_TRIGGERS, \
+    PROFILE_DIR
+from render_pipeline import RenderJob, RenderPipeline, init_render_process, run_render_job
+from asset_cache import asset_cache
+from warmup import start_warm_up
+from clipboard_wait import AdaptiveClipboardWait
+import output_encoder
+import spawn_audit
+import stage_timer
+from trigger_profiler import profiler
 current_image_file = BASEIMAGE_FILE
 
-# 检测当前操作系统
-current_os = platform.system()
+# 操作系统适配器，由 setup() 创建
+os_adapter = None
 
-# macOS特定的热键适配
-if current_os == 'Darwin':
-    # 在macOS上将热键中的ctrl替换为cmd，将alt替换为opt
-    HOTKEY = os_adapter.adapt_hotkey_for_macos(HOTKEY)
-    SELECT_ALL_HOTKEY = os_adapter.adapt_hotkey_for_macos(SELECT_ALL_HOTKEY)
-    CUT_HOTKEY = os_adapter.adapt_hotkey_for_macos(CUT_HOTKEY)
-    PASTE_HOTKEY = os_adapter.adapt_hotkey_for_macos(PASTE_HOTKEY)
-    SEND_HOTKEY = os_adapter.adapt_hotkey_for_macos(SEND_HOTKEY)
-# Linux特定的热键适配
-elif current_os == 'Linux':
-    # 在Linux上保持热键不变或进行必要的适配
-    HOTKEY = os_adapter.adapt_hotkey_for_linux(HOTKEY)
-    SELECT_ALL_HOTKEY = os_adapter.adapt_hotkey_for_linux(SELECT_ALL_HOTKEY)
-    CUT_HOTKEY = os_adapter.adapt_hotkey_for_linux(CUT_HOTKEY)
-    PASTE_HOTKEY = os_adapter.adapt_hotkey_for_linux(PASTE_HOTKEY)
-    SEND_HOTKEY = os_adapter.adapt_hotkey_for_linux(SEND_HOTKEY)
+# 剪切后等待剪贴板变化：没有记录时最多等待 DELAY，按前台应用的实际延迟自动放宽，但不超过 CLIPBOARD_TIMEOUT
+clipboard_waiter = AdaptiveClipboardWait(min_timeout=DELAY, max_timeout=CLIPBOARD_TIMEOUT)
 
 
-# 使用操作系统适配器进行剪贴板操作
-def copy_png_bytes_to_clipboard(png_bytes: bytes):
-    os_adapter.copy_png_bytes_to_clipboard(png_bytes)
+def setup(adapter=None):
+    """
+    创建操作系统适配器并应用各项设置（资源缓存、编码方案、计时、剖析、热键适配）。
+    导入本模块不能有副作用：渲染进程池以 spawn 方式启动子进程时（Windows/macOS）子进程会重新导入 main.py，
+    因此这些初始化只在主程序入口（或测试工具）中调用。
+    """
+    global os_adapter, OUTPUT_ENCODER, HOTKEY, SELECT_ALL_HOTKEY, CUT_HOTKEY, PASTE_HOTKEY, SEND_HOTKEY, \
+        PROFILE_HOTKEY
+
+    # 导入 os_adapters 时即会创建当前系统的适配器
+    if adapter is None:
+        from os_adapters import os_adapter as adapter
+    os_adapter = adapter
+
+    asset_cache.max_bytes = ASSET_CACHE_MAX_MB * 1024 * 1024
+
+    # 剪贴板只接受 PNG，非 PNG 的编码方案退回默认方案
+    output_encoder.small_quantize = SMALL_ENCODER_QUANTIZE
+    if output_encoder.ENCODER_FORMATS.get(OUTPUT_ENCODER) != "PNG":
+        print(f"编码方案 {OUTPUT_ENCODER} 不输出 PNG，剪贴板无法使用，改用 default")
+        OUTPUT_ENCODER = "default"
+
+    # 分阶段计时，开启后每次触发输出一行耗时汇总
+    stage_timer.enabled = STAGE_TIMING
+    stage_timer.dump_path = STAGE_TIMING_FILE or None
+
+    # 按需剖析：环境变量 SKETCHBOOK_PROFILE=N 或按下 PROFILE_HOTKEY 后，接下来的触发会保存 cProfile 结果
+    profiler.output_dir = PROFILE_DIR
+    profiler.arm_from_env()
+
+    # 检测当前操作系统
+    current_os = platform.system()
+
+    # macOS特定的热键适配
+    if current_os == 'Darwin':
+        # 在macOS上将热键中的ctrl替换为cmd，将alt替换为opt
+        HOTKEY = os_adapter.adapt_hotkey_for_macos(HOTKEY)
+        SELECT_ALL_HOTKEY = os_adapter.adapt_hotkey_for_macos(SELECT_ALL_HOTKEY)
+        CUT_HOTKEY = os_adapter.adapt_hotkey_for_macos(CUT_HOTKEY)
+        PASTE_HOTKEY = os_adapter.adapt_hotkey_for_macos(PASTE_HOTKEY)
+        SEND_HOTKEY = os_adapter.adapt_hotkey_for_macos(SEND_HOTKEY)
+        PROFILE_HOTKEY = os_adapter.adapt_hotkey_for_macos(PROFILE_HOTKEY) if PROFILE_HOTKEY else PROFILE_HOTKEY
+    # Linux特定的热键适配
+    elif current_os == 'Linux':
+        # 在Linux上保持热键不变或进行必要的适配
+        HOTKEY = os_adapter.adapt_hotkey_for_linux(HOTKEY)
+        SELECT_ALL_HOTKEY = os_adapter.adapt_hotkey_for_linux(SELECT_ALL_HOTKEY)
+        CUT_HOTKEY = os_adapter.adapt_hotkey_for_linux(CUT_HOTKEY)
+        PASTE_HOTKEY = os_adapter.adapt_hotkey_for_linux(PASTE_HOTKEY)
+        SEND_HOTKEY = os_adapter.adapt_hotkey_for_linux(SEND_HOTKEY)
+        PROFILE_HOTKEY = os_adapter.adapt_hotkey_for_linux(PROFILE_HOTKEY) if PROFILE_HOTKEY else PROFILE_HOTKEY
+
+
+# 使用操作系统适配器把渲染结果以其偏好的格式写入剪贴板
+def copy_image_to_clipboard(payload):
+    os_adapter.copy_image_to_clipboard(payload)
 
 
 # 使用操作系统适配器进行键盘事件模拟
@@ -56,7 +102,7 @@ def cut_all_and_get_text() -> str:
     """
     # 备份原剪贴板
     try:
-        old_clip = pyperclip.paste()
+        old_clip = os_adapter.get_clipboard_text()
     except UnicodeDecodeError:
         # 原剪贴板包含二进制数据，无法解码
         old_clip = None
@@ -66,7 +112,7 @@ def cut_all_and_get_text() -> str:
 
     # 清空剪贴板，防止读到旧数据
     try:
-        pyperclip.copy("")
+        os_adapter.set_clipboard_text("")
     except Exception:
         pass
 
@@ -74,11 +120,31 @@ def cut_all_and_get_text() -> str:
         # 发送全选和剪切快捷键（使用跨平台函数）
         send_keystroke(SELECT_ALL_HOTKEY)
         send_keystroke(CUT_HOTKEY)
-        time.sleep(DELAY)  # 确保剪切操作完成
 
-        # 获取剪切后的内容，增加异常处理
+        # 轮询剪贴板，剪切的内容一出现就继续，不再固定等待 DELAY
+        def read_clip():
+            try:
+                return os_adapter.get_clipboard_text()
+            except Exception:
+                return ""
+
+        # 剪切前已清空剪贴板，此时出现的图片就是剪切的结果；剪切出图片或输入框为空时不会再出现文字，立即停止等待
+        def cut_done():
+            try:
+                return os_adapter.cut_was_empty() or os_adapter.clipboard_has_image()
+            except Exception:
+                return False
+
+        with stage_timer.span("cut_wait"):
+            new_clip, waited = clipboard_waiter.wait_for_change(read_clip, "", os_adapter.get_foreground_app(),
+                                                                cut_done)
+        if new_clip != "":
+            print(f"剪切完成，等待 {waited * 1000:.0f} ms")
+            return new_clip
+
+        # 超时仍未读到内容，再读一次并报告具体原因，增加异常处理
         try:
-            new_clip = pyperclip.paste()
+            new_clip = os_adapter.get_clipboard_text()
         except UnicodeDecodeError:
             # 如果发生UTF-8解码错误，说明剪贴板可能包含二进制数据
             print("剪贴板包含无法解码的二进制数据")
@@ -95,102 +161,190 @@ def cut_all_and_get_text() -> str:
     finally:
         # 恢复原剪贴板内容（可选，根据需求决定是否需要恢复）
         # 注意：如果注释掉下面这行，剪切后的内容将保留在剪贴板中
-        if old_clip is not None:
+        # 原剪贴板没有文字时不恢复；剪切出的是图片时也不恢复，否则写回文字会清掉刚剪切出来的图片。
+        # 后台渲染时上一次触发可能还没投递，old_clip 往往是上一次剪切出的文字，这种情况很常见
+        if old_clip:
             try:
-                pyperclip.copy(old_clip)
+                if not os_adapter.clipboard_has_image():
+                    os_adapter.set_clipboard_text(old_clip)
             except Exception:
                 pass
         # 移除无效的pass语句
 
 
-# 主要处理逻辑
-def Start():
+# 获取输入并生成渲染任务
+def capture_job():
+    """
+    剪切文本/读取剪贴板图片，返回 RenderJob；没有内容时返回 None。
+    关键词切换差分也在这里完成，保证按触发顺序生效。
+    """
     global current_image_file#保存上次使用差分
 
-    print("Start generate...")
-    
     # 先尝试获取文本（剪切操作）
     text = ""
     try:
-        text = cut_all_and_get_text()
+        with stage_timer.span("cut"):
+            text = cut_all_and_get_text()
     except Exception as e:
         print(f"获取文本时出错: {e}")
         text = ""
-    
+
     # 然后尝试获取图像
-    image = try_get_image()
+    with stage_timer.span("clipboard_image"):
+        image = try_get_image()
 
     if text == "" and image is None:
         print("no text or image")
-        return
-
-    png_bytes = None
+        return None
 
     if image is not None:
         print("Get image")
-
+        return RenderJob("image", dict(
+            image_source=current_image_file,
+            image_overlay=BASE_OVERLAY_FILE if USE_BASE_OVERLAY else None,
+            top_left=TEXT_BOX_TOPLEFT,
+            bottom_right=IMAGE_BOX_BOTTOMRIGHT,
+            content_image=image,
+            align="center",
+            valign="middle",
+            padding=12,
+            allow_upscale=True,
+            keep_alpha=True,  # 使用内容图 alpha 作为蒙版
+            encoder=OUTPUT_ENCODER,
+            resample_quality=IMAGE_RESAMPLE_QUALITY,
+        ), os_adapter.clipboard_image_formats)
+
+    print("Get text: " + text)
+
+    # 查找发送内容是否包含更换差分指令#差分名#，如果有则更换差分并移除关键字
+    for keyword, img_file in BASEIMAGE_MAPPING.items():
+        if keyword in text:
+            current_image_file = img_file
+            text = text.replace(keyword, "").strip()
+            print(f"检测到关键词 '{keyword}'，使用底图: {current_image_file}")
+            break
+    return RenderJob("text", dict(
+        image_source=current_image_file,
+        image_overlay=BASE_OVERLAY_FILE if USE_BASE_OVERLAY else None,
+        top_left=TEXT_BOX_TOPLEFT,
+        bottom_right=IMAGE_BOX_BOTTOMRIGHT,
+        text=text,
+        color=(0, 0, 0),
+        max_font_height=64,  # 例如限制最大字号高度为 64 像素
+        font_path=FONT_FILE,
+        encoder=OUTPUT_ENCODER,
+    ), os_adapter.clipboard_image_formats)
+
+
+# 将渲染结果写入剪贴板并自动黏贴
+def deliver_result(job, payload, error=None):
+    with stage_timer.activate(job.trace):
         try:
-            png_bytes = paste_image_auto(
-                image_source=current_image_file,
-                image_overlay=BASE_OVERLAY_FILE if USE_BASE_OVERLAY else None,
-                top_left=TEXT_BOX_TOPLEFT,
-                bottom_right=IMAGE_BOX_BOTTOMRIGHT,
-                content_image=image,
-                align="center",
-                valign="middle",
-                padding=12,
-                allow_upscale=True,
-                keep_alpha=True,  # 使用内容图 alpha 作为蒙版
-            )
-        except Exception as e:
-            print("Generate image failed:", e)
-            return
-
-    elif text != "":
-        print("Get text: " + text)
-
-        # 查找发送内容是否包含更换差分指令#差分名#，如果有则更换差分并移除关键字
-        for keyword, img_file in BASEIMAGE_MAPPING.items():
-            if keyword in text:
-                current_image_file = img_file
-                text = text.replace(keyword, "").strip()
-                print(f"检测到关键词 '{keyword}'，使用底图: {current_image_file}")
-                break
-        try:
-            png_bytes = draw_text_auto(
-                image_source=current_image_file,
-                image_overlay=BASE_OVERLAY_FILE if USE_BASE_OVERLAY else None,
-                top_left=TEXT_BOX_TOPLEFT,
-                bottom_right=IMAGE_BOX_BOTTOMRIGHT,
-                text=text,
-                color=(0, 0, 0),
-                max_font_height=64,  # 例如限制最大字号高度为 64 像素
-                font_path=FONT_FILE,
-            )
-        except Exception as e:
-            print("Generate image failed:", e)
-            return
+            _deliver_result(job, payload, error)
+        finally:
+            # 本次触发结束，输出各阶段耗时
+            stage_timer.finish(job.trace)
 
-    if png_bytes is None:
+
+def _deliver_result(job, payload, error):
+    if error is not None:
+        print("Generate image failed:", error)
+        return
+    if payload is None:
         print("Generate image failed!")
         return
 
-    copy_png_bytes_to_clipboard(png_bytes)
+    # 编码方案、耗时与大小随结果一起返回，后台线程或进程池中编码时也对应本次触发
+    print(f"编码 {payload.summary()}")
 
-    if AUTO_PASTE_IMAGE:
-        send_keystroke(PASTE_HOTKEY)  # 使用跨平台函数
+    # 与获取输入互斥，避免写剪贴板/模拟黏贴和下一次剪切交错
+    with ui_lock, spawn_audit.track(job.trigger) as counts:
+        with stage_timer.span("clipboard_write"):
+            copy_image_to_clipboard(payload)
 
-        time.sleep(DELAY)
+        if AUTO_PASTE_IMAGE:
+            with stage_timer.span("paste_keystroke"):
+                send_keystroke(PASTE_HOTKEY)  # 使用跨平台函数
 
-        if AUTO_SEND_IMAGE:
-            send_keystroke(SEND_HOTKEY)  # 使用跨平台函数
+            if AUTO_SEND_IMAGE:
+                # 黏贴是否完成无法从剪贴板观察到，发送前仍需等待 DELAY
+                with stage_timer.span("send_delay"):
+                    time.sleep(DELAY)
+                with stage_timer.span("send_keystroke"):
+                    send_keystroke(SEND_HOTKEY)  # 使用跨平台函数
+    print(f"投递结果: {counts}")
 
     print("Generate image successed!")
 
 
+# 键盘模拟与剪贴板读写的互斥锁（获取输入和投递结果可能在不同线程）
+ui_lock = threading.RLock()
+
+# 后台渲染流水线，在主程序入口中启动
+render_pipeline = None
+
+# 触发编号，用于按触发统计子进程创建
+_trigger_ids = itertools.count(1)
+
+
+# 主要处理逻辑
+def Start():
+    if profiler.pending():
+        # 剖析的触发在当前线程中同步完成（先等之前的任务投递完），cProfile 才能看到渲染与投递
+        if render_pipeline is not None:
+            render_pipeline.wait_idle()
+        with profiler.capture():
+            _start(synchronous=True)
+        return
+    _start(synchronous=render_pipeline is None)
+
+
+def _start(synchronous):
+    print("Start generate...")
+
+    trace = stage_timer.new_trace()
+    trigger = next(_trigger_ids)
+
+    # 统计获取输入时创建的子进程与临时文件（包括转交给 GUI 线程执行的剪贴板操作），剪贴板在进程内访问时应为 0
+    with stage_timer.activate(trace), ui_lock, spawn_audit.track(trigger) as counts:
+        with stage_timer.span("capture"):
+            job = capture_job()
+    print(f"获取输入: {counts}")
+    if job is None:
+        stage_timer.finish(trace)
+        return
+    job = job._replace(trace=trace, trigger=trigger)
+
+    if not synchronous:
+        # 热键回调只负责获取输入，渲染与黏贴在后台完成
+        render_pipeline.submit(job)
+        return
+
+    try:
+        payload = run_render_job(job)
+    except Exception as e:
+        deliver_result(job, None, e)
+        return
+    deliver_result(job, payload)
+
+
 # 主程序入口
 if __name__ == "__main__":
     try:
+        setup()
+
+        # 预先解码底图、加载字体并完成一次渲染，热键触发时只需要合成
+        start_warm_up(os_adapter, OUTPUT_ENCODER, background=WARM_UP_IN_BACKGROUND)
+
+        if RENDER_IN_BACKGROUND:
+            # 渲染子进程不执行 setup()，需要的设置通过初始化函数传入
+            render_pipeline = RenderPipeline(deliver_result, RENDER_QUEUE_SIZE, IMAGE_RENDER_PROCESSES,
+                                             initializer=init_render_process,
+                                             initargs=(asset_cache.max_bytes, SMALL_ENCODER_QUANTIZE)).start()
+
+        if PROFILE_HOTKEY:
+            os_adapter.add_hotkey(PROFILE_HOTKEY, lambda: profiler.arm(PROFILE_TRIGGERS))
+
         # 使用操作系统适配器启动热键监听
         os_adapter.start_hotkey_listener(HOTKEY, Start, BLOCK_HOTKEY or HOTKEY == SEND_HOTKEY)
     except Exception as e:
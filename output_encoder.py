@@ -0,0 +1,172 @@
+# filename: output_encoder.py
+"""
+输出编码阶段
+
+渲染结果按配置的编码方案输出为字节串，各方案在速度与体积之间取舍：
+  default        PNG，默认压缩等级，静态行压缩结果复用（见 png_encoder）
+  fast           PNG，最低压缩等级，同样复用静态行
+  small          PNG，optimize；可选先量化为 8 位调色板（素描本画面颜色很少）
+  lossless-webp  无损 WebP，体积明显小于 PNG
+
+每个方案都会记录编码耗时与输出大小。
+
+写入剪贴板时由系统适配器声明它能直接使用的格式（见 CLIPBOARD_FORMATS），渲染阶段直接编码为其中之一：
+  png   上述编码方案输出的 PNG
+  dib   Windows 剪贴板的 CF_DIB（不带文件头的 BMP），省去 PNG 编码再解码
+  rgba  未编码的 RGBA 像素
+"""
+import threading
+import time
+from io import BytesIO
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+from PIL import Image
+from png_encoder import IncrementalPNGEncoder, png_encoder
+
+# 各方案输出的图片格式
+ENCODER_FORMATS: Dict[str, str] = {
+    "default": "PNG",
+    "fast": "PNG",
+    "small": "PNG",
+    "lossless-webp": "WEBP",
+}
+
+# small 方案是否先量化为 8 位调色板（有损，但对素描本画面基本看不出差别）
+small_quantize = False
+
+# 剪贴板图片格式
+CLIPBOARD_FORMATS = ("png", "dib", "rgba")
+
+_fast_png_encoder = IncrementalPNGEncoder(compress_level=1)
+
+# 方案（或 dib/rgba 剪贴板格式） -> {"count", "total_ms", "total_bytes", "last_ms", "last_bytes"}
+encode_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+class RenderedImage(NamedTuple):
+    """渲染结果：图片，以及 PNG 增量编码所需的静态图与静态行数（含义同 IncrementalPNGEncoder.encode）"""
+    image: Image.Image
+    static: Optional[Image.Image] = None
+    static_rows: int = 0
+
+
+class ClipboardPayload(NamedTuple):
+    """
+    编码为某种剪贴板格式的渲染结果。
+    encoder 为实际使用的编码方案（png 格式时）或格式名，encode_ms 为本次编码耗时；
+    两者随结果一起返回，进程池或后台线程中编码时日志也能对应到同一次触发。
+    """
+    format: str
+    data: bytes
+    size: Tuple[int, int]
+    encoder: str = ""
+    encode_ms: float = 0.0
+
+    def summary(self) -> str:
+        """本次编码的方案、耗时与大小，用于日志"""
+        return f"{self.encoder or self.format}: {self.encode_ms:.1f} ms, {len(self.data) / 1024:.1f} KB"
+
+
+def _encode_small(img: Image.Image) -> bytes:
+    if small_quantize and img.mode in ("RGB", "RGBA"):
+        # RGBA 只能使用 FASTOCTREE 量化
+        img = img.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    buf = BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _encode_webp(img: Image.Image) -> bytes:
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    buf = BytesIO()
+    # 无损模式下 quality 表示压缩力度，method=0 最快，体积仍明显小于 PNG
+    img.save(buf, format="WEBP", lossless=True, quality=50, method=0)
+    return buf.getvalue()
+
+
+def encode_image(
+    img: Image.Image,
+    profile: str = "default",
+    static: Optional[Image.Image] = None,
+    static_rows: int = 0,
+    png_encoders: Optional[Mapping[str, IncrementalPNGEncoder]] = None,
+) -> bytes:
+    """
+    按 profile 编码 img。
+    static / static_rows 含义同 IncrementalPNGEncoder.encode，只有 PNG 的 default/fast 方案会利用。
+    png_encoders 为 {"default": 编码器, "fast": 编码器}，用于替换全局的增量编码器（各自缓存静态行）。
+    """
+    start = time.perf_counter()
+    if profile == "default":
+        encoder = png_encoders["default"] if png_encoders else png_encoder
+        data = encoder.encode(img, static, static_rows)
+    elif profile == "fast":
+        encoder = png_encoders["fast"] if png_encoders else _fast_png_encoder
+        data = encoder.encode(img, static, static_rows)
+    elif profile == "small":
+        data = _encode_small(img)
+    elif profile == "lossless-webp":
+        data = _encode_webp(img)
+    else:
+        raise ValueError(f"未知的编码方案: {profile}")
+    _record(profile, start, data)
+    return data
+
+
+def _record(name: str, start: float, data: bytes) -> None:
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        stats = encode_stats.setdefault(name, {"count": 0, "total_ms": 0.0, "total_bytes": 0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["total_bytes"] += len(data)
+        stats["last_ms"] = elapsed_ms
+        stats["last_bytes"] = len(data)
+
+
+def encode_rendered(
+    rendered: RenderedImage,
+    profile: str = "default",
+    png_encoders: Optional[Mapping[str, IncrementalPNGEncoder]] = None,
+) -> bytes:
+    """按 profile 编码渲染结果"""
+    return encode_image(rendered.image, profile, rendered.static, rendered.static_rows, png_encoders)
+
+
+def _encode_dib(img: Image.Image) -> bytes:
+    buf = BytesIO()
+    img.convert("RGB").save(buf, format="BMP")
+    # 去掉 14 字节的 BMP 文件头即为 CF_DIB
+    return buf.getvalue()[14:]
+
+
+def encode_for_clipboard(
+    rendered: RenderedImage,
+    formats: Sequence[str] = ("png",),
+    profile: str = "default",
+    png_encoders: Optional[Mapping[str, IncrementalPNGEncoder]] = None,
+) -> ClipboardPayload:
+    """
+    按 formats 的优先顺序选择第一个支持的剪贴板格式并编码；png 格式使用 profile 方案。
+    dib 与 rgba 的耗时同样记录在 encode_stats 中（键为格式名）。
+    """
+    img = rendered.image
+    for fmt in formats:
+        start = time.perf_counter()
+        if fmt == "png":
+            data = encode_rendered(rendered, profile, png_encoders)
+            name = profile
+        elif fmt == "dib":
+            data = _encode_dib(img)
+            name = fmt
+        elif fmt == "rgba":
+            data = img.convert("RGBA").tobytes()
+            name = fmt
+        else:
+            continue
+        if fmt != "png":
+            _record(fmt, start, data)
+        return ClipboardPayload(fmt, data, img.size, name, (time.perf_counter() - start) * 1000)
+    raise ValueError(f"没有支持的剪贴板格式: {list(formats)}")
+
@@ -0,0 +1,128 @@
+# filename: png_encoder.py
+"""
+增量 PNG 编码器
+
+同一张底图 + 置顶图层渲染出来的图片，文字/图片框以上的行永远相同。
+这里对这些静态行只压缩一次：缓存 zlib 压缩器在静态行之后的状态（compressobj().copy()）
+以及已产生的压缩数据，之后每次渲染只需继续压缩从变化区域开始的行。
+
+所有行统一使用 PNG 的 Up 滤波（与上一行逐字节相减），由 ImageChops.subtract_modulo 在 C 层完成；
+对这类插画压缩率与 Pillow 的默认输出基本一致。
+"""
+import struct
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional
+from PIL import Image, ImageChops
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 支持的模式 -> (PNG 颜色类型, 每像素字节数)
+_COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "LA": (4, 2), "RGBA": (6, 4)}
+
+_FILTER_UP = b"\x02"
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _filtered_rows(img: Image.Image, start: int) -> bytes:
+    """返回第 start 行到最后一行经 Up 滤波后的数据（每行带滤波类型字节）"""
+    w, h = img.size
+    if start >= h:
+        return b""
+    if start > 0:
+        region = img.crop((0, start - 1, w, h))
+        cur = region.crop((0, 1, w, region.height))
+        prev = region.crop((0, 0, w, region.height - 1))
+    else:
+        cur = img
+        prev = Image.new(img.mode, (w, h))
+        prev.paste(img.crop((0, 0, w, h - 1)), (0, 1))
+    data = ImageChops.subtract_modulo(cur, prev).tobytes()
+    stride = w * _COLOR_TYPES[img.mode][1]
+    return b"".join(_FILTER_UP + data[i:i + stride] for i in range(0, len(data), stride))
+
+
+class _Prefix:
+    """某张静态图前若干行压缩后的状态"""
+
+    def __init__(self, static: Image.Image, rows: int, level: int):
+        self.static_ref = weakref.ref(static)
+        compressor = zlib.compressobj(level)
+        self.data = compressor.compress(_filtered_rows(static.crop((0, 0, static.width, rows)), 0))
+        self.compressor = compressor
+
+
+class IncrementalPNGEncoder:
+    """按 (静态图, 静态行数) 缓存压缩前缀的 PNG 编码器"""
+
+    def __init__(self, compress_level: int = 6, max_entries: int = 32):
+        self.compress_level = compress_level
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _Prefix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, img: Image.Image, static: Optional[Image.Image] = None, static_rows: int = 0) -> bytes:
+        """
+        将 img 编码为 PNG。
+        static 为与 img 同尺寸同模式的静态图，调用方保证 img 的前 static_rows 行与其完全相同，
+        且 static 长期存在、不会被修改（例如资源缓存中的合成图）：压缩前缀按对象缓存。
+        不支持的模式或没有静态行时退回 Pillow 编码。
+        """
+        if img.mode not in _COLOR_TYPES:
+            return _pillow_png(img, self.compress_level)
+        static_rows = max(0, min(img.height, static_rows))
+        if static is None or static_rows == 0 or static.size != img.size or static.mode != img.mode:
+            return _pillow_png(img, self.compress_level)
+
+        prefix = self._get_prefix(static, static_rows)
+        compressor = prefix.compressor.copy()
+        idat = prefix.data + compressor.compress(_filtered_rows(img, static_rows)) + compressor.flush()
+
+        color_type = _COLOR_TYPES[img.mode][0]
+        ihdr = struct.pack(">IIBBBBB", img.width, img.height, 8, color_type, 0, 0, 0)
+        return PNG_SIGNATURE + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", idat) + _chunk(b"IEND", b"")
+
+    def _get_prefix(self, static: Image.Image, rows: int) -> _Prefix:
+        key = (id(static), rows, self.compress_level)
+        with self._lock:
+            prefix = self._entries.get(key)
+            if prefix is not None and prefix.static_ref() is static:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prefix
+
+        prefix = _Prefix(static, rows, self.compress_level)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = prefix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prefix
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _pillow_png(img: Image.Image, compress_level: int) -> bytes:
+    buf = BytesIO()
+    img.save(buf, format="PNG", compress_level=compress_level)
+    return buf.getvalue()
+
+
+# 全局共享的编码器
+png_encoder = IncrementalPNGEncoder()
+
+
+def encode_png(img: Image.Image, static: Optional[Image.Image] = None, static_rows: int = 0) -> bytes:
+    """使用全局编码器编码 PNG"""
+    return png_encoder.encode(img, static, static_rows)
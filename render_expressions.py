@@ -0,0 +1,57 @@
+# filename: render_expressions.py
+"""
+把同一句话渲染到所有差分（BASEIMAGE_MAPPING）上，用于制作表情包
+
+排版只计算一次，各差分的合成与编码并行完成（见 SketchbookRenderer.render_all_expressions）。
+输出路径以 .zip 结尾时打包为 zip，否则写入该目录，每个差分一个文件（如 开心.png）。
+
+用法:
+  python render_expressions.py "今天也要【好好画画】哦！" -o pack.zip
+  python render_expressions.py "你好" -o out/ --encoder lossless-webp
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def main() -> int:
+    from config import OUTPUT_ENCODER
+    from output_encoder import ENCODER_FORMATS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("text", help="要渲染的文字")
+    parser.add_argument("-o", "--output", default="expressions.zip", help="输出的 zip 文件或目录（默认 expressions.zip）")
+    parser.add_argument("--encoder", choices=sorted(ENCODER_FORMATS), default=OUTPUT_ENCODER, help="输出编码方案")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="并行渲染的线程数（默认按差分数与 CPU 核数）")
+    args = parser.parse_args()
+
+    # 命令行中的路径相对于当前目录，渲染时切换到程序目录（config 中的资源路径相对于此）
+    output = os.path.abspath(args.output)
+    os.chdir(ROOT)
+    from renderer import SketchbookRenderer
+
+    renderer = SketchbookRenderer(encoder=args.encoder)
+    renderer.preload()
+    start = time.perf_counter()
+    images = renderer.render_all_expressions(args.text, max_workers=args.workers or None)
+    elapsed = time.perf_counter() - start
+
+    if output.endswith(".zip"):
+        with open(output, "wb") as f:
+            f.write(renderer.expressions_to_zip(images))
+    else:
+        os.makedirs(output, exist_ok=True)
+        ext = ENCODER_FORMATS[args.encoder].lower()
+        for name, data in images.items():
+            with open(os.path.join(output, f"{name}.{ext}"), "wb") as f:
+                f.write(data)
+    total_kb = sum(len(data) for data in images.values()) / 1024
+    print(f"{len(images)} 个差分，渲染耗时 {elapsed * 1000:.1f} ms，共 {total_kb:.1f} KB，已写入 {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# filename: render_pipeline.py
+"""
+后台渲染流水线
+
+热键回调只负责获取输入（剪切文字/读取剪贴板图片）并提交任务；
+渲染在专门的线程中完成（图片模式可选交给进程池），结果按提交顺序交给投递阶段（写剪贴板、模拟粘贴）。
+任务队列有长度上限，队列满时提交会等待而不是丢弃。
+"""
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from text_fit_draw import render_text_auto
+from image_fit_paste import render_image_auto
+from output_encoder import ClipboardPayload, encode_for_clipboard
+import stage_timer
+
+
+class RenderJob(NamedTuple):
+    """
+    一次渲染任务：kind 为 "text" 或 "image"，kwargs 原样传给对应的渲染函数（encoder 除外）。
+    formats 为按优先顺序排列的剪贴板格式（见 output_encoder.CLIPBOARD_FORMATS），通常取自系统适配器。
+    trace 为该次触发的分阶段计时（见 stage_timer），未启用计时时为 None。
+    trigger 为触发编号，投递结果时用它统计子进程创建（见 spawn_audit）。
+    """
+    kind: str
+    kwargs: dict
+    formats: Tuple[str, ...] = ("png",)
+    trace: Optional[stage_timer.Trace] = None
+    trigger: int = 0
+
+
+def run_render_job(job: RenderJob) -> ClipboardPayload:
+    """执行渲染任务并直接编码为剪贴板格式；必须是模块级函数，以便在进程池中执行"""
+    kwargs = dict(job.kwargs)
+    profile = kwargs.pop("encoder", "default")
+    with stage_timer.activate(job.trace):
+        with stage_timer.span("render"):
+            if job.kind == "text":
+                rendered = render_text_auto(**kwargs)
+            elif job.kind == "image":
+                rendered = render_image_auto(**kwargs)
+            else:
+                raise ValueError(f"未知的任务类型: {job.kind}")
+        with stage_timer.span("encode"):
+            return encode_for_clipboard(rendered, job.formats, profile)
+
+
+def init_render_process(asset_cache_bytes: int, small_quantize: bool) -> None:
+    """
+    进程池子进程的初始化：应用主进程中与渲染有关的设置。
+    子进程以 spawn 方式启动时只会重新导入 main.py 而不会执行它的 setup()，这些设置需要显式传入。
+    """
+    from asset_cache import asset_cache
+    import output_encoder
+
+    asset_cache.max_bytes = asset_cache_bytes
+    output_encoder.small_quantize = small_quantize
+
+
+_STOP = object()
+
+
+class RenderPipeline:
+    """
+    提交 -> 渲染线程 -> 投递线程。
+    deliver(job, result, error) 在投递线程中按提交顺序被调用，渲染失败时 result 为 None。
+    initializer(*initargs) 在每个图片渲染子进程启动时执行。
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[RenderJob, Optional[ClipboardPayload], Optional[BaseException]], None],
+        max_queue: int = 8,
+        image_processes: int = 0,
+        render: Callable[[RenderJob], ClipboardPayload] = run_render_job,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        self.deliver = deliver
+        self.render = render
+        self._jobs: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        # 渲染结果（Future）按提交顺序排队，投递线程依次等待
+        self._results: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        # render 与 initializer 必须定义在不导入 main.py 的模块中，子进程才不会执行热键程序的初始化
+        self._pool = ProcessPoolExecutor(max_workers=image_processes, initializer=initializer,
+                                         initargs=initargs) if image_processes > 0 else None
+        self._render_thread = threading.Thread(target=self._render_loop, name="render-worker", daemon=True)
+        self._deliver_thread = threading.Thread(target=self._deliver_loop, name="render-deliver", daemon=True)
+        self._started = False
+        # 已提交但尚未投递完成的任务数
+        self._inflight = 0
+        self._idle = threading.Condition()
+
+    def start(self) -> "RenderPipeline":
+        if not self._started:
+            self._started = True
+            self._render_thread.start()
+            self._deliver_thread.start()
+        return self
+
+    def submit(self, job: RenderJob, timeout: Optional[float] = None) -> None:
+        """提交任务；队列已满时等待（timeout 为 None 表示一直等待），超时抛出 queue.Full"""
+        with self._idle:
+            self._inflight += 1
+        try:
+            self._jobs.put(job, timeout=timeout)
+        except queue.Full:
+            self._task_done()
+            raise
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的任务全部投递完成，超时返回 False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def _task_done(self) -> None:
+        with self._idle:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.notify_all()
+
+    def pending(self) -> int:
+        """尚未开始渲染的任务数"""
+        return self._jobs.qsize()
+
+    def stop(self, wait: bool = True) -> None:
+        """处理完已提交的任务后停止"""
+        if not self._started:
+            return
+        self._jobs.put(_STOP)
+        if wait:
+            self._render_thread.join()
+            self._deliver_thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def _render_loop(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                self._results.put(_STOP)
+                return
+            if self._pool is not None and job.kind == "image":
+                # 图片缩放是纯 CPU 计算，交给进程池并行，投递顺序仍由 _results 保证
+                future = self._pool.submit(self.render, job)
+            else:
+                future = Future()
+                try:
+                    future.set_result(self.render(job))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._results.put((job, future))
+
+    def _deliver_loop(self) -> None:
+        while True:
+            item = self._results.get()
+            if item is _STOP:
+                return
+            job, future = item
+            try:
+                result, error = future.result(), None
+            except BaseException as e:
+                result, error = None, e
+            try:
+                self.deliver(job, result, error)
+            except Exception as e:
+                print(f"投递渲染结果失败: {e}")
+            finally:
+                self._task_done()
@@ -0,0 +1,286 @@
+# filename: render_service.py
+"""
+本地渲染服务：通过 HTTP/1.1（TCP 或 Unix 套接字）提供渲染接口，供聊天机器人等程序直接调用
+
+  POST /render/text    请求体为 JSON：{"text": "...", "expression": "开心"}（expression 可省略）
+  POST /render/image   请求体为图片文件本身，差分通过查询参数指定：/render/image?expression=开心
+  GET  /health         JSON：进程数、在途请求数、已完成/拒绝的请求数
+渲染成功时直接返回图片（默认 image/png）。
+
+渲染在进程池中执行，事件循环只负责收发。
+同时在途（渲染中 + 排队）的请求超过 进程数 + --max-queue 时立即返回 503，并在 Retry-After 中给出建议的重试秒数，
+而不是无限排队。连接默认保持（keep-alive），空闲超过 --idle-timeout 秒后关闭。
+
+用法:
+  python render_service.py --port 8765 -j 4
+  python render_service.py --unix /tmp/sketchbook.sock
+  curl -s localhost:8765/render/text -d '{"text": "你好【世界】"}' -o out.png
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 请求头与请求体的大小上限（字节）
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+CONTENT_TYPES = {"PNG": "image/png", "WEBP": "image/webp"}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# 子进程中的渲染器，由 _init_worker 创建
+_renderer = None
+
+
+def _init_worker(encoder: str) -> None:
+    """子进程初始化：切换到程序目录（config 中的资源路径相对于此），创建渲染器并预先解码资源"""
+    global _renderer
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from renderer import SketchbookRenderer
+
+    _renderer = SketchbookRenderer(encoder=encoder)
+    _renderer.preload()
+
+
+def render_request(kind: str, content, expression: Optional[str]) -> Tuple[bytes, float]:
+    """
+    在子进程中执行：kind 为 "text" 时 content 为文字，为 "image" 时为图片文件的字节。
+    返回 (编码后的图片, 渲染耗时秒数)；耗时在子进程中测量，不含在进程池中排队的时间。
+    """
+    start = time.perf_counter()
+    if kind == "text":
+        data = _renderer.render_text(content, expression)
+    else:
+        data = _renderer.render_image(content, expression)
+    return data, time.perf_counter() - start
+
+
+class RenderService:
+    """把 HTTP 请求转为进程池中的渲染任务，并限制在途请求数"""
+
+    def __init__(self, workers: int, max_queue: int, encoder: str = "default", idle_timeout: float = 30.0):
+        from output_encoder import ENCODER_FORMATS
+
+        self.workers = max(1, workers)
+        self.max_inflight = self.workers + max(0, max_queue)
+        self.encoder = encoder
+        self.content_type = CONTENT_TYPES[ENCODER_FORMATS[encoder]]
+        self.idle_timeout = idle_timeout
+        self.inflight = 0
+        self.completed = 0
+        self.rejected = 0
+        # 子进程中单次渲染耗时的指数滑动平均（秒，不含排队），用于估计 Retry-After
+        self.avg_render = 0.05
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start_pool(self) -> None:
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.encoder,))
+        # 预先启动所有子进程，第一个请求不必等待进程启动与资源解码
+        for future in [self._pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def retry_after(self) -> int:
+        """当前队列排空所需的估计秒数，至少 1 秒"""
+        return max(1, math.ceil(self.avg_render * self.inflight / self.workers))
+
+    async def render(self, kind: str, content, expression: Optional[str]) -> bytes:
+        if self.inflight >= self.max_inflight:
+            self.rejected += 1
+            raise HTTPError(503, "渲染队列已满，请稍后重试")
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            data, seconds = await loop.run_in_executor(self._pool, render_request, kind, content, expression)
+        finally:
+            self.inflight -= 1
+        self.avg_render += (seconds - self.avg_render) * 0.1
+        self.completed += 1
+        return data
+
+    async def handle_request(self, method: str, target: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "只支持 GET")
+            status = {"workers": self.workers, "inflight": self.inflight, "max_inflight": self.max_inflight,
+                      "completed": self.completed, "rejected": self.rejected}
+            return 200, {"Content-Type": "application/json"}, json.dumps(status).encode()
+        if url.path not in ("/render/text", "/render/image"):
+            raise HTTPError(404, f"未知的路径: {url.path}")
+        if method != "POST":
+            raise HTTPError(405, "只支持 POST")
+
+        if url.path == "/render/text":
+            try:
+                request = json.loads(body)
+                text = request["text"]
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, '请求体必须是包含 "text" 的 JSON')
+            if not isinstance(text, str):
+                raise HTTPError(400, "text 必须是字符串")
+            expression = request.get("expression")
+            if expression is not None and not isinstance(expression, str):
+                raise HTTPError(400, "expression 必须是字符串")
+            data = await self._render_or_400("text", text, expression)
+        else:
+            if not body:
+                raise HTTPError(400, "请求体为空")
+            data = await self._render_or_400("image", body, query.get("expression", [None])[0])
+        return 200, {"Content-Type": self.content_type}, data
+
+    async def _render_or_400(self, kind: str, content, expression: Optional[str]) -> bytes:
+        try:
+            return await self.render(kind, content, expression)
+        except HTTPError:
+            raise
+        except Image.DecompressionBombError as e:
+            # 像素数超过 Pillow 的安全上限：图片本身过大，而不是服务出错
+            raise HTTPError(413, str(e))
+        except (ValueError, OSError) as e:
+            # 未知的差分、无法识别的图片等属于请求错误
+            raise HTTPError(400, str(e))
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 413, {}, b"", False, "请求头过大")
+                    return
+
+                keep_alive = body_read = False
+                try:
+                    method, target, version, headers = _parse_head(head)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    body = await _read_body(reader, headers)
+                    body_read = True
+                    status, extra, payload = await self.handle_request(method, target, body)
+                    error = None
+                except HTTPError as e:
+                    status, extra, payload, error = e.status, {}, b"", str(e)
+                    # 请求体没有读完时连接无法继续使用
+                    keep_alive = keep_alive and body_read
+                except Exception as e:
+                    status, extra, payload, error = 500, {}, b"", f"{type(e).__name__}: {e}"
+                if status == 503:
+                    extra["Retry-After"] = str(self.retry_after())
+                await self._write(writer, status, extra, payload, keep_alive, error)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _write(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], body: bytes,
+                     keep_alive: bool, error: Optional[str] = None) -> None:
+        if error is not None:
+            body = json.dumps({"error": error}, ensure_ascii=False).encode()
+            headers = {**headers, "Content-Type": "application/json; charset=utf-8"}
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def _parse_head(head: bytes):
+    try:
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise HTTPError(400, "无法解析请求行")
+    headers = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, version, headers
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "不支持分块传输，请提供 Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(400, "无效的 Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"请求体超过 {MAX_BODY_BYTES // 1024 // 1024} MB")
+    return await reader.readexactly(length) if length > 0 else b""
+
+
+async def serve(service: RenderService, host: str, port: int, unix_path: Optional[str]) -> None:
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, unix_path, limit=MAX_HEADER_BYTES)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        where = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"渲染服务已启动: {where}（{service.workers} 个渲染进程，最多 {service.max_inflight} 个在途请求）",
+          flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> int:
+    from output_encoder import ENCODER_FORMATS
+    from config import OUTPUT_ENCODER
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="监听 Unix 套接字而不是 TCP 端口")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="渲染进程数（默认 CPU 核数）")
+    parser.add_argument("--max-queue", type=int, default=16, help="所有进程都在渲染时最多再排队的请求数")
+    parser.add_argument("--encoder", choices=sorted(ENCODER_FORMATS), default=OUTPUT_ENCODER, help="输出编码方案")
+    parser.add_argument("--idle-timeout", type=float, default=30.0, help="保持连接的空闲超时（秒）")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    service = RenderService(args.workers, args.max_queue, args.encoder, args.idle_timeout)
+    service.start_pool()
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("渲染服务已停止")
+    finally:
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
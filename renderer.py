@@ -0,0 +1,188 @@
+# filename: renderer.py
+"""
+可复用的渲染器对象
+
+draw_text_auto / paste_image_auto 默认使用进程级的全局缓存，参数也要由调用方逐个传入。
+SketchbookRenderer 持有自己的配置（底图、差分、文字框、字体、编码方案等）以及独立的资源、字体（含宽度表）、
+排版（含字号提示）与 PNG 静态行缓存，服务或批处理的每个工作进程/线程保留一个实例即可一直复用已预热的缓存；
+多个实例之间互不影响。只有置顶图层的分块索引按图层对象全局共享（compositing.overlay_indices），它只由图层像素决定。
+
+所有缓存都带锁，同一个实例可以在多个线程中同时调用 render_text / render_image。
+实例本身不保存“当前差分”，差分由每次调用的 expression 参数或文字中的 #差分名# 决定。
+"""
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple, Union
+from PIL import Image
+
+import config
+from asset_cache import AssetCache
+from font_cache import FontCache
+from image_fit_paste import render_image_auto
+from output_encoder import ENCODER_FORMATS, RenderedImage, encode_rendered
+from png_encoder import IncrementalPNGEncoder
+from text_fit_draw import LayoutCache, render_text_auto
+
+ImageInput = Union[Image.Image, str, bytes]
+
+
+class RendererConfig(NamedTuple):
+    """渲染器配置，默认值取自 config.py"""
+    base_image: str = config.BASEIMAGE_FILE
+    # 差分关键词（如 "#开心#"）-> 底图路径
+    expressions: Mapping[str, str] = config.BASEIMAGE_MAPPING
+    overlay: Optional[str] = config.BASE_OVERLAY_FILE if config.USE_BASE_OVERLAY else None
+    font_path: str = config.FONT_FILE
+    top_left: Tuple[int, int] = config.TEXT_BOX_TOPLEFT
+    bottom_right: Tuple[int, int] = config.IMAGE_BOX_BOTTOMRIGHT
+    max_font_height: int = 64
+    color: Tuple[int, int, int] = (0, 0, 0)
+    bracket_color: Tuple[int, int, int] = (128, 0, 128)
+    image_padding: int = 12
+    resample_quality: str = config.IMAGE_RESAMPLE_QUALITY
+    encoder: str = config.OUTPUT_ENCODER
+    asset_cache_mb: int = config.ASSET_CACHE_MAX_MB
+
+
+class SketchbookRenderer:
+    """持有配置与各级缓存的渲染器；render_text / render_image 返回编码后的 bytes 或 PIL 图像"""
+
+    def __init__(self, renderer_config: Optional[RendererConfig] = None, **overrides):
+        cfg = renderer_config or RendererConfig()
+        if overrides:
+            cfg = cfg._replace(**overrides)
+        if cfg.encoder not in ENCODER_FORMATS:
+            raise ValueError(f"未知的编码方案: {cfg.encoder}")
+        self.config = cfg
+        self.assets = AssetCache(cfg.asset_cache_mb * 1024 * 1024)
+        self.fonts = FontCache()
+        self.layouts = LayoutCache()
+        self.png_encoders: Dict[str, IncrementalPNGEncoder] = {
+            "default": IncrementalPNGEncoder(),
+            "fast": IncrementalPNGEncoder(compress_level=1),
+        }
+
+    def resolve_expression(self, expression: Optional[str] = None, text: Optional[str] = None):
+        """
+        按差分关键词（可省略两侧的 #）选择底图，返回 (底图路径, 文字)。
+        没有指定差分时识别文字中的 #差分名# 并将其去掉，都没有时使用默认底图。
+        """
+        expressions = self.config.expressions
+        if expression:
+            keyword = expression if expression.startswith("#") else f"#{expression}#"
+            if keyword not in expressions:
+                raise ValueError(f"未知的差分: {expression}")
+            return expressions[keyword], text
+        if text is not None:
+            for keyword, img_file in expressions.items():
+                if keyword in text:
+                    return img_file, text.replace(keyword, "").strip()
+        return self.config.base_image, text
+
+    def preload(self) -> None:
+        """预先解码所有差分底图与置顶图层（含合成图）"""
+        cfg = self.config
+        bases = list(dict.fromkeys([cfg.base_image, *cfg.expressions.values()]))
+        self.assets.preload(bases + ([cfg.overlay] if cfg.overlay else []))
+        if cfg.overlay and os.path.isfile(cfg.overlay):
+            for base in bases:
+                try:
+                    self.assets.get_composite(base, cfg.overlay)
+                except OSError as e:
+                    print(f"预加载图片失败 {base}: {e}")
+
+    def render_text(self, text: str, expression: Optional[str] = None, encoder: Optional[str] = None,
+                    encode: bool = True) -> Union[bytes, Image.Image]:
+        """渲染文字；encode 为 False 时返回 PIL 图像，否则按 encoder（默认为配置中的方案）编码"""
+        base, text = self.resolve_expression(expression, text)
+        rendered = self.render_text_on(base, text)
+        return self.encode(rendered, encoder) if encode else rendered.image
+
+    def render_image(self, image: ImageInput, expression: Optional[str] = None, encoder: Optional[str] = None,
+                     encode: bool = True) -> Union[bytes, Image.Image]:
+        """渲染图片；image 可以是 PIL 图像、图片路径或图片文件的字节"""
+        base, _ = self.resolve_expression(expression)
+        if isinstance(image, Image.Image):
+            rendered = self.render_image_on(base, image)
+        else:
+            with Image.open(BytesIO(image) if isinstance(image, bytes) else image) as content:
+                rendered = self.render_image_on(base, content)
+        return self.encode(rendered, encoder) if encode else rendered.image
+
+    def render_all_expressions(self, text: str, encoder: Optional[str] = None,
+                               max_workers: Optional[int] = None) -> Dict[str, bytes]:
+        """
+        把同一段文字渲染到每个差分上，返回 {差分名（不含 #）: 编码后的图片}，顺序与配置中的差分一致。
+        排版与底图无关：先渲染第一个差分（计算并缓存排版），其余差分直接复用排版，
+        合成与编码在线程池中并行（Pillow 的合成与 zlib 压缩会释放 GIL）。
+        文字中的 #差分名# 会被去掉。
+        """
+        for keyword in self.config.expressions:
+            text = text.replace(keyword, "")
+        text = text.strip()
+        names = [keyword.strip("#") for keyword in self.config.expressions]
+        bases = list(self.config.expressions.values())
+        if not bases:
+            return {}
+
+        def render(base: str) -> bytes:
+            return self.encode(self.render_text_on(base, text), encoder)
+
+        results = [render(bases[0])]
+        if len(bases) > 1:
+            workers = max_workers or min(len(bases) - 1, os.cpu_count() or 1)
+            with ThreadPoolExecutor(workers) as pool:
+                results += list(pool.map(render, bases[1:]))
+        return dict(zip(names, results))
+
+    def render_text_on(self, base: Union[str, Image.Image], text: str) -> RenderedImage:
+        """在指定底图上渲染文字，返回未编码的结果"""
+        cfg = self.config
+        return render_text_auto(base, cfg.top_left, cfg.bottom_right, text, color=cfg.color,
+                                max_font_height=cfg.max_font_height, font_path=cfg.font_path,
+                                bracket_color=cfg.bracket_color, image_overlay=cfg.overlay,
+                                assets=self.assets, fonts=self.fonts, layouts=self.layouts)
+
+    def render_image_on(self, base: Union[str, Image.Image], image: Image.Image) -> RenderedImage:
+        """在指定底图上放置图片，返回未编码的结果"""
+        cfg = self.config
+        return render_image_auto(base, cfg.top_left, cfg.bottom_right, image, align="center", valign="middle",
+                                 padding=cfg.image_padding, allow_upscale=True, keep_alpha=True,
+                                 image_overlay=cfg.overlay, resample_quality=cfg.resample_quality,
+                                 assets=self.assets)
+
+    def encode(self, rendered: RenderedImage, encoder: Optional[str] = None) -> bytes:
+        """按 encoder 编码，PNG 方案复用本实例的静态行压缩缓存"""
+        return encode_rendered(rendered, encoder or self.config.encoder, self.png_encoders)
+
+    def expressions_to_zip(self, images: Mapping[str, bytes], encoder: Optional[str] = None) -> bytes:
+        """
+        把 render_all_expressions 的结果打包为 zip（图片已压缩，直接存储）。
+        encoder 应与渲染时相同，默认为配置中的方案，决定文件扩展名。
+        """
+        ext = ENCODER_FORMATS[encoder or self.config.encoder].lower()
+        buf = BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+            for name, data in images.items():
+                zf.writestr(f"{name}.{ext}", data)
+        return buf.getvalue()
+
+    def stats(self) -> dict:
+        return {
+            "assets": {"entries": len(self.assets), "bytes": self.assets.current_bytes,
+                       "hits": self.assets.hits, "misses": self.assets.misses},
+            "fonts": self.fonts.stats(),
+            "layouts": {"hits": self.layouts.hits, "misses": self.layouts.misses,
+                        "size_hints": self.layouts.size_hints.stats()},
+            "png": {name: {"hits": enc.hits, "misses": enc.misses} for name, enc in self.png_encoders.items()},
+        }
+
+    def clear(self) -> None:
+        """清空本实例的所有缓存"""
+        self.assets.clear()
+        self.fonts.clear()
+        self.layouts.clear()
+        for enc in self.png_encoders.values():
+            enc.clear()
@@ -0,0 +1,114 @@
+# filename: rich_text.py
+"""
+富文本标记解析
+
+整段文字只扫描一次（一个预编译的正则），得到去掉标记后的显示文本，以及覆盖它的样式区间
+[(起点, 终点, 样式), ...]；相邻且样式相同的区间会合并，排版按行切分这些区间，每个区间只需绘制一次。
+
+支持的标记：
+  [文字] / 【文字】      括号及括号内的文字使用括号颜色（括号本身保留显示），括号状态可跨行
+  {red|文字}            指定颜色，可用颜色名或 #rrggbb / #rgb
+  {b|文字}              加粗（描边 1 像素）
+  {b,#ff0000|文字}      多个设置用逗号分隔；可以嵌套，内层覆盖外层
+花括号中的设置无法识别时按普通文字显示；未闭合的 { 样式持续到文末。
+显式颜色优先于括号颜色。
+"""
+import bisect
+import re
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from PIL import ImageColor
+
+RGB = Tuple[int, int, int]
+
+
+class Style(NamedTuple):
+    """color 为显式颜色（None 表示使用默认颜色或括号颜色）"""
+    color: Optional[RGB] = None
+    bold: bool = False
+    bracket: bool = False
+
+
+# 样式开始 "{设置|"、样式结束 "}"、四种括号
+_TOKEN = re.compile(r"\{([^{}|\n]{1,32})\||\}|[\[\]【】]")
+
+_OPEN_BRACKETS = "[【"
+
+
+class RichText(NamedTuple):
+    """plain 为显示文本；spans 按起点排序、首尾相接地覆盖 plain，starts 为各区间的起点"""
+    plain: str
+    spans: List[Tuple[int, int, Style]]
+    starts: List[int]
+
+    def runs(self, start: int, end: int) -> Iterator[Tuple[int, int, Style]]:
+        """plain[start:end] 范围内的样式区间（已裁剪到该范围）"""
+        i = max(0, bisect.bisect_right(self.starts, start) - 1)
+        spans = self.spans
+        while i < len(spans) and spans[i][0] < end:
+            s, e, style = spans[i]
+            s, e = max(s, start), min(e, end)
+            if s < e:
+                yield s, e, style
+            i += 1
+
+
+def _parse_spec(spec: str) -> Optional[Tuple[Optional[RGB], bool]]:
+    """解析 "b,#ff0000" 形式的设置，返回 (颜色, 是否加粗)；无法识别时返回 None"""
+    color, bold = None, False
+    for item in spec.split(","):
+        item = item.strip()
+        if item == "b":
+            bold = True
+            continue
+        try:
+            color = ImageColor.getrgb(item)[:3]
+        except ValueError:
+            return None
+    return color, bold
+
+
+def parse_rich_text(text: str) -> RichText:
+    """一次扫描整段文字，返回显示文本与样式区间"""
+    parts: List[str] = []
+    spans: List[Tuple[int, int, Style]] = []
+    pos = 0  # 显示文本的当前长度
+    last = 0  # text 中尚未处理的起点
+    in_bracket = False
+    # 花括号样式栈：[(颜色, 是否加粗), ...]；按普通文字显示的 { 以 None 占位，使其对应的 } 也按普通文字显示
+    stack: List[Optional[Tuple[Optional[RGB], bool]]] = []
+
+    def current(bracket: bool) -> Style:
+        specs = [spec for spec in stack if spec is not None]
+        color = next((c for c, _ in reversed(specs) if c is not None), None)
+        return Style(color, any(b for _, b in specs), bracket)
+
+    def emit(s: str, style: Style) -> None:
+        nonlocal pos
+        if not s:
+            return
+        parts.append(s)
+        if spans and spans[-1][2] == style and spans[-1][1] == pos:
+            spans[-1] = (spans[-1][0], pos + len(s), style)
+        else:
+            spans.append((pos, pos + len(s), style))
+        pos += len(s)
+
+    for m in _TOKEN.finditer(text):
+        emit(text[last:m.start()], current(in_bracket))
+        last = m.end()
+        token = m.group(0)
+        if token[0] == "{":
+            spec = _parse_spec(m.group(1))
+            if spec is None:
+                emit(token, current(in_bracket))
+            stack.append(spec)
+        elif token == "}":
+            if stack and stack.pop() is not None:
+                continue
+            emit(token, current(in_bracket))
+        else:
+            # 括号本身总是使用括号颜色
+            emit(token, current(True))
+            in_bracket = token in _OPEN_BRACKETS
+    emit(text[last:], current(in_bracket))
+    return RichText("".join(parts), spans, [s for s, _, _ in spans])
@@ -0,0 +1,200 @@
+# filename: stage_timer.py
+"""
+分阶段计时
+
+用 span(名称) 包住一段代码即可记录其耗时；关闭时 span() 返回一个共享的空对象，几乎没有开销。
+每个阶段保留最近 HISTOGRAM_WINDOW 次的耗时（滚动窗口），可以导出为 Prometheus 文本格式或 JSON。
+
+一次热键触发对应一个 Trace：获取输入、渲染、投递可能在不同线程中执行，
+各线程用 activate(trace) 声明当前属于哪次触发，finish(trace) 时输出该次触发的耗时汇总。
+进程池中执行的渲染只计入子进程自己的直方图，不会出现在汇总中。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 是否启用计时
+enabled = False
+
+# 每次触发结束后把直方图写入的文件；以 .prom 结尾时为 Prometheus 文本格式，否则为 JSON；None 表示不写入
+dump_path: Optional[str] = None
+
+# 每个阶段保留的样本数
+HISTOGRAM_WINDOW = 1024
+
+# Prometheus 直方图的桶上限（秒）
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_histograms: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Trace:
+    """一次触发中各阶段的耗时"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """with span("encode"): ... 记录这段代码的耗时"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def _add_sample(name: str, seconds: float) -> None:
+    samples = _histograms.get(name)
+    if samples is None:
+        with _lock:
+            samples = _histograms.setdefault(name, deque(maxlen=HISTOGRAM_WINDOW))
+    samples.append(seconds)
+
+
+def record(name: str, seconds: float) -> None:
+    """记录一个阶段的耗时（秒），同时计入当前线程所属的 Trace"""
+    _add_sample(name, seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.spans.append((name, seconds))
+
+
+def new_trace() -> Optional[Trace]:
+    """开始一次触发；未启用时返回 None"""
+    return Trace() if enabled else None
+
+
+class activate:
+    """with activate(trace): 其中记录的阶段计入 trace；trace 为 None 时只计入直方图"""
+
+    __slots__ = ("trace", "previous")
+
+    def __init__(self, trace: Optional[Trace]):
+        self.trace = trace
+
+    def __enter__(self):
+        self.previous = getattr(_local, "trace", None)
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, *exc):
+        _local.trace = self.previous
+
+
+def summary_line(trace: Trace, total: float) -> str:
+    """按首次出现的顺序汇总各阶段耗时，同名阶段累加"""
+    totals: Dict[str, float] = {}
+    for name, seconds in trace.spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    parts = [f"{name} {seconds * 1000:.1f}" for name, seconds in totals.items()]
+    parts.append(f"total {total * 1000:.1f}")
+    return "耗时(ms): " + " | ".join(parts)
+
+
+def finish(trace: Optional[Trace]) -> None:
+    """结束一次触发：记录总耗时、输出汇总，并按需写入直方图文件"""
+    if trace is None:
+        return
+    total = time.perf_counter() - trace.start
+    _add_sample("total", total)
+    print(summary_line(trace, total))
+    if dump_path:
+        try:
+            dump(dump_path)
+        except OSError as e:
+            print(f"写入耗时统计失败: {e}")
+
+
+def snapshot() -> Dict[str, List[float]]:
+    """各阶段当前窗口内的耗时样本（秒）"""
+    with _lock:
+        items = list(_histograms.items())
+    return {name: list(samples) for name, samples in items}
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def to_json() -> dict:
+    result = {}
+    for name, samples in snapshot().items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        result[name] = {
+            "count": len(ordered),
+            "sum_ms": round(sum(ordered) * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+    return result
+
+
+def to_prometheus() -> str:
+    lines = [
+        f"# HELP sketchbook_stage_seconds 各阶段耗时（每个阶段最近 {HISTOGRAM_WINDOW} 次）",
+        "# TYPE sketchbook_stage_seconds histogram",
+    ]
+    for name, samples in sorted(snapshot().items()):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        for bound in BUCKETS:
+            count = sum(1 for s in samples if s <= bound)
+            lines.append(f'sketchbook_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {count}')
+        lines.append(f'sketchbook_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {len(samples)}')
+        lines.append(f'sketchbook_stage_seconds_sum{{stage="{label}"}} {sum(samples):.6f}')
+        lines.append(f'sketchbook_stage_seconds_count{{stage="{label}"}} {len(samples)}')
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: str) -> None:
+    """把直方图写入 path；以 .prom 结尾时为 Prometheus 文本格式，否则为 JSON"""
+    if path.endswith(".prom"):
+        content = to_prometheus()
+    else:
+        content = json.dumps(to_json(), ensure_ascii=False, indent=2)
+    # 先写入同目录的临时文件再替换，读取方不会看到写了一半的文件
+    partial = path + ".partial"
+    with open(partial, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(partial, path)
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
@@ -0,0 +1,9 @@
+# filename: tests/conftest.py
+"""测试从程序目录导入模块；config 中的资源路径相对于程序目录，因此同时切换当前目录"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,76 @@
+# filename: tests/test_asset_cache.py
+import os
+
+import pytest
+from PIL import Image
+
+from asset_cache import AssetCache
+
+
+def _save(path, color, size=(20, 10), mode="RGB"):
+    Image.new(mode, size, color).save(path)
+    return str(path)
+
+
+def test_decoded_once_and_shared(tmp_path):
+    cache = AssetCache()
+    path = _save(tmp_path / "base.png", (255, 0, 0))
+    first = cache.get(path)
+    assert first.mode == "RGBA" and first.getpixel((0, 0)) == (255, 0, 0, 255)
+    # 相对路径与绝对路径是同一个条目
+    assert cache.get(os.path.relpath(path)) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.current_bytes == 20 * 10 * 4
+
+
+def test_modified_file_is_reloaded(tmp_path):
+    cache = AssetCache()
+    path = _save(tmp_path / "base.png", (255, 0, 0))
+    cache.get(path)
+    _save(path, (0, 255, 0), size=(30, 10))
+    os.utime(path, ns=(1, 1))
+    img = cache.get(path)
+    assert img.getpixel((0, 0)) == (0, 255, 0, 255)
+    assert len(cache) == 1 and cache.current_bytes == 30 * 10 * 4
+
+
+def test_lru_eviction_within_budget(tmp_path):
+    cache = AssetCache(max_bytes=2 * 20 * 10 * 4)
+    a, b, c = (_save(tmp_path / f"{name}.png", (0, 0, 0)) for name in "abc")
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)
+    cache.get(c)
+    # b 最久未使用，被淘汰
+    assert len(cache) == 2 and cache.current_bytes <= cache.max_bytes
+    misses = cache.misses
+    cache.get(a)
+    cache.get(c)
+    assert cache.misses == misses
+    cache.get(b)
+    assert cache.misses == misses + 1
+    # 超出预算的单张图片不缓存
+    big = _save(tmp_path / "big.png", (0, 0, 0), size=(100, 100))
+    assert cache.get(big).size == (100, 100)
+    assert len(cache) == 2 and cache.current_bytes <= cache.max_bytes
+
+
+def test_composite_and_optional(tmp_path):
+    cache = AssetCache()
+    base = _save(tmp_path / "base.png", (255, 0, 0))
+    overlay = Image.new("RGBA", (20, 10), (0, 0, 0, 0))
+    overlay.paste((0, 0, 255, 255), (0, 0, 5, 10))
+    overlay.save(tmp_path / "overlay.png")
+    composite = cache.get_composite(base, str(tmp_path / "overlay.png"))
+    assert composite.getpixel((0, 0)) == (0, 0, 255, 255)
+    assert composite.getpixel((10, 0)) == (255, 0, 0, 255)
+    assert cache.get(base).getpixel((0, 0)) == (255, 0, 0, 255)
+    assert cache.get_composite(base, str(tmp_path / "overlay.png")) is composite
+
+    assert cache.get_optional(str(tmp_path / "missing.png")) is None
+    assert cache.get_optional(None) is None
+    with pytest.raises(FileNotFoundError):
+        cache.get(str(tmp_path / "missing.png"))
+    cache.preload([str(tmp_path / "missing.png"), base])
+    cache.clear()
+    assert len(cache) == 0 and cache.current_bytes == 0
@@ -0,0 +1,61 @@
+# filename: tests/test_batch_render.py
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from batch_render import BatchItem, read_items, run_batch
+
+
+def _write_inputs(tmp_path):
+    Image.new("RGB", (60, 40), (0, 128, 255)).save(tmp_path / "cat.png")
+    lines = [
+        json.dumps({"text": "今天也要【好好画画】哦！", "expression": "开心", "output": "named/first.png"}),
+        "",
+        json.dumps({"image": "cat.png", "expression": "#生气#"}),
+        "not json",
+        json.dumps({"text": "两个都给", "image": "cat.png"}),
+        json.dumps({"image": "missing.png"}),
+        json.dumps(["不是对象"]),
+        json.dumps({"text": "#无语#关键词也能切换差分"}),
+    ]
+    path = tmp_path / "items.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_read_items_reports_bad_lines():
+    items = list(read_items(io.StringIO('{"text": "a"}\n\n[1]\n{bad\n')))
+    assert [item.line for item in items] == [1, 3, 4]
+    assert items[0] == BatchItem(1, {"text": "a"})
+    assert items[1].record is None and "JSON 对象" in items[1].error
+    assert items[2].record is None and "JSON" in items[2].error
+
+
+@pytest.mark.parametrize("workers", [0, 2], ids=["in-process", "pool"])
+def test_results_in_input_order_and_failures_isolated(tmp_path, workers):
+    path = _write_inputs(tmp_path)
+    out = tmp_path / f"out-{workers}"
+    with open(path, encoding="utf-8") as stream:
+        results = list(run_batch(read_items(stream), workers, "fast", str(tmp_path), str(out), max_pending=2))
+    assert [r.line for r in results] == [1, 3, 4, 5, 6, 7, 8]
+    assert [r.ok for r in results] == [True, True, False, False, False, False, True]
+    assert "ValueError" in results[3].error and "FileNotFoundError" in results[4].error
+    assert results[0].output == str(tmp_path / "named" / "first.png")
+    assert results[1].output == str(out / "000003.png")
+    for result in results:
+        if result.ok:
+            with Image.open(result.output) as img:
+                assert img.format == "PNG"
+            assert result.bytes == len(open(result.output, "rb").read())
+
+
+def test_pool_output_matches_in_process(tmp_path):
+    path = _write_inputs(tmp_path)
+    outputs = {}
+    for workers in (0, 2):
+        with open(path, encoding="utf-8") as stream:
+            results = run_batch(read_items(stream), workers, "fast", str(tmp_path), str(tmp_path / f"out-{workers}"))
+            outputs[workers] = [open(r.output, "rb").read() for r in results if r.ok and "named" not in r.output]
+    assert outputs[0] == outputs[2] and len(outputs[0]) == 2
@@ -0,0 +1,90 @@
+# filename: tests/test_clipboard_wait.py
+import time
+
+import pytest
+from PIL import Image
+
+import main
+from adapters.headless_adapter import HeadlessAdapter
+from clipboard_wait import AdaptiveClipboardWait
+
+
+def _lands_after(delay, value="剪切的文字"):
+    """模拟剪贴板：delay 秒后 read() 返回 value，之前返回空字符串"""
+    start = time.perf_counter()
+    return lambda: value if time.perf_counter() - start >= delay else ""
+
+
+def test_returns_as_soon_as_the_clipboard_changes():
+    waiter = AdaptiveClipboardWait(min_timeout=0.5, max_timeout=1.0)
+    value, waited = waiter.wait_for_change(_lands_after(0.03), "", "chat")
+    assert value == "剪切的文字"
+    assert 0.03 <= waited < 0.2
+    assert waiter.stats()["chat"]["count"] == 1
+
+
+def test_times_out_after_min_timeout_without_samples():
+    waiter = AdaptiveClipboardWait(min_timeout=0.05, max_timeout=1.0)
+    assert waiter.timeout_for("chat") == 0.05
+    value, waited = waiter.wait_for_change(_lands_after(10), "", "chat")
+    assert value == ""
+    assert 0.05 <= waited < 0.2
+    # 超时不留下样本，下次仍使用 min_timeout
+    assert waiter.stats() == {}
+    assert waiter.timeout_for("chat") == 0.05
+
+
+def test_timeout_adapts_per_app_and_is_clamped():
+    waiter = AdaptiveClipboardWait(min_timeout=0.1, max_timeout=1.0)
+    waiter.record("slow", 0.2)
+    waiter.record("fast", 0.01)
+    assert waiter.timeout_for("slow") == pytest.approx(0.6)
+    assert waiter.timeout_for("fast") == 0.1
+    assert waiter.timeout_for("other") == 0.1
+    waiter.record("slow", 5.0)
+    assert waiter.timeout_for("slow") == 1.0
+
+
+def test_done_stops_the_wait_early():
+    waiter = AdaptiveClipboardWait(min_timeout=1.0, max_timeout=1.0)
+    start = time.perf_counter()
+    value, waited = waiter.wait_for_change(lambda: "", "", "chat", done=lambda: time.perf_counter() - start > 0.02)
+    assert value == "" and waited < 0.2
+    assert waiter.stats() == {}
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    adapter = HeadlessAdapter()
+    monkeypatch.setattr(main, "os_adapter", adapter)
+    monkeypatch.setattr(main, "clipboard_waiter", AdaptiveClipboardWait(min_timeout=0.05, max_timeout=0.3))
+    adapter.set_clipboard_text("原来的剪贴板")
+    return adapter
+
+
+def test_cut_text_is_returned_and_clipboard_restored(adapter):
+    adapter.cut_latency = 0.02
+    adapter.set_input("输入框里的文字")
+    assert main.cut_all_and_get_text() == "输入框里的文字"
+    assert adapter.get_clipboard_text() == "原来的剪贴板"
+    assert main.clipboard_waiter.stats()["headless"]["count"] == 1
+
+
+def test_slow_cut_falls_back_to_a_final_read(adapter):
+    # 剪切结果晚于超时才出现：等待结束后再读一次剪贴板，仍然没有就返回空字符串
+    adapter.cut_latency = 0.5
+    adapter.set_input("来得太晚的文字")
+    start = time.perf_counter()
+    assert main.cut_all_and_get_text() == ""
+    assert time.perf_counter() - start < 0.3
+    assert main.clipboard_waiter.stats() == {}
+
+
+def test_empty_input_and_image_cut_do_not_wait(adapter):
+    start = time.perf_counter()
+    assert main.cut_all_and_get_text() == ""
+    adapter.set_input(Image.new("RGBA", (8, 8), (255, 0, 0, 255)))
+    assert main.cut_all_and_get_text() == ""
+    assert time.perf_counter() - start < 0.05
+    # 剪切出的图片留在剪贴板中，不被原来的文字覆盖
+    assert adapter.try_get_image() is not None
@@ -0,0 +1,167 @@
+# filename: tests/test_compositing.py
+import gc
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from asset_cache import AssetCache
+from compositing import OverlayIndex, OverlayIndexCache, clamp_rect, render_region, resolve_layers
+from image_fit_paste import render_image_auto
+from text_fit_draw import render_text_auto
+
+SIZE = (300, 200)
+
+
+def _noise(mode, seed):
+    """每个像素都不同的底图，贴错位置或漏贴都会改变结果"""
+    rng = random.Random(seed)
+    bands = len(Image.new(mode, (1, 1)).getbands())
+    img = Image.frombytes(mode, SIZE, rng.randbytes(SIZE[0] * SIZE[1] * bands))
+    if mode == "P":
+        img.putpalette(rng.randbytes(768))
+    return img
+
+
+def _overlay(seed):
+    """大部分透明，含半透明与全不透明区域的置顶图层"""
+    rng = random.Random(seed)
+    overlay = Image.new("RGBA", SIZE, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for _ in range(8):
+        x, y = rng.randrange(SIZE[0]), rng.randrange(SIZE[1])
+        fill = (rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice([255, rng.randrange(1, 255)]))
+        draw.ellipse((x, y, x + rng.randint(5, 80), y + rng.randint(5, 60)), fill=fill)
+    return overlay
+
+
+def _shapes(seed, rect):
+    """rect 内的随机图形；留出线宽与文字的余量，保证所有着墨像素都在 rect 内（render_region 的约定）"""
+    rng = random.Random(seed)
+    l, t, r, b = rect
+    l, t, r, b = l + 2, t + 2, r - 40, b - 16
+    shapes = []
+    if l >= r or t >= b:
+        return shapes
+    for _ in range(6):
+        x0, y0 = rng.randint(l, r), rng.randint(t, b)
+        x1, y1 = rng.randint(x0, r), rng.randint(y0, b)
+        shapes.append(((x0, y0, x1, y1), tuple(rng.randrange(256) for _ in range(4))))
+    return shapes
+
+
+def _draw(img, shapes, ox=0, oy=0):
+    draw = ImageDraw.Draw(img)
+    for (x0, y0, x1, y1), fill in shapes:
+        fill = fill[:len(img.getbands())] if img.mode != "P" else fill[0]
+        draw.ellipse((x0 - ox, y0 - oy, x1 - ox, y1 - oy), fill=fill)
+        draw.line((x0 - ox, y1 - oy, x1 - ox, y0 - oy), fill=fill, width=3)
+        draw.text((x0 - ox, y0 - oy), "字Ag", fill=fill)
+
+
+def _full_canvas(base, overlay, shapes):
+    """改造前的做法：复制整张底图，绘制后整体叠加置顶图层"""
+    img = base.copy()
+    _draw(img, shapes)
+    if overlay is not None:
+        img.paste(overlay, (0, 0), overlay)
+    return img
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "RGB", "L", "P"])
+@pytest.mark.parametrize("with_overlay", [True, False], ids=["overlay", "no-overlay"])
+def test_render_region_matches_full_compositing(mode, with_overlay):
+    rng = random.Random(1)
+    for seed in range(15):
+        base = _noise(mode, seed)
+        original = base.tobytes()
+        overlay = _overlay(seed) if with_overlay else None
+        layers = resolve_layers(base, overlay)
+        # 矩形可以部分超出画布，也可以为空
+        l, t = rng.randint(-40, SIZE[0]), rng.randint(-40, SIZE[1])
+        rect = (l, t, l + rng.randint(0, 200), t + rng.randint(0, 150))
+        shapes = _shapes(seed, clamp_rect(rect, SIZE))
+        out = render_region(layers, rect, lambda crop, ox, oy: _draw(crop, shapes, ox, oy))
+        expected = _full_canvas(base, overlay, shapes)
+        assert out.mode == expected.mode and out.size == expected.size
+        assert out.tobytes() == expected.tobytes(), (mode, seed, rect)
+        # 调用方传入的图层不被修改
+        assert base.tobytes() == original
+
+
+def test_cached_static_composite_matches_full_compositing(tmp_path):
+    base, overlay = _noise("RGBA", 3), _overlay(3)
+    base.save(tmp_path / "base.png")
+    overlay.save(tmp_path / "overlay.png")
+    layers = resolve_layers(str(tmp_path / "base.png"), str(tmp_path / "overlay.png"), AssetCache())
+    assert layers.reusable_static is not None
+    shapes = _shapes(3, (20, 30, 200, 150))
+    out = render_region(layers, (20, 30, 200, 150), lambda crop, ox, oy: _draw(crop, shapes, ox, oy))
+    assert out.tobytes() == _full_canvas(base, overlay, shapes).tobytes()
+
+
+@pytest.mark.parametrize("text", ["今天也要【好好画画】哦！", "{b|粗体} and {red|红色} words " * 3])
+def test_render_text_auto_with_overlay(text):
+    base, overlay = _noise("RGBA", 4), _overlay(4)
+    plain = render_text_auto(base, (30, 40), (270, 170), text, max_font_height=48).image
+    expected = plain.copy()
+    expected.paste(overlay, (0, 0), overlay)
+    out = render_text_auto(base, (30, 40), (270, 170), text, max_font_height=48, image_overlay=overlay).image
+    assert out.tobytes() == expected.tobytes()
+
+
+def test_render_image_auto_with_overlay():
+    base, overlay = _noise("RGBA", 5), _overlay(5)
+    content = _noise("RGBA", 6).resize((120, 50))
+    plain = render_image_auto(base, (30, 40), (270, 170), content, allow_upscale=True).image
+    expected = plain.copy()
+    expected.paste(overlay, (0, 0), overlay)
+    out = render_image_auto(base, (30, 40), (270, 170), content, allow_upscale=True, image_overlay=overlay).image
+    assert out.tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "LA", "L"])
+def test_overlay_index_matches_masked_paste(mode):
+    overlay = _overlay(7).convert(mode) if mode != "L" else _overlay(7).getchannel("A")
+    index = OverlayIndex(overlay, tile=16)
+    dst_mode = "RGBA" if mode == "RGBA" else "L"
+    rng = random.Random(7)
+    for _ in range(20):
+        l, t = rng.randrange(SIZE[0]), rng.randrange(SIZE[1])
+        rect = clamp_rect((l, t, l + rng.randint(1, 150), t + rng.randint(1, 120)), SIZE)
+        base = _noise(dst_mode, rng.randrange(1000))
+        expected = base.crop(rect)
+        part = overlay.crop(rect)
+        expected.paste(part, (0, 0), part)
+        got = base.crop(rect)
+        index.composite(got, overlay, rect)
+        assert got.tobytes() == expected.tobytes(), (mode, rect)
+
+
+def test_overlay_index_skips_transparent_tiles():
+    overlay = Image.new("RGBA", SIZE, (0, 0, 0, 0))
+    overlay.paste((255, 0, 0, 255), (40, 40, 72, 72))
+    overlay.paste((0, 255, 0, 128), (200, 100, 210, 110))
+    index = OverlayIndex(overlay, tile=32)
+    assert index.bbox == (40, 40, 210, 110)
+    # 不透明方块与四个分块相交但没有盖满任何一块；半透明方块落在一个分块内
+    assert sorted(rect for rect, _ in index.tiles) == [(32, 32, 64, 64), (32, 64, 64, 96), (64, 32, 96, 64),
+                                                       (64, 64, 96, 96), (192, 96, 224, 128)]
+    assert not any(opaque for _, opaque in index.tiles)
+    assert OverlayIndex(Image.new("RGBA", SIZE, (0, 0, 0, 0))).tiles == []
+    # 全不透明分块直接覆盖，不需要蒙版
+    opaque = OverlayIndex(Image.new("RGBA", (64, 64), (1, 2, 3, 255)))
+    assert [rect for rect, _ in opaque.tiles] == [(0, 0, 32, 32), (32, 0, 64, 32), (0, 32, 32, 64), (32, 32, 64, 64)]
+    assert all(flag for _, flag in opaque.tiles)
+
+
+def test_overlay_index_cache_follows_the_overlay_object():
+    cache = OverlayIndexCache()
+    overlay = _overlay(8)
+    index = cache.get(overlay)
+    assert cache.get(overlay) is index
+    assert cache.get(overlay.copy()) is not index
+    del overlay
+    gc.collect()
+    # 图层被回收后条目随之失效
+    assert len(cache) == 0
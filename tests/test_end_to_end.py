@@ -0,0 +1,76 @@
+# filename: tests/test_end_to_end.py
+"""用无界面适配器端到端运行 main.Start()，检查连续触发时每次触发都被黏贴且顺序不变"""
+import pytest
+from PIL import Image
+
+import main
+from adapters.headless_adapter import HeadlessAdapter
+from clipboard_wait import AdaptiveClipboardWait
+from render_pipeline import RenderPipeline
+
+
+class RecordingAdapter(HeadlessAdapter):
+    """额外保存每次黏贴的图片数据，用于比较内容与顺序"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pasted = []
+
+    def _paste(self):
+        if self.clipboard_image is not None:
+            self.pasted.append(self.clipboard_image.data)
+        super()._paste()
+
+
+def _inputs():
+    """文字与图片交错（含连续的图片和切换差分的关键词），每个输入的渲染结果都不同"""
+    items = []
+    for i in range(24):
+        if i % 3 == 1 or i == 10:
+            items.append(Image.new("RGBA", (40 + i * 7, 30 + i * 3), (i * 10, 255 - i * 10, 80, 255)))
+        elif i == 12:
+            items.append(f"#开心#第 {i} 次触发")
+        else:
+            items.append(f"第 {i} 次触发【{'测试' * (i % 4 + 1)}】")
+    return items
+
+
+@pytest.fixture
+def run(monkeypatch):
+    monkeypatch.setattr(main, "os_adapter", None)
+    monkeypatch.setattr(main, "render_pipeline", None)
+    monkeypatch.setattr(main, "current_image_file", main.current_image_file)
+    monkeypatch.setattr(main, "clipboard_waiter", AdaptiveClipboardWait(main.DELAY, main.CLIPBOARD_TIMEOUT))
+
+    def run(inputs, background, image_processes=0, **latency):
+        adapter = RecordingAdapter(seed=0, **latency)
+        main.setup(adapter)
+        main.current_image_file = main.BASEIMAGE_FILE
+        if background:
+            main.render_pipeline = RenderPipeline(main.deliver_result, 4, image_processes).start()
+        try:
+            for content in inputs:
+                adapter.set_input(content)
+                main.Start()
+            assert adapter.wait_for_deliveries(len(inputs), timeout=20), \
+                f"只完成了 {len(adapter.deliveries)}/{len(inputs)} 次黏贴"
+        finally:
+            if main.render_pipeline is not None:
+                main.render_pipeline.stop()
+                main.render_pipeline = None
+        return adapter.pasted
+
+    return run
+
+
+@pytest.mark.parametrize("image_processes", [0, 2], ids=["thread", "process-pool"])
+def test_burst_delivers_every_trigger_in_order(run, image_processes):
+    inputs = _inputs()
+    # 同步模式逐次渲染并黏贴，作为每次触发应得的结果
+    expected = run(inputs, background=False)
+    assert len(set(expected)) == len(inputs)
+    # 后台流水线中连续触发，剪切结果延迟且带抖动地出现在剪贴板中
+    pasted = run(inputs, background=True, image_processes=image_processes, cut_latency=0.002, jitter=0.004)
+    assert len(pasted) == len(inputs)
+    for i, (got, want) in enumerate(zip(pasted, expected)):
+        assert got == want, f"第 {i} 次黏贴与第 {i} 次触发的渲染结果不同"
@@ -0,0 +1,63 @@
+# filename: tests/test_font_cache.py
+import gc
+import weakref
+
+from PIL import ImageFont
+
+from font_cache import FontCache
+
+
+def test_same_font_object_per_path_and_size():
+    cache = FontCache()
+    font = cache.get(None, 20)
+    assert cache.get(None, 20) is font
+    assert cache.get(None, 21) is not font
+    # 不存在的路径回退到同一个后备字体条目
+    assert cache.get("no/such/font.ttf", 20) is font
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 2}
+    if isinstance(font, ImageFont.FreeTypeFont):
+        assert font.size == 20
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 0}
+
+
+def test_lru_eviction():
+    cache = FontCache(max_entries=2)
+    a = cache.get(None, 10)
+    cache.get(None, 11)
+    cache.get(None, 10)
+    cache.get(None, 12)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(None, 10) is a
+    misses = cache.misses
+    cache.get(None, 11)
+    assert cache.misses == misses + 1
+
+
+def test_advance_tables_per_font_and_mode():
+    cache = FontCache()
+    font = cache.get(None, 16)
+    table = cache.advance_table(font)
+    assert cache.advance_table(font) is table
+    assert cache.advance_table(font, "1") is not table
+    assert cache.advance_table(cache.get(None, 17)) is not table
+
+
+def test_evicted_fonts_and_tables_are_released():
+    cache = FontCache(max_entries=2)
+    refs = []
+    for size in range(10, 30):
+        font = cache.get(None, size)
+        table = cache.advance_table(font)
+        assert cache.advance_table(font) is table
+        refs.append(weakref.ref(font))
+    del font, table
+    gc.collect()
+    # 只有缓存中的两个字体及其宽度表还活着
+    assert sum(ref() is not None for ref in refs) == 2
+    assert len(cache._tables) == 2
+    # 已淘汰的字体仍可测量，只是宽度表不再保存
+    evicted = cache.get(None, 10)
+    cache.get(None, 11)
+    cache.get(None, 12)
+    assert cache.advance_table(evicted) is not cache.advance_table(evicted)
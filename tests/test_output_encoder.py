@@ -0,0 +1,87 @@
+# filename: tests/test_output_encoder.py
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+import output_encoder
+from output_encoder import ENCODER_FORMATS, RenderedImage, encode_for_clipboard, encode_rendered
+from png_encoder import IncrementalPNGEncoder
+
+
+def _rendered():
+    img = Image.new("RGBA", (80, 50), (255, 255, 255, 255))
+    ImageDraw.Draw(img).ellipse((10, 5, 70, 45), fill=(200, 30, 90, 255))
+    return RenderedImage(img)
+
+
+def _decode(data):
+    with Image.open(BytesIO(data)) as img:
+        return img.convert("RGBA")
+
+
+@pytest.mark.parametrize("profile", sorted(ENCODER_FORMATS))
+def test_profiles_are_lossless(profile, monkeypatch):
+    monkeypatch.setattr("output_encoder.small_quantize", False)
+    rendered = _rendered()
+    data = encode_rendered(rendered, profile)
+    with Image.open(BytesIO(data)) as img:
+        assert img.format == ENCODER_FORMATS[profile]
+    assert _decode(data).tobytes() == rendered.image.tobytes()
+
+
+def test_unknown_profile_raises():
+    with pytest.raises(ValueError):
+        encode_rendered(_rendered(), "nope")
+
+
+def test_clipboard_format_follows_preference_order():
+    rendered = _rendered()
+    payload = encode_for_clipboard(rendered, ("webp", "dib", "png"), "fast")
+    assert payload.format == "dib" and payload.size == rendered.image.size
+    payload = encode_for_clipboard(rendered, ("rgba",))
+    assert payload.data == rendered.image.tobytes()
+    with pytest.raises(ValueError):
+        encode_for_clipboard(rendered, ("webp",))
+
+
+def test_payload_carries_its_own_encode_summary():
+    # 日志使用结果自带的方案与大小，不读取全局统计（其他触发可能已经覆盖了它）
+    rendered = _rendered()
+    png = encode_for_clipboard(rendered, ("png",), "fast")
+    dib = encode_for_clipboard(rendered, ("dib",))
+    assert png.encoder == "fast" and dib.encoder == "dib"
+    assert png.encode_ms >= 0 and dib.encode_ms >= 0
+    assert png.summary().startswith("fast: ")
+    assert png.summary().endswith(f"{len(png.data) / 1024:.1f} KB")
+    assert _decode(png.data).tobytes() == rendered.image.tobytes()
+
+
+def test_stats_recorded_per_profile(monkeypatch):
+    monkeypatch.setattr(output_encoder, "encode_stats", {})
+    rendered = _rendered()
+    for profile in ("fast", "fast", "small"):
+        data = encode_rendered(rendered, profile)
+    stats = output_encoder.encode_stats
+    assert stats["fast"]["count"] == 2 and stats["small"]["count"] == 1
+    assert stats["small"]["last_bytes"] == len(data) == stats["small"]["total_bytes"]
+    assert stats["fast"]["total_ms"] >= stats["fast"]["last_ms"] >= 0
+
+
+def test_small_profile_quantizes_to_a_palette(monkeypatch):
+    monkeypatch.setattr("output_encoder.small_quantize", True)
+    with Image.open(BytesIO(encode_rendered(_rendered(), "small"))) as img:
+        assert img.format == "PNG" and img.mode == "P"
+        assert img.size == (80, 50)
+
+
+def test_png_encoders_override_reuses_static_rows():
+    static = _rendered().image
+    img = static.copy()
+    ImageDraw.Draw(img).rectangle((0, 40, 79, 49), fill=(0, 0, 255, 255))
+    encoders = {"default": IncrementalPNGEncoder(), "fast": IncrementalPNGEncoder(compress_level=1)}
+    for _ in range(2):
+        data = encode_rendered(RenderedImage(img, static, 40), "fast", encoders)
+        assert _decode(data).tobytes() == img.tobytes()
+    assert (encoders["fast"].misses, encoders["fast"].hits) == (1, 1)
+    assert encoders["default"].misses == encoders["default"].hits == 0
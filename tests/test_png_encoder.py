@@ -0,0 +1,49 @@
+# filename: tests/test_png_encoder.py
+import random
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from png_encoder import IncrementalPNGEncoder
+
+
+def _static(mode, size=(97, 61), seed=0):
+    """带渐变与随机色块的静态图，保证各行内容不同"""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize(size).convert(mode)
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        fill = tuple(rng.randrange(256) for _ in img.getbands())
+        draw.rectangle((x, y, x + rng.randint(1, 20), y + rng.randint(1, 10)), fill=fill)
+    return img
+
+
+def _decode(data):
+    with Image.open(BytesIO(data)) as img:
+        img.load()
+        return img
+
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+def test_incremental_png_decodes_to_identical_pixels(mode):
+    static = _static(mode)
+    encoder = IncrementalPNGEncoder()
+    for rows in [0, 1, 30, static.height - 1, static.height]:
+        img = static.copy()
+        if rows < img.height:
+            # 只修改静态行以下的内容
+            ImageDraw.Draw(img).rectangle((5, rows, 60, img.height - 1), fill=(255,) * len(img.getbands()))
+        for _ in range(2):
+            decoded = _decode(encoder.encode(img, static, rows))
+            assert decoded.mode == mode and decoded.size == img.size
+            assert decoded.tobytes() == img.tobytes()
+    # 每个静态行数只压缩一次前缀（rows 为 0 时不使用前缀）
+    assert encoder.misses == 4 and encoder.hits == 4
+
+
+def test_unsupported_mode_falls_back_to_pillow():
+    img = _static("RGB").convert("P")
+    decoded = _decode(IncrementalPNGEncoder().encode(img, img, 10))
+    assert decoded.convert("RGB").tobytes() == img.convert("RGB").tobytes()
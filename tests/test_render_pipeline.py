@@ -0,0 +1,93 @@
+# filename: tests/test_render_pipeline.py
+import queue
+import threading
+import time
+
+import pytest
+
+from render_pipeline import RenderJob, RenderPipeline
+
+
+def _slow_render(job):
+    """越早提交的任务渲染越慢，图片任务在进程池中并行时完成顺序与提交顺序相反"""
+    time.sleep(job.kwargs["delay"])
+    if job.kwargs.get("fail"):
+        raise ValueError(f"任务 {job.trigger} 失败")
+    return job.trigger
+
+
+def _jobs(n, kinds=("text",)):
+    return [RenderJob(kinds[i % len(kinds)], {"delay": (n - i) * 0.003, "fail": i % 5 == 3}, trigger=i)
+            for i in range(n)]
+
+
+class Recorder:
+    def __init__(self):
+        self.delivered = []
+        self.threads = set()
+
+    def __call__(self, job, result, error):
+        self.threads.add(threading.current_thread().name)
+        self.delivered.append((job.trigger, result, None if error is None else str(error)))
+
+
+def _expected(jobs):
+    return [(j.trigger, None, f"任务 {j.trigger} 失败") if j.kwargs["fail"] else (j.trigger, j.trigger, None)
+            for j in jobs]
+
+
+@pytest.mark.parametrize("image_processes", [0, 3], ids=["thread", "process-pool"])
+def test_results_are_delivered_in_submission_order(image_processes):
+    jobs = _jobs(20, kinds=("text", "image", "image"))
+    deliver = Recorder()
+    pipeline = RenderPipeline(deliver, max_queue=4, image_processes=image_processes, render=_slow_render).start()
+    for job in jobs:
+        pipeline.submit(job)
+    assert pipeline.wait_idle(timeout=10)
+    pipeline.stop()
+    # 渲染失败的任务也按顺序投递（result 为 None），不影响后面的任务
+    assert deliver.delivered == _expected(jobs)
+    assert deliver.threads == {"render-deliver"}
+
+
+def test_submit_does_not_block_on_rendering():
+    release = threading.Event()
+
+    def blocked_render(job):
+        release.wait()
+        return job.trigger
+
+    deliver = Recorder()
+    pipeline = RenderPipeline(deliver, max_queue=2, render=blocked_render).start()
+    start = time.perf_counter()
+    pipeline.submit(RenderJob("text", {}, trigger=0))
+    assert time.perf_counter() - start < 0.5
+    assert not pipeline.wait_idle(timeout=0.05)
+    # 渲染线程卡住时队列有上限：填满后 submit 等待，超时抛出 queue.Full
+    for i in range(1, 5):
+        try:
+            pipeline.submit(RenderJob("text", {}, trigger=i), timeout=0.05)
+        except queue.Full:
+            break
+    else:
+        pytest.fail("队列没有上限")
+    release.set()
+    assert pipeline.wait_idle(timeout=5)
+    pipeline.stop()
+    assert [trigger for trigger, _, _ in deliver.delivered] == list(range(i))
+
+
+def test_deliver_errors_do_not_stop_the_pipeline():
+    delivered = []
+
+    def deliver(job, result, error):
+        if job.trigger == 1:
+            raise RuntimeError("剪贴板不可用")
+        delivered.append(job.trigger)
+
+    pipeline = RenderPipeline(deliver, render=lambda job: job.trigger).start()
+    for i in range(4):
+        pipeline.submit(RenderJob("text", {}, trigger=i))
+    assert pipeline.wait_idle(timeout=5)
+    pipeline.stop()
+    assert delivered == [0, 2, 3]
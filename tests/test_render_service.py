@@ -0,0 +1,86 @@
+# filename: tests/test_render_service.py
+import asyncio
+import json
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import render_service
+from render_service import HTTPError, RenderService
+from renderer import SketchbookRenderer
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # 不启动进程池：run_in_executor 使用默认线程池，在本进程的渲染器上执行 render_request
+    monkeypatch.setattr(render_service, "_renderer", SketchbookRenderer(encoder="fast"))
+    return RenderService(workers=1, max_queue=0, encoder="fast")
+
+
+def _request(service, method, target, body=b""):
+    return asyncio.run(service.handle_request(method, target, body))
+
+
+def _status(service, method, target, body=b""):
+    with pytest.raises(HTTPError) as info:
+        _request(service, method, target, body)
+    return info.value.status
+
+
+def _png_header(width, height):
+    """只有 IHDR 的 PNG：打开时即可读到尺寸，不需要真的分配这么多像素"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IEND", b"")
+
+
+def test_render_text_and_image(service):
+    status, headers, body = _request(service, "POST", "/render/text", json.dumps({"text": "你好【世界】"}).encode())
+    assert status == 200 and headers["Content-Type"] == "image/png"
+    with Image.open(BytesIO(body)) as img:
+        assert img.format == "PNG"
+    upload = BytesIO()
+    Image.new("RGB", (40, 30), (10, 200, 30)).save(upload, "PNG")
+    status, _, body = _request(service, "POST", "/render/image", upload.getvalue())
+    assert status == 200 and body.startswith(b"\x89PNG")
+    assert service.completed == 2 and service.inflight == 0
+
+
+@pytest.mark.parametrize("target, body", [
+    ("/render/text", b"not json"),
+    ("/render/text", b'{"text": 1}'),
+    ("/render/text", b'{"text": "x", "expression": 2}'),
+    ("/render/text", b'{"text": "x", "expression": "no-such-expression"}'),
+    ("/render/image", b""),
+    ("/render/image", b"not an image"),
+])
+def test_bad_requests_are_400(service, target, body):
+    assert _status(service, "POST", target, body) == 400
+
+
+def test_decompression_bomb_is_413(service):
+    # 像素数超过 Image.MAX_IMAGE_PIXELS 的两倍时 Pillow 抛出 DecompressionBombError
+    side = int((2 * Image.MAX_IMAGE_PIXELS) ** 0.5) + 1
+    assert _status(service, "POST", "/render/image", _png_header(side, side)) == 413
+    assert service.inflight == 0
+
+
+def test_routing_errors(service):
+    assert _status(service, "GET", "/nope") == 404
+    assert _status(service, "GET", "/render/text") == 405
+    assert _status(service, "POST", "/health") == 405
+    status, _, body = _request(service, "GET", "/health")
+    assert status == 200 and json.loads(body)["max_inflight"] == 1
+
+
+def test_full_queue_is_503(service):
+    service.inflight = service.max_inflight
+    assert _status(service, "POST", "/render/text", b'{"text": "x"}') == 503
+    assert service.rejected == 1
+    service.avg_render = 0.5
+    service.inflight = 5
+    assert service.retry_after() == 3
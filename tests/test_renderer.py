@@ -0,0 +1,99 @@
+# filename: tests/test_renderer.py
+import threading
+import zipfile
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import config
+from renderer import RendererConfig, SketchbookRenderer
+from text_fit_draw import render_text_auto
+
+TEXTS = ["今天也要【好好画画】哦！", "{b|粗体} plain words " * 4, "#开心#切换差分", "短"]
+
+
+def test_matches_direct_render():
+    renderer = SketchbookRenderer()
+    cfg = renderer.config
+    expected = render_text_auto(config.BASEIMAGE_FILE, cfg.top_left, cfg.bottom_right, TEXTS[0],
+                                max_font_height=cfg.max_font_height, font_path=cfg.font_path,
+                                image_overlay=cfg.overlay).image
+    assert renderer.render_text(TEXTS[0], encode=False).tobytes() == expected.tobytes()
+    with Image.open(BytesIO(renderer.render_text(TEXTS[0]))) as img:
+        assert img.convert(expected.mode).tobytes() == expected.tobytes()
+
+
+def test_resolve_expression():
+    renderer = SketchbookRenderer()
+    expressions = renderer.config.expressions
+    assert renderer.resolve_expression("开心", "文字") == (expressions["#开心#"], "文字")
+    assert renderer.resolve_expression("#开心#") == (expressions["#开心#"], None)
+    assert renderer.resolve_expression(None, "#生气# 文字") == (expressions["#生气#"], "文字")
+    assert renderer.resolve_expression(None, "文字") == (renderer.config.base_image, "文字")
+    with pytest.raises(ValueError):
+        renderer.resolve_expression("不存在")
+    with pytest.raises(ValueError):
+        SketchbookRenderer(encoder="nope")
+    cfg = SketchbookRenderer(RendererConfig(max_font_height=20), color=(255, 0, 0)).config
+    assert (cfg.max_font_height, cfg.color) == (20, (255, 0, 0))
+
+
+def test_instances_do_not_share_caches():
+    a, b = SketchbookRenderer(), SketchbookRenderer()
+    a.render_text(TEXTS[0])
+    a.render_text(TEXTS[0])
+    stats_a, stats_b = a.stats(), b.stats()
+    assert (stats_a["layouts"]["hits"], stats_a["layouts"]["misses"]) == (1, 1)
+    assert (stats_b["layouts"]["hits"], stats_b["layouts"]["misses"]) == (0, 0)
+    assert stats_b["fonts"]["entries"] == 0 and len(b.assets) == 0
+    a.clear()
+    assert a.stats()["fonts"]["entries"] == 0 and len(a.assets) == 0
+    # 清空后重新排版
+    a.render_text(TEXTS[0])
+    assert a.layouts.misses == 2
+
+
+def test_concurrent_renders_match_serial():
+    expected = [SketchbookRenderer().render_text(text) for text in TEXTS]
+    renderer = SketchbookRenderer()
+    results, errors = {}, []
+
+    def worker(i):
+        try:
+            for _ in range(3):
+                for j, text in enumerate(TEXTS):
+                    results.setdefault((i, j), set()).add(renderer.render_text(text))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    for (_, j), outputs in results.items():
+        assert outputs == {expected[j]}
+
+
+def test_all_expressions_share_one_layout():
+    renderer = SketchbookRenderer(encoder="fast")
+    text = "#开心#今天也要【好好画画】哦！"
+    images = renderer.render_all_expressions(text, max_workers=3)
+    names = [keyword.strip("#") for keyword in renderer.config.expressions]
+    assert list(images) == names
+    # 排版只计算一次，其余差分直接命中
+    assert renderer.layouts.misses == 1 and renderer.layouts.hits == len(names) - 1
+    single = SketchbookRenderer(encoder="fast")
+    for name in names:
+        assert images[name] == single.render_text("今天也要【好好画画】哦！", name), name
+
+
+def test_expressions_to_zip():
+    renderer = SketchbookRenderer(encoder="lossless-webp")
+    images = renderer.render_all_expressions("打包")
+    with zipfile.ZipFile(BytesIO(renderer.expressions_to_zip(images))) as zf:
+        assert zf.namelist() == [f"{name}.webp" for name in images]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+        assert [zf.read(f"{name}.webp") for name in images] == list(images.values())
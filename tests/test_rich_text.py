@@ -0,0 +1,62 @@
+# filename: tests/test_rich_text.py
+from rich_text import Style, parse_rich_text
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+
+def styles(text):
+    """把解析结果展开为 [(片段文本, 样式), ...]"""
+    rich = parse_rich_text(text)
+    return [(rich.plain[s:e], style) for s, e, style in rich.spans]
+
+
+def test_plain_text_is_one_span():
+    assert styles("你好 world") == [("你好 world", Style())]
+
+
+def test_nested_specs_inner_overrides_outer():
+    assert styles("{red|a{b|b{blue|c}d}e}") == [
+        ("a", Style(RED)),
+        ("b", Style(RED, True)),
+        ("c", Style(BLUE, True)),
+        ("d", Style(RED, True)),
+        ("e", Style(RED)),
+    ]
+
+
+def test_combined_spec():
+    assert styles("{b,#ff0000|x}") == [("x", Style(RED, True))]
+
+
+def test_unmatched_close_brace_is_literal():
+    assert parse_rich_text("a}b").plain == "a}b"
+    assert styles("{red|x}}") == [("x", Style(RED)), ("}", Style())]
+
+
+def test_unclosed_spec_runs_to_end():
+    assert styles("a{red|bc") == [("a", Style()), ("bc", Style(RED))]
+
+
+def test_unknown_spec_is_literal_with_its_close_brace():
+    assert styles("{nosuchcolor|x}") == [("{nosuchcolor|x}", Style())]
+    # 内层无法识别的设置不影响外层样式，它的 } 也按普通文字显示
+    assert styles("{red|{zz|x}y}") == [("{zz|x}y", Style(RED))]
+
+
+def test_brackets_keep_bracket_style():
+    assert styles("a【b】c") == [("a", Style()), ("【b】", Style(bracket=True)), ("c", Style())]
+
+
+def test_bracket_state_carries_across_lines():
+    rich = parse_rich_text("a[b\nc]d")
+    assert rich.plain == "a[b\nc]d"
+    assert [(rich.plain[s:e], style.bracket) for s, e, style in rich.spans] == [("a", False), ("[b\nc]", True),
+                                                                               ("d", False)]
+    # 按行切分样式区间
+    assert [(rich.plain[s:e], style.bracket) for s, e, style in rich.runs(4, 7)] == [("c]", True), ("d", False)]
+
+
+def test_explicit_color_inside_brackets():
+    assert styles("[{red|x}]") == [("[", Style(bracket=True)), ("x", Style(RED, bracket=True)),
+                                   ("]", Style(bracket=True))]
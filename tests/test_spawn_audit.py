@@ -0,0 +1,52 @@
+# filename: tests/test_spawn_audit.py
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import main
+import spawn_audit
+from adapters.headless_adapter import HeadlessAdapter
+
+
+def _spawn():
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+
+def test_counts_spawns_and_tempfiles_from_any_thread():
+    with spawn_audit.track("t1") as counts:
+        _spawn()
+        worker = threading.Thread(target=_spawn)
+        worker.start()
+        worker.join()
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(path)
+    assert (counts.spawns, counts.tempfiles) == (2, 1)
+    # 离开 with 块后不再计数
+    _spawn()
+    assert counts.spawns == 2
+
+
+def test_same_trigger_shares_counts():
+    with spawn_audit.track(7) as outer:
+        with spawn_audit.track(7) as inner:
+            assert inner is outer
+            _spawn()
+        _spawn()
+        with spawn_audit.track() as separate:
+            pass
+    assert outer.spawns == 2 and separate.spawns == 0
+    assert repr(outer) == "子进程 2 个，临时文件 0 个"
+
+
+def test_headless_trigger_does_not_spawn(monkeypatch):
+    adapter = HeadlessAdapter()
+    monkeypatch.setattr(main, "os_adapter", adapter)
+    adapter.set_input("不需要子进程")
+    with spawn_audit.track("capture") as counts:
+        job = main.capture_job()
+        main.deliver_result(job, main.run_render_job(job))
+    assert counts.spawns == 0 and counts.tempfiles == 0
+    assert len(adapter.deliveries) == 1
@@ -0,0 +1,251 @@
+# filename: tests/test_text_fit_draw.py
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from asset_cache import AssetCache
+from font_cache import FontCache
+from text_fit_draw import (BOLD_STROKE, LayoutCache, SizeHints, _search_font_size, get_text_layout, layout_text,
+                           render_text_auto)
+
+TOP_LEFT, BOTTOM_RIGHT = (20, 30), (299, 205)
+REGION_W, REGION_H = BOTTOM_RIGHT[0] - TOP_LEFT[0], BOTTOM_RIGHT[1] - TOP_LEFT[1]
+COLOR, BRACKET_COLOR = (0, 0, 0), (128, 0, 128)
+WORDS = list("的一是了我不人在他有这个上们") + ["abc", "defg", "WAVE", "AV", "To", " ", " ", "\n"]
+
+
+def _load_font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size=size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def baseline_draw(base, text, max_font_height, align):
+    """改造前的 draw_text_auto（逐次 textlength 包行、从 1 开始二分字号、逐段绘制括号），只保留文字绘制部分"""
+    img = base.copy()
+    draw = ImageDraw.Draw(img)
+    (x1, y1), (x2, y2) = TOP_LEFT, BOTTOM_RIGHT
+
+    def wrap_lines(txt, font, max_w):
+        lines = []
+        for para in txt.splitlines() or [""]:
+            has_space = " " in para
+            units = para.split(" ") if has_space else list(para)
+            buf = ""
+            for u in units:
+                trial = u if not buf else (buf + " " + u if has_space else buf + u)
+                if draw.textlength(trial, font=font) <= max_w:
+                    buf = trial
+                else:
+                    if buf:
+                        lines.append(buf)
+                    if has_space and len(u) > 1:
+                        tmp = ""
+                        for ch in u:
+                            if draw.textlength(tmp + ch, font=font) <= max_w:
+                                tmp += ch
+                            else:
+                                if tmp:
+                                    lines.append(tmp)
+                                tmp = ch
+                        buf = tmp
+                    elif draw.textlength(u, font=font) <= max_w:
+                        buf = u
+                    else:
+                        lines.append(u)
+                        buf = ""
+            if buf != "":
+                lines.append(buf)
+            if para == "" and (not lines or lines[-1] != ""):
+                lines.append("")
+        return lines
+
+    def measure_block(lines, font):
+        ascent, descent = font.getmetrics()
+        line_h = int((ascent + descent) * 1.15)
+        max_w = max([int(draw.textlength(ln, font=font)) for ln in lines] + [0])
+        return max_w, max(line_h * max(1, len(lines)), 1), line_h
+
+    lo, hi = 1, min(REGION_H, max_font_height)
+    best_size, best_lines, best_line_h, best_block_h = 0, [], 0, 0
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        font = _load_font(mid)
+        lines = wrap_lines(text, font, REGION_W)
+        w, h, lh = measure_block(lines, font)
+        if w <= REGION_W and h <= REGION_H:
+            best_size, best_lines, best_line_h, best_block_h = mid, lines, lh, h
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    font = _load_font(best_size)
+
+    def segments(s, in_bracket):
+        segs, buf = [], ""
+        for ch in s:
+            if ch in "[【]】":
+                if buf:
+                    segs.append((buf, BRACKET_COLOR if in_bracket or ch in "]】" else COLOR))
+                    buf = ""
+                segs.append((ch, BRACKET_COLOR))
+                in_bracket = ch in "[【"
+            else:
+                buf += ch
+        if buf:
+            segs.append((buf, BRACKET_COLOR if in_bracket else COLOR))
+        return segs, in_bracket
+
+    y = y1 + (REGION_H - best_block_h) // 2
+    in_bracket = False
+    for ln in best_lines:
+        line_w = int(draw.textlength(ln, font=font))
+        x = {"left": x1, "center": x1 + (REGION_W - line_w) // 2, "right": x2 - line_w}[align]
+        segs, in_bracket = segments(ln, in_bracket)
+        for seg_text, seg_color in segs:
+            draw.text((x, y), seg_text, font=font, fill=seg_color)
+            x += int(draw.textlength(seg_text, font=font))
+        y += best_line_h
+    return img
+
+
+def random_text(rng, brackets):
+    """随机文字；brackets 为 True 时插入成对、不嵌套的括号（可跨行）"""
+    parts, open_ = [], None
+    for _ in range(rng.randint(1, 30)):
+        if brackets and rng.random() < 0.15:
+            if open_ is None:
+                open_ = rng.choice("[【")
+                parts.append(open_)
+            else:
+                parts.append("]" if open_ == "[" else "】")
+                open_ = None
+        parts.append(rng.choice(WORDS))
+    if open_:
+        parts.append("]" if open_ == "[" else "】")
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("brackets", [False, True], ids=["plain", "brackets"])
+def test_pixels_match_baseline(brackets):
+    base = Image.new("RGBA", (400, 300), (255, 255, 255, 255))
+    rng = random.Random(2)
+    for _ in range(60):
+        text = random_text(rng, brackets)
+        for align in ("left", "center", "right"):
+            expected = baseline_draw(base, text, 64, align)
+            rendered = render_text_auto(base, TOP_LEFT, BOTTOM_RIGHT, text, COLOR, 64, None, align,
+                                        bracket_color=BRACKET_COLOR)
+            assert rendered.image.tobytes() == expected.tobytes(), (text, align)
+
+
+@pytest.mark.parametrize("text", [
+    "{b|" + "粗体文字" * 12 + "}",
+    "{b|bold} words here and there " * 6,
+    "{b|左}",
+    "普通文字{b|加粗}普通文字" * 4,
+])
+@pytest.mark.parametrize("align", ["left", "center", "right"])
+def test_bold_stroke_stays_inside_region(text, align):
+    layout = layout_text(text, REGION_W, REGION_H, 64, None, align)
+    left, top, right, bottom = layout.ink_box
+    assert left >= 0 and right <= REGION_W
+    assert top >= 0 and bottom <= layout.block_h <= REGION_H
+    assert layout.top == BOLD_STROKE
+
+
+def test_bold_lines_measured_with_stroke():
+    # 含加粗片段的每一行加上两侧描边后都放得下
+    layout = layout_text("{b|" + "WAVE " * 30 + "}", REGION_W, REGION_H, 64, None)
+    font = _load_font(layout.font_size)
+    for line in layout.lines:
+        assert font.getlength(line) + 2 * BOLD_STROKE <= REGION_W
+    assert layout.block_h == layout.line_h * len(layout.lines) + 2 * BOLD_STROKE <= REGION_H
+
+
+def plain_bisection(fits, hi):
+    lo, best = 1, 0
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            best, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+def test_search_font_size_matches_bisection_for_any_guess():
+    hi = 64
+    for limit in range(0, hi + 1):
+        def fits(size):
+            return size <= limit
+        expected = plain_bisection(fits, hi)
+        for guess in [None, -3, 0, 1, limit - 1, limit, limit + 1, hi, hi + 5]:
+            assert _search_font_size(fits, hi, guess) == expected, (limit, guess)
+
+
+def test_size_hints_do_not_change_font_size():
+    # 共享的提示会被长度相近的文本反复采用；结果必须与不带提示（从 1 开始二分）时相同
+    rng = random.Random(5)
+    shared = SizeHints()
+    for _ in range(150):
+        text = random_text(rng, brackets=True)
+        hinted = layout_text(text, REGION_W, REGION_H, 64, None, hints=shared)
+        fresh = layout_text(text, REGION_W, REGION_H, 64, None, hints=SizeHints())
+        assert hinted == fresh, text
+    assert shared.renders == 150
+
+
+def test_cached_layout_equals_uncached():
+    rng = random.Random(7)
+    cache = LayoutCache()
+    texts = [random_text(rng, brackets=True) for _ in range(40)] + ["{b|粗体}与{red|红色}", ""]
+    for text in texts:
+        first = get_text_layout(text, REGION_W, REGION_H, 64, None, cache=cache, fonts=FontCache())
+        cached = get_text_layout(text, REGION_W, REGION_H, 64, None, cache=cache, fonts=FontCache())
+        uncached = layout_text(text, REGION_W, REGION_H, 64, None, fonts=FontCache(), hints=SizeHints())
+        assert first == cached == uncached, text
+    assert cache.hits == len(texts) and cache.misses == len(texts)
+
+
+def test_cached_render_pixels_equal_uncached():
+    base = Image.new("RGBA", (400, 300), (255, 255, 255, 255))
+    assets, fonts, layouts = AssetCache(), FontCache(), LayoutCache()
+    for text in ["今天也要【好好画画】哦！", "{b|粗体} plain words " * 4]:
+        uncached = render_text_auto(base, TOP_LEFT, BOTTOM_RIGHT, text, max_font_height=64, assets=AssetCache(),
+                                    fonts=FontCache(), layouts=LayoutCache()).image
+        for _ in range(2):
+            cached = render_text_auto(base, TOP_LEFT, BOTTOM_RIGHT, text, max_font_height=64, assets=assets,
+                                      fonts=fonts, layouts=layouts).image
+            assert cached.tobytes() == uncached.tobytes()
+    assert layouts.hits == 2
+
+
+def test_layout_cache_keys_and_eviction():
+    # 每个排版参数都是键的一部分：改变任意一个都重新排版，结果与不使用缓存时相同
+    cache = LayoutCache(max_entries=4)
+    text = "今天也要【好好画画】哦！ WAVE To"
+    variants = [dict(region_w=REGION_W), dict(region_w=REGION_W // 2), dict(region_h=REGION_H // 3),
+                dict(max_font_height=20), dict(align="right"), dict(line_spacing=0.5), dict(fontmode="1")]
+    for params in variants:
+        args = dict(region_w=REGION_W, region_h=REGION_H, max_font_height=64, align="center", line_spacing=0.15,
+                    fontmode="L")
+        args.update(params)
+        cached = get_text_layout(text, cache=cache, fonts=FontCache(), **args)
+        assert cached == layout_text(text, fonts=FontCache(), hints=SizeHints(), **args), params
+    assert cache.misses == len(variants) and cache.hits == 0
+    assert len(cache._entries) == 4
+    # 最早的条目已被淘汰，最近的仍命中
+    get_text_layout(text, REGION_W, REGION_H, 64, None, cache=cache)
+    get_text_layout(text, REGION_W, REGION_H, 64, None, fontmode="1", cache=cache)
+    assert cache.misses == len(variants) + 1 and cache.hits == 1
+
+
+def test_layout_reused_across_base_images():
+    # 排版与底图无关：切换差分（底图）时直接命中
+    layouts = LayoutCache()
+    for color in [(255, 255, 255, 255), (200, 230, 255, 255)]:
+        base = Image.new("RGBA", (400, 300), color)
+        render_text_auto(base, TOP_LEFT, BOTTOM_RIGHT, "切换差分", max_font_height=64, layouts=layouts)
+    assert (layouts.hits, layouts.misses) == (1, 1)
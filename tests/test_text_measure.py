@@ -0,0 +1,78 @@
+# filename: tests/test_text_measure.py
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont, features
+
+from text_measure import AdvanceTable, PrefixMeasurer, ShapedMeasurer
+
+# 含字偶距的拉丁字母组合、空格与中文
+ALPHABET = "AVTo WAVEyfi.,的一是了我不人在他有这个上们【】"
+
+
+def _font(size, layout_engine=ImageFont.Layout.BASIC):
+    return ImageFont.truetype("DejaVuSans.ttf", size=size, layout_engine=layout_engine)
+
+
+def _strings(seed, count=40):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 40))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("size", [9, 17, 32, 64])
+@pytest.mark.parametrize("mode", ["L", "1"])
+def test_length_matches_textlength(size, mode):
+    font = _font(size)
+    table = AdvanceTable(font, mode)
+    draw = ImageDraw.Draw(Image.new(mode, (1, 1)))
+    assert table.additive
+    for s in _strings(size):
+        assert table.length(s) == draw.textlength(s, font=font)
+
+
+@pytest.mark.parametrize("size", [13, 40])
+def test_prefix_measurer_matches_getlength(size):
+    font = _font(size)
+    table = AdvanceTable(font)
+    rng = random.Random(size)
+    for s in _strings(size):
+        width = table.measurer(s)
+        assert isinstance(width, PrefixMeasurer)
+        for _ in range(20):
+            a = rng.randint(0, len(s))
+            b = rng.randint(a, len(s))
+            expected = font.getlength(s[a:b])
+            assert width(a, b) == expected
+            limit = rng.uniform(0, size * 20)
+            assert width.fits(a, b, limit) == (expected <= limit)
+
+
+def _check_shaped(table, font, seed):
+    rng = random.Random(seed)
+    for s in _strings(seed):
+        width = table.measurer(s)
+        assert isinstance(width, ShapedMeasurer)
+        limits = [rng.uniform(0, font.size * 20) for _ in range(3)]
+        for _ in range(30):
+            a = rng.randint(0, len(s))
+            b = rng.randint(a, len(s))
+            expected = font.getlength(s[a:b])
+            assert width(a, b) == expected
+            limit = rng.choice(limits)
+            assert width.fits(a, b, limit) == (expected <= limit)
+
+
+def test_shaped_measurer_matches_getlength():
+    # 在 BASIC 布局上强制走整形路径，验证断行估计、倍增与二分的结果
+    font = _font(24)
+    table = AdvanceTable(font)
+    table.additive = False
+    _check_shaped(table, font, 1)
+
+
+@pytest.mark.skipif(not features.check("raqm"), reason="Pillow 未编译 RAQM 支持")
+def test_raqm_layout_uses_shaped_measurer():
+    font = _font(24, ImageFont.Layout.RAQM)
+    table = AdvanceTable(font)
+    assert not table.additive
+    _check_shaped(table, font, 2)
@@ -1,13 +1,378 @@
 # filename: text_fit_draw.py
-from io import BytesIO
-from typing import Tuple, Union, Literal , Optional ,List
+from typing import Callable, Iterator, NamedTuple, Tuple, Union, Literal , Optional ,List
+from collections import OrderedDict
+import threading
 from PIL import Image, ImageDraw, ImageFont
-import os
+from compositing import render_region, resolve_layers, union_rect
+from output_encoder import RenderedImage, encode_rendered
+from stage_timer import span
+from asset_cache import AssetCache
+from font_cache import FontCache, font_cache
+from text_measure import AdvanceTable, Measurer
+from rich_text import Style, parse_rich_text
 
 Align = Literal["left", "center", "right"]
 VAlign = Literal["top", "middle", "bottom"]
 
-def draw_text_auto(
+# 括号字符，绘制时各自成段
+_BRACKETS = frozenset("[]【】")
+
+# {b|文字} 的描边宽度（像素）；描边向四周各扩展这么多，含加粗片段的行在测量时计入
+BOLD_STROKE = 1
+
+def _search_font_size(fits: Callable[[int], bool], hi: int, guess: Optional[int] = None) -> int:
+    """
+    在 [1, hi] 中寻找满足 fits 的最大字号，找不到返回 0。
+    guess 只有在“guess 放得下、guess + 1 放不下”（或 guess 已是上限）时才被采用，只需两次试探；
+    否则按原来从 1 开始的二分搜索（fits 由调用方缓存，已试探过的字号不会重新包行）。
+    字宽与行高不随字号增大而减小时可行性是单调的，只有一个边界，采用的 guess 就是二分的结果。
+    """
+    if guess is not None and 1 <= guess <= hi and fits(guess) and (guess == hi or not fits(guess + 1)):
+        return guess
+    lo, best = 1, 0
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            best, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+class SizeHints:
+    """
+    字号提示与搜索统计：按 (字体, 区域, 字号上限, 行距, 字形模式) 记住最近文本长度对应的最终字号，
+    下次渲染长度相近的文本时先试探该字号。由 LayoutCache 持有，带锁，可在多个渲染线程中共享。
+    """
+
+    def __init__(self, max_per_key: int = 8):
+        self.max_per_key = max_per_key
+        # key -> [(文本长度, 最终字号), ...]，最近的在后
+        self._hints: dict = {}
+        self._lock = threading.Lock()
+        # 每次渲染的试探次数，用于评估搜索优化效果
+        self.renders = 0
+        self.probes = 0
+        self.last_probes = 0
+
+    def guess(self, key: tuple, text_len: int) -> Optional[int]:
+        """取长度最接近（相差不超过 25%）的历史文本所用字号"""
+        best = None
+        with self._lock:
+            for length, size in self._hints.get(key, ()):
+                diff = abs(length - text_len)
+                if diff <= max(1, text_len // 4) and (best is None or diff < best[0]):
+                    best = (diff, size)
+        return best[1] if best else None
+
+    def remember(self, key: tuple, text_len: int, size: int, probes: int) -> None:
+        with self._lock:
+            hints = [h for h in self._hints.get(key, []) if h[0] != text_len]
+            hints.append((text_len, size))
+            self._hints[key] = hints[-self.max_per_key:]
+            self.renders += 1
+            self.probes += probes
+            self.last_probes = probes
+
+    def stats(self) -> dict:
+        return {"renders": self.renders, "probes": self.probes, "last_probes": self.last_probes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hints.clear()
+            self.renders = self.probes = self.last_probes = 0
+
+
+class TextLayout(NamedTuple):
+    """
+    与底图无关的排版结果，可缓存复用。
+    坐标均相对于文字区域左上角；lines 为去掉样式标记后的显示文本，
+    runs 中每个片段为 (片段文本, 相对行首的 x 偏移, 样式)，同一行中相邻的同样式文字合并为一个片段，
+    括号字符单独成段（与原来逐段绘制括号的结果逐像素一致）。
+    """
+    font_size: int
+    lines: List[str]
+    line_h: int
+    block_h: int
+    line_x: List[int]
+    runs: List[List[Tuple[str, int, Style]]]
+    # 所有字形实际着墨范围 (左, 上, 右, 下)，纵坐标相对于文字块顶部
+    ink_box: Tuple[int, int, int, int]
+    # 第一行顶部相对于文字块顶部的偏移（有加粗片段时为描边留出的空间）
+    top: int = 0
+
+
+class LayoutCache:
+    """按排版参数缓存 TextLayout，条目数超出上限时淘汰最久未使用的；未命中时排版所用的字号提示也保存在这里"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, TextLayout]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.size_hints = SizeHints()
+
+    def get(self, key: tuple) -> Optional[TextLayout]:
+        with self._lock:
+            layout = self._entries.get(key)
+            if layout is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return layout
+
+    def put(self, key: tuple, layout: TextLayout) -> None:
+        with self._lock:
+            self._entries[key] = layout
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.size_hints.clear()
+
+
+# 全局共享的排版缓存
+layout_cache = LayoutCache()
+
+
+def _fontmode(mode: str) -> str:
+    """与 ImageDraw 对该图像模式选用的字形蒙版模式保持一致"""
+    return "1" if mode in ("1", "P", "I", "F") else "L"
+
+
+# --- 文本包行 ---
+# 行内片段都用段落中的 (起点, 终点) 下标表示，由测量器直接判断是否放得下，不再反复测量拼接后的字符串
+def _stroke_fits(width: Measurer, bold: List[int], base: int) -> Callable[[int, int, float], bool]:
+    """含加粗片段的行两侧各留出描边宽度；bold[i] 为 txt[:i] 中加粗的字数，base 为段落在 txt 中的起点"""
+    def fits(a: int, b: int, limit: float) -> bool:
+        if bold[base + b] > bold[base + a]:
+            limit -= 2 * BOLD_STROKE
+        return width.fits(a, b, limit)
+    return fits
+
+
+def _split_brackets(txt: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """把 txt[start:end] 切成括号字符与其间的文字，括号字符各自成段"""
+    s = start
+    for i in range(start, end):
+        if txt[i] in _BRACKETS:
+            if s < i:
+                yield s, i
+            yield i, i + 1
+            s = i + 1
+    if s < end:
+        yield s, end
+
+
+def _wrap_spans(txt: str, table: AdvanceTable, max_w: int,
+                bold: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+    """
+    包行，返回每行在 txt 中的 (起点, 终点)，按行切分样式区间时直接使用。
+    bold 为加粗字数的前缀和（见 _bold_prefix），没有加粗片段时为 None。
+    """
+    lines: List[Tuple[int, int]] = []
+    offset = 0
+    for chunk in txt.splitlines(True) or [""]:
+        para = chunk.splitlines()[0] if chunk else ""
+        base, offset = offset, offset + len(chunk)
+        has_space = (" " in para)
+        width = table.measurer(para)
+        fits = width.fits if bold is None else _stroke_fits(width, bold, base)
+        if has_space:
+            units, pos = [], 0
+            for word in para.split(" "):
+                units.append((pos, pos + len(word)))
+                pos += len(word) + 1
+        else:
+            units = [(i, i + 1) for i in range(len(para))]
+        bs = be = 0  # 当前行 buf = para[bs:be]
+
+        for us, ue in units:
+            # 与空 buf 拼接时不带空格，否则 buf 与 u 之间恰好隔一个空格（或直接相邻）
+            ts = us if bs == be else bs
+            if fits(ts, ue, max_w):
+                bs, be = ts, ue
+            else:
+                if bs != be:
+                    lines.append((base + bs, base + be))
+                if has_space and ue - us > 1:
+                    tmp_s = tmp_e = us
+                    for i in range(us, ue):
+                        if fits(i if tmp_s == tmp_e else tmp_s, i + 1, max_w):
+                            if tmp_s == tmp_e:
+                                tmp_s = i
+                            tmp_e = i + 1
+                        else:
+                            if tmp_s != tmp_e:
+                                lines.append((base + tmp_s, base + tmp_e))
+                            tmp_s, tmp_e = i, i + 1
+                    bs, be = tmp_s, tmp_e
+                else:
+                    if fits(us, ue, max_w):
+                        bs, be = us, ue
+                    else:
+                        lines.append((base + us, base + ue))
+                        bs = be = ue
+        if bs != be:
+            lines.append((base + bs, base + be))
+        if para == "" and (not lines or lines[-1][0] != lines[-1][1]):
+            lines.append((base, base))
+    return lines
+
+
+# --- 测量 ---
+def _bold_prefix(rich) -> Optional[List[int]]:
+    """显示文本中加粗字数的前缀和，没有加粗片段时返回 None（纯文本的测量不受影响）"""
+    if not any(style.bold for _, _, style in rich.spans):
+        return None
+    prefix = [0] * (len(rich.plain) + 1)
+    for s, e, style in rich.spans:
+        for i in range(s, e):
+            prefix[i + 1] = prefix[i] + (1 if style.bold else 0)
+    return prefix
+
+
+def _measure_block(lines: List[str], font: ImageFont.FreeTypeFont, table: AdvanceTable, line_spacing: float,
+                   bold_lines: Optional[List[bool]] = None) -> Tuple[int, int, int]:
+    """返回 (最大行宽, 文字块高度, 行高)；bold_lines 标记含加粗片段的行，其描边计入宽度与高度"""
+    ascent, descent = font.getmetrics()
+    line_h = int((ascent + descent) * (1 + line_spacing))
+    max_w = 0
+    for i, ln in enumerate(lines):
+        stroke = 2 * BOLD_STROKE if bold_lines and bold_lines[i] else 0
+        max_w = max(max_w, int(table.length(ln)) + stroke)
+    total_h = max(line_h * max(1, len(lines)), 1)
+    if bold_lines and any(bold_lines):
+        total_h += 2 * BOLD_STROKE
+    return max_w, total_h, line_h
+
+
+def layout_text(
+    text: str,
+    region_w: int,
+    region_h: int,
+    max_font_height: Optional[int] = None,
+    font_path: Optional[str] = None,
+    align: Align = "center",
+    line_spacing: float = 0.15,
+    fontmode: str = "L",
+    fonts: Optional[FontCache] = None,
+    hints: Optional[SizeHints] = None,
+) -> TextLayout:
+    """
+    计算 text 在 region_w x region_h 区域内的排版：选取最大可容纳字号、包行并计算每行及各着色片段的位置。
+    fonts 为字体缓存（宽度表也取自这里），hints 为字号提示，默认均为全局共享的对象。
+    """
+    if fonts is None:
+        fonts = font_cache
+    if hints is None:
+        hints = layout_cache.size_hints
+
+    def _load_font(size: int) -> ImageFont.FreeTypeFont:
+        return fonts.get(font_path, size)
+
+    # 样式标记只在这里解析一次，之后的包行与测量都针对显示文本
+    rich = parse_rich_text(text)
+    plain = rich.plain
+    bold = _bold_prefix(rich)
+
+    def bold_lines(spans: List[Tuple[int, int]]) -> Optional[List[bool]]:
+        return None if bold is None else [bold[e] > bold[s] for s, e in spans]
+
+    # --- 1. 搜索最大字号 ---
+    hi = min(region_h, max_font_height) if max_font_height else region_h
+    probes: dict = {}
+
+    def fits(size: int) -> bool:
+        probe = probes.get(size)
+        if probe is None:
+            font = _load_font(size)
+            table = fonts.advance_table(font, fontmode)
+            spans = _wrap_spans(plain, table, region_w, bold)
+            w, h, lh = _measure_block([plain[s:e] for s, e in spans], font, table, line_spacing, bold_lines(spans))
+            probe = probes[size] = (spans, lh, h, w <= region_w and h <= region_h)
+        return probe[3]
+
+    # 优先试探相近长度文本的历史字号，确认是边界时直接采用
+    hint_key = (font_path, region_w, region_h, hi, line_spacing, fontmode)
+    best_size = _search_font_size(fits, hi, hints.guess(hint_key, len(plain)))
+    hints.remember(hint_key, len(plain), best_size, len(probes))
+
+    if best_size == 0:
+        font = _load_font(1)
+        best_spans = _wrap_spans(plain, fonts.advance_table(font, fontmode), region_w, bold)
+        best_block_h, best_line_h = 1, 1
+        best_size = 1
+    else:
+        font = _load_font(best_size)
+        best_spans, best_line_h, best_block_h, _ = probes[best_size]
+    best_lines = [plain[s:e] for s, e in best_spans]
+
+    # --- 2. 每行水平位置与样式片段 ---
+    # 片段宽度由整行的测量器相减得到，不再逐段调用 textlength；与原来逐段绘制一样，x 按各片段取整后的宽度累加。
+    # 含加粗片段的行按加上两侧描边后的宽度对齐
+    table = fonts.advance_table(font, fontmode)
+    stroked = bold_lines(best_spans) or [False] * len(best_spans)
+    top = BOLD_STROKE if any(stroked) else 0
+    line_x: List[int] = []
+    runs: List[List[Tuple[str, int, Style]]] = []
+    ink_box = None
+    for i, ((start, end), ln) in enumerate(zip(best_spans, best_lines)):
+        width = table.measurer(ln)
+        pad = BOLD_STROKE if stroked[i] else 0
+        line_w = int(width(0, len(ln))) + 2 * pad
+        if align == "left":
+            line_x.append(pad)
+        elif align == "center":
+            line_x.append((region_w - line_w) // 2 + pad)
+        else:
+            line_x.append(region_w - line_w + pad)
+        line_runs = []
+        x = 0
+        for rs, re_, style in rich.runs(start, end):
+            for ss, se in _split_brackets(plain, rs, re_) if style.bracket else ((rs, re_),):
+                seg_text = plain[ss:se]
+                line_runs.append((seg_text, x, style))
+                l, t, r, b = font.getbbox(seg_text, fontmode, stroke_width=BOLD_STROKE if style.bold else 0)
+                ox, oy = line_x[-1] + x, top + i * best_line_h
+                seg_box = (ox + l, oy + t, ox + r, oy + b)
+                ink_box = seg_box if ink_box is None else union_rect(ink_box, seg_box)
+                x += int(width(ss - start, se - start))
+        runs.append(line_runs)
+
+    return TextLayout(best_size, best_lines, best_line_h, best_block_h, line_x, runs, ink_box or (0, 0, 0, 0), top)
+
+
+def get_text_layout(
+    text: str,
+    region_w: int,
+    region_h: int,
+    max_font_height: Optional[int] = None,
+    font_path: Optional[str] = None,
+    align: Align = "center",
+    line_spacing: float = 0.15,
+    fontmode: str = "L",
+    cache: Optional[LayoutCache] = None,
+    fonts: Optional[FontCache] = None,
+) -> TextLayout:
+    """带缓存的 layout_text；排版与底图无关，只切换差分时可以直接复用。字号提示使用 cache 自己的提示"""
+    if cache is None:
+        cache = layout_cache
+    key = (text, font_path, region_w, region_h, max_font_height, line_spacing, align, fontmode)
+    layout = cache.get(key)
+    if layout is None:
+        layout = layout_text(text, region_w, region_h, max_font_height, font_path, align, line_spacing, fontmode,
+                             fonts, cache.size_hints)
+        cache.put(key, layout)
+    return layout
+
+
+def render_text_auto(
     image_source: Union[str, Image.Image],
     top_left: Tuple[int, int],
     bottom_right: Tuple[int, int],
@@ -20,24 +385,22 @@ def draw_text_auto(
     line_spacing: float = 0.15,
     bracket_color: Tuple[int, int, int] = (128, 0, 128),  # 中括号及内部内容颜色
     image_overlay: Union[str, Image.Image, None]=None,
-) -> bytes:
+    assets: Optional[AssetCache] = None,
+    fonts: Optional[FontCache] = None,
+    layouts: Optional[LayoutCache] = None,
+) -> RenderedImage:
     """
     在指定矩形内自适应字号绘制文本；
-    中括号及括号内文字使用 bracket_color。
+    中括号及括号内文字使用 bracket_color，{red|文字}、{b|文字} 等样式标记见 rich_text。
+    assets / fonts / layouts 为资源、字体与排版缓存，默认使用全局缓存（见 renderer.SketchbookRenderer）。
+    返回未编码的渲染结果，由调用方选择输出格式（见 output_encoder）。
     """
+    if fonts is None:
+        fonts = font_cache
 
-    # --- 1. 打开图像 ---
-    if isinstance(image_source, Image.Image):
-        img = image_source.copy()
-    else:
-        img = Image.open(image_source).convert("RGBA")
-    draw = ImageDraw.Draw(img)
-
-    if image_overlay is not None:
-        if isinstance(image_overlay, Image.Image):
-            img_overlay = image_overlay.copy()
-        else:
-            img_overlay = Image.open(image_overlay).convert("RGBA") if os.path.isfile(image_overlay) else None
+    # --- 1. 解析图层 ---
+    with span("layers"):
+        layers = resolve_layers(image_source, image_overlay, assets)
 
     x1, y1 = top_left
     x2, y2 = bottom_right
@@ -45,149 +408,69 @@ def draw_text_auto(
         raise ValueError("无效的文字区域。")
     region_w, region_h = x2 - x1, y2 - y1
 
-    # --- 2. 字体加载 ---
-    def _load_font(size: int) -> ImageFont.FreeTypeFont:
-        if font_path and os.path.exists(font_path):
-            return ImageFont.truetype(font_path, size=size)
-        try:
-            return ImageFont.truetype("DejaVuSans.ttf", size=size)
-        except Exception:
-            return ImageFont.load_default()
-
-    # --- 3. 文本包行 ---
-    def wrap_lines(txt: str, font: ImageFont.FreeTypeFont, max_w: int) -> List[str]:
-        lines: list[str] = []
-        for para in txt.splitlines() or [""]:
-            has_space = (" " in para)
-            units = para.split(" ") if has_space else list(para)
-            buf = ""
-
-            def unit_join(a: str, b: str) -> str:
-                if not a:
-                    return b
-                return (a + " " + b) if has_space else (a + b)
-
-            for u in units:
-                trial = unit_join(buf, u)
-                w = draw.textlength(trial, font=font)
-                if w <= max_w:
-                    buf = trial
-                else:
-                    if buf:
-                        lines.append(buf)
-                    if has_space and len(u) > 1:
-                        tmp = ""
-                        for ch in u:
-                            if draw.textlength(tmp + ch, font=font) <= max_w:
-                                tmp += ch
-                            else:
-                                if tmp:
-                                    lines.append(tmp)
-                                tmp = ch
-                        buf = tmp
-                    else:
-                        if draw.textlength(u, font=font) <= max_w:
-                            buf = u
-                        else:
-                            lines.append(u)
-                            buf = ""
-            if buf != "":
-                lines.append(buf)
-            if para == "" and (not lines or lines[-1] != ""):
-                lines.append("")
-        return lines
-
-    # --- 4. 测量 ---
-    def measure_block(lines: List[str], font: ImageFont.FreeTypeFont) -> Tuple[int, int, int]:
-        ascent, descent = font.getmetrics()
-        line_h = int((ascent + descent) * (1 + line_spacing))
-        max_w = 0
-        for ln in lines:
-            max_w = max(max_w, int(draw.textlength(ln, font=font)))
-        total_h = max(line_h * max(1, len(lines)), 1)
-        return max_w, total_h, line_h
-
-    # --- 5. 搜索最大字号 ---
-    hi = min(region_h, max_font_height) if max_font_height else region_h
-    lo, best_size, best_lines, best_line_h, best_block_h = 1, 0, [], 0, 0
-
-    while lo <= hi:
-        mid = (lo + hi) // 2
-        font = _load_font(mid)
-        lines = wrap_lines(text, font, region_w)
-        w, h, lh = measure_block(lines, font)
-        if w <= region_w and h <= region_h:
-            best_size, best_lines, best_line_h, best_block_h = mid, lines, lh, h
-            lo = mid + 1
-        else:
-            hi = mid - 1
-
-    if best_size == 0:
-        font = _load_font(1)
-        best_lines = wrap_lines(text, font, region_w)
-        _, best_block_h, best_line_h = 0, 1, 1
-        best_size = 1
-    else:
-        font = _load_font(best_size)
+    # --- 2. 排版（字号搜索、包行、着色片段，可缓存） ---
+    fontmode = _fontmode(layers.base.mode)
+    with span("layout"):
+        layout = get_text_layout(text, region_w, region_h, max_font_height, font_path, align, line_spacing, fontmode,
+                                 layouts, fonts)
+        font = fonts.get(font_path, layout.font_size)
 
-    # --- 6. 解析着色片段 ---
-    def parse_color_segments(s: str,in_bracket: bool) -> Tuple[List[Tuple[str, Tuple[int, int, int]]],bool]:
-        segs: list[tuple[str, Tuple[int, int, int]]] = []
-        buf = ""
-        for ch in s:
-            if ch == "[" or ch == "【":
-                if buf:
-                    segs.append((buf, bracket_color if in_bracket else color))
-                    buf = ""
-                segs.append((ch, bracket_color))
-                in_bracket = True
-            elif ch == "]" or ch == "】":
-                if buf:
-                    segs.append((buf, bracket_color))
-                    buf = ""
-                segs.append((ch, bracket_color))
-                in_bracket = False
-            else:
-                buf += ch
-        if buf:
-            segs.append((buf, bracket_color if in_bracket else color))
-        return segs,in_bracket
-
-    # --- 7. 垂直对齐 ---
+    # --- 3. 垂直对齐 ---
     if valign == "top":
         y_start = y1
     elif valign == "middle":
-        y_start = y1 + (region_h - best_block_h) // 2
+        y_start = y1 + (region_h - layout.block_h) // 2
     else:
-        y_start = y2 - best_block_h
+        y_start = y2 - layout.block_h
 
-    # --- 8. 绘制 ---
-    y = y_start
-    in_bracket = False
-    for ln in best_lines:
-        line_w = int(draw.textlength(ln, font=font))
-        if align == "left":
-            x = x1
-        elif align == "center":
-            x = x1 + (region_w - line_w) // 2
-        else:
-            x = x2 - line_w
-        segments,in_bracket = parse_color_segments(ln,in_bracket)
-        for seg_text, seg_color in segments:
-            if seg_text:
-                draw.text((x, y), seg_text, font=font, fill=seg_color)
-                x += int(draw.textlength(seg_text, font=font))
-        y += best_line_h
-        if y - y_start > region_h:
-            break
-
-    # 覆盖置顶图层（如果有）
-    if image_overlay is not None and img_overlay is not None:
-        img.paste(img_overlay, (0, 0), img_overlay)
-    elif image_overlay is not None and img_overlay is None:
-        print("Warning: overlay image is not exist.")
-
-    # --- 9. 输出 PNG ---
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    # --- 4. 绘制 ---
+    # 只在文字框与字形着墨范围的并集内绘制
+    il, it, ir, ib = layout.ink_box
+    rect = union_rect((x1, y1, x2, y2), (x1 + il, y_start + it, x1 + ir, y_start + ib))
+
+    def render(crop: Image.Image, ox: int, oy: int) -> None:
+        draw = ImageDraw.Draw(crop)
+        y = y_start + layout.top
+        for line_x, line_runs in zip(layout.line_x, layout.runs):
+            for seg_text, seg_x, style in line_runs:
+                fill = style.color or (bracket_color if style.bracket else color)
+                if style.bold:
+                    draw.text((x1 + line_x + seg_x - ox, y - oy), seg_text, font=font, fill=fill,
+                              stroke_width=BOLD_STROKE, stroke_fill=fill)
+                else:
+                    draw.text((x1 + line_x + seg_x - ox, y - oy), seg_text, font=font, fill=fill)
+            y += layout.line_h
+            if y - y_start > region_h:
+                break
+
+    with span("draw"):
+        img = render_region(layers, rect, render)
+
+    # 变化区域以上的行与静态图相同，静态图来自资源缓存时 PNG 编码可复用其压缩结果
+    return RenderedImage(img, layers.reusable_static, rect[1])
+
+
+def draw_text_auto(
+    image_source: Union[str, Image.Image],
+    top_left: Tuple[int, int],
+    bottom_right: Tuple[int, int],
+    text: str,
+    color: Tuple[int, int, int] = (0, 0, 0),
+    max_font_height: Optional[int] = None,
+    font_path: Optional[str] = None,
+    align: Align = "center",
+    valign: VAlign = "middle",
+    line_spacing: float = 0.15,
+    bracket_color: Tuple[int, int, int] = (128, 0, 128),  # 中括号及内部内容颜色
+    image_overlay: Union[str, Image.Image, None]=None,
+    encoder: str = "default",
+) -> bytes:
+    """
+    在指定矩形内自适应字号绘制文本；
+    中括号及括号内文字使用 bracket_color。
+    encoder 为输出编码方案（见 output_encoder），返回编码后的图片 bytes。
+    """
+    rendered = render_text_auto(image_source, top_left, bottom_right, text, color, max_font_height, font_path,
+                                align, valign, line_spacing, bracket_color, image_overlay)
+    # PNG 方案下静态行（变化区域以上）的压缩结果会被缓存复用
+    return encode_rendered(rendered, encoder)
@@ -0,0 +1,193 @@
+# filename: text_measure.py
+"""
+文本宽度测量引擎
+
+自动换行时需要反复测量不断增长的字符串，逐次调用 textlength 是 O(n²) 的。
+这里为每个字体对象缓存单字宽度（以及字偶距），行内宽度通过前缀和直接相减得到。
+
+Pillow 的 BASIC 布局下字符串宽度严格等于单字宽度与相邻字偶距之和（均为 1/64 像素的整数倍，
+浮点相加没有误差），因此结果与 textlength 完全一致。
+
+RAQM 布局会做字形整形（连字等），宽度不可加。此时包行不再逐次测量每个候选行，
+而是对每个行首用单字宽度之和估计断行位置，再用 getlength 精确确认“该位置放得下、多一个字放不下”，
+估计偏差时按倍增步长移动后二分，每行通常只需两三次精确测量。
+这依赖于整形后的宽度不会因为在末尾追加文字而变小（对常见文字成立）；在此前提下断行结果与逐次调用 getlength 一致。
+
+宽度表由 font_cache.FontCache.advance_table 按字体对象创建并随字体缓存一起保存，不同的 FontCache 实例互不共享。
+"""
+import bisect
+import threading
+from typing import Dict, List, Tuple
+from PIL import ImageFont
+
+
+class AdvanceTable:
+    """
+    某个字体对象（已确定字号）下的字宽与字偶距表。
+    查表不加锁，未命中时在锁内测量并写入，可以在多个渲染线程中共享。
+    """
+
+    def __init__(self, font, mode: str = "L"):
+        self.font = font
+        self.mode = mode
+        self.additive = (
+            isinstance(font, ImageFont.FreeTypeFont)
+            and font.layout_engine == ImageFont.Layout.BASIC
+        )
+        self._advances: Dict[str, float] = {}
+        self._kerning: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def _getlength(self, s: str) -> float:
+        return self.font.getlength(s, self.mode)
+
+    def advance(self, ch: str) -> float:
+        adv = self._advances.get(ch)
+        if adv is None:
+            with self._lock:
+                adv = self._advances.get(ch)
+                if adv is None:
+                    adv = self._advances[ch] = self._getlength(ch)
+        return adv
+
+    def kerning(self, a: str, b: str) -> float:
+        pair = (a, b)
+        k = self._kerning.get(pair)
+        if k is None:
+            adv_a, adv_b = self.advance(a), self.advance(b)
+            with self._lock:
+                k = self._kerning.get(pair)
+                if k is None:
+                    k = self._kerning[pair] = self._getlength(a + b) - adv_a - adv_b
+        return k
+
+    def length(self, s: str) -> float:
+        """整串宽度，等价于 draw.textlength(s, font)"""
+        if not self.additive:
+            return self._getlength(s)
+        total = 0.0
+        prev = None
+        for ch in s:
+            total += self.advance(ch)
+            if prev is not None:
+                total += self.kerning(prev, ch)
+            prev = ch
+        return total
+
+    def measurer(self, s: str) -> "Measurer":
+        """
+        返回 s 的测量器：width(a, b) 得到 s[a:b] 的宽度，fits(a, b, limit) 判断其是否不超过 limit。
+        可加布局下预先计算前缀和，之后每次测量都是 O(1)。
+        """
+        if not self.additive:
+            return ShapedMeasurer(self, s)
+
+        # prefix[i] 为 s[:i] 的宽度，kern[i] 为 s[i-1] 与 s[i] 之间的字偶距
+        n = len(s)
+        prefix: List[float] = [0.0] * (n + 1)
+        kern: List[float] = [0.0] * (n + 1)
+        total = 0.0
+        for i, ch in enumerate(s):
+            if i > 0:
+                kern[i] = self.kerning(s[i - 1], ch)
+                total += kern[i]
+            total += self.advance(ch)
+            prefix[i + 1] = total
+        return PrefixMeasurer(prefix, kern)
+
+
+class Measurer:
+    """某个字符串的宽度测量器，下标均为该字符串中的位置"""
+
+    def __call__(self, a: int, b: int) -> float:
+        raise NotImplementedError
+
+    def fits(self, a: int, b: int, limit: float) -> bool:
+        """s[a:b] 的宽度是否不超过 limit"""
+        return self(a, b) <= limit
+
+
+class PrefixMeasurer(Measurer):
+    """可加布局：宽度由前缀和相减得到"""
+
+    def __init__(self, prefix: List[float], kern: List[float]):
+        self.prefix = prefix
+        self.kern = kern
+
+    def __call__(self, a: int, b: int) -> float:
+        if b <= a:
+            return 0.0
+        return self.prefix[b] - self.prefix[a] - self.kern[a]
+
+
+class ShapedMeasurer(Measurer):
+    """
+    整形布局（RAQM）：宽度用 getlength 精确测量并缓存；
+    fits 对每个 (行首, limit) 只求一次断行位置，之后同一行首的判断都是 O(1)。
+    """
+
+    def __init__(self, table: AdvanceTable, s: str):
+        self.table = table
+        self.s = s
+        self._widths: Dict[Tuple[int, int], float] = {}
+        # (行首, limit) -> 从该行首起放得下的最远终点
+        self._breaks: Dict[Tuple[int, float], int] = {}
+        # 单字宽度的前缀和，只用于估计断行位置
+        self._estimate: List[float] = [0.0]
+        for ch in s:
+            self._estimate.append(self._estimate[-1] + table.advance(ch))
+
+    def __call__(self, a: int, b: int) -> float:
+        if b <= a:
+            return 0.0
+        w = self._widths.get((a, b))
+        if w is None:
+            w = self._widths[(a, b)] = self.table._getlength(self.s[a:b])
+        return w
+
+    def fits(self, a: int, b: int, limit: float) -> bool:
+        if b <= a:
+            return 0.0 <= limit
+        key = (a, limit)
+        end = self._breaks.get(key)
+        if end is None:
+            end = self._breaks[key] = self._find_break(a, limit)
+        return b <= end
+
+    def _find_break(self, a: int, limit: float) -> int:
+        """最大的 end 使 s[a:end] 宽度不超过 limit（s[a:a] 视为放得下），结果经 getlength 精确确认"""
+        n = len(self.s)
+        if a >= n:
+            return n
+        est = self._estimate
+        guess = bisect.bisect_right(est, est[a] + limit, a, n + 1) - 1
+        guess = max(a + 1, min(n, guess))
+        good, bad = a, n + 1  # s[a:good] 放得下，s[a:bad] 放不下（n + 1 表示到末尾都放得下）
+        step = 1
+        if self(a, guess) <= limit:
+            good = guess
+            while good + step < bad:
+                t = good + step
+                if self(a, t) <= limit:
+                    good = t
+                    step *= 2
+                else:
+                    bad = t
+                    break
+        else:
+            bad = guess
+            while bad - step > good:
+                t = bad - step
+                if self(a, t) <= limit:
+                    good = t
+                    break
+                bad = t
+                step *= 2
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            if self(a, mid) <= limit:
+                good = mid
+            else:
+                bad = mid
+        return good
+
@@ -0,0 +1,162 @@
+# filename: trigger_profiler.py
+"""
+按需对单次触发做性能剖析
+
+arm(n) 之后的 n 次触发会在 cProfile 下运行，同时用一个采样线程（每毫秒读取一次调用栈）记录完整调用栈。
+每次触发在 output_dir 下保存三个文件：
+  <名称>.prof            cProfile 结果，可用 pstats / snakeviz 查看
+  <名称>.collapsed.txt   折叠调用栈（"栈帧;栈帧 次数"），可直接交给 flamegraph.pl / speedscope
+  <名称>.report.txt      text_fit_draw.py 与 image_fit_paste.py 中耗时最多的函数
+
+启动时设置环境变量 SKETCHBOOK_PROFILE=N 即剖析接下来的 N 次触发；也可以在 config 中设置剖析热键。
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+PROFILE_ENV = "SKETCHBOOK_PROFILE"
+
+# 报告中关注的模块
+TARGET_MODULES = ("text_fit_draw.py", "image_fit_paste.py")
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """在后台线程中定期采样目标线程的调用栈"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "_StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+def write_collapsed(stacks: Counter, path: str) -> None:
+    """写入折叠调用栈格式，每行为从根到叶、以分号分隔的栈帧加上采样次数"""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(";".join(stack) + f" {count}\n")
+
+
+def top_functions(stats: pstats.Stats, modules: Tuple[str, ...] = TARGET_MODULES,
+                  limit: int = 15) -> List[Tuple[float, float, int, str]]:
+    """返回指定模块中按累计耗时排序的函数：(累计秒数, 自身秒数, 调用次数, 名称)"""
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if os.path.basename(filename) in modules:
+            rows.append((cumtime, tottime, calls, f"{os.path.basename(filename)}:{line}({func})"))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def format_report(stats: pstats.Stats, total: float, samples: int) -> str:
+    lines = [
+        f"触发耗时 {total * 1000:.1f} ms，采样 {samples} 次",
+        "",
+        f"{'累计(ms)':>10} {'自身(ms)':>10} {'调用次数':>8}  函数",
+    ]
+    for cumtime, tottime, calls, name in top_functions(stats):
+        lines.append(f"{cumtime * 1000:10.2f} {tottime * 1000:10.2f} {calls:8d}  {name}")
+    return "\n".join(lines) + "\n"
+
+
+class TriggerProfiler:
+    """记录剩余需要剖析的触发次数，并负责保存结果"""
+
+    def __init__(self, output_dir: str = "profiles", sample_interval: float = 0.001):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self._remaining = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def arm(self, count: int = 1) -> None:
+        """剖析接下来的 count 次触发"""
+        with self._lock:
+            self._remaining = max(0, count)
+        print(f"将剖析接下来的 {count} 次触发，结果保存在 {self.output_dir}")
+
+    def arm_from_env(self) -> None:
+        value = os.environ.get(PROFILE_ENV, "").strip()
+        if value:
+            try:
+                self.arm(int(value))
+            except ValueError:
+                print(f"环境变量 {PROFILE_ENV} 应为整数: {value}")
+
+    def pending(self) -> bool:
+        return self._remaining > 0
+
+    def _take(self) -> int:
+        with self._lock:
+            if self._remaining <= 0:
+                return 0
+            self._remaining -= 1
+            self._seq += 1
+            return self._seq
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """在 cProfile 与调用栈采样下执行 with 块；没有待剖析的触发时直接执行"""
+        seq = self._take()
+        if not seq:
+            yield
+            return
+        profile = cProfile.Profile()
+        sampler = _StackSampler(threading.get_ident(), self.sample_interval).start()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            total = time.perf_counter() - start
+            stacks = sampler.stop()
+            try:
+                self._save(seq, profile, stacks, total)
+            except OSError as e:
+                print(f"保存剖析结果失败: {e}")
+
+    def _save(self, seq: int, profile: cProfile.Profile, stacks: Counter, total: float) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"trigger-{time.strftime('%Y%m%d-%H%M%S')}-{seq:03d}")
+        profile.dump_stats(base + ".prof")
+        write_collapsed(stacks, base + ".collapsed.txt")
+        report = format_report(pstats.Stats(profile), total, sum(stacks.values()))
+        with open(base + ".report.txt", "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"剖析结果已保存: {base}.prof / .collapsed.txt / .report.txt")
+        print(report)
+
+
+# 全局共享的剖析器
+profiler = TriggerProfiler()
@@ -0,0 +1,91 @@
+# filename: warmup.py
+"""
+启动预热
+
+第一次按下热键时要解码 PNG、解析字体、初始化剪贴板和 Pillow 的编码插件，明显比之后慢。
+这里在开始监听热键之前把这些工作提前做完（可放到后台线程），并打印每一步的耗时。
+"""
+import threading
+import time
+from typing import Callable, Optional
+from PIL import Image
+
+from config import BASEIMAGE_MAPPING, BASEIMAGE_FILE, BASE_OVERLAY_FILE, USE_BASE_OVERLAY, FONT_FILE, \
+    TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT
+from asset_cache import asset_cache
+from text_fit_draw import draw_text_auto, get_text_layout
+from image_fit_paste import paste_image_auto
+
+# 用于预热字号搜索的典型文本，覆盖短句、普通长度和长段落，对应会用到的大部分字号
+SAMPLE_TEXTS = [
+    "好",
+    "你好呀",
+    "今天也要【好好画画】哦！",
+    "这是一段比较长的消息，用来预热较小的字号。The quick brown fox jumps over the lazy dog.",
+    "很长的段落会用到更小的字号。" * 8,
+]
+
+
+def _step(name: str, func: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        print(f"预热 {name} 失败: {e}")
+        return
+    print(f"预热 {name}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def warm_up(adapter=None, encoder: str = "default", max_font_height: int = 64) -> None:
+    """依次预热底图、字体、渲染与编码；传入 adapter 时也预热系统剪贴板"""
+    total_start = time.perf_counter()
+    overlay = BASE_OVERLAY_FILE if USE_BASE_OVERLAY else None
+    bases = list(dict.fromkeys([BASEIMAGE_FILE, *BASEIMAGE_MAPPING.values()]))
+    region_w = IMAGE_BOX_BOTTOMRIGHT[0] - TEXT_BOX_TOPLEFT[0]
+    region_h = IMAGE_BOX_BOTTOMRIGHT[1] - TEXT_BOX_TOPLEFT[1]
+
+    def decode_assets():
+        asset_cache.preload(bases + ([overlay] if overlay else []))
+        if overlay:
+            for base in bases:
+                asset_cache.get_composite(base, overlay)
+
+    def load_fonts():
+        # 排版时会把字号搜索中用到的字体都载入缓存
+        for text in SAMPLE_TEXTS:
+            get_text_layout(text, region_w, region_h, max_font_height, FONT_FILE)
+
+    def render_text():
+        # 每张差分都渲染一次，同时建立各自的 PNG 静态行压缩缓存
+        for base in bases:
+            draw_text_auto(base, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, SAMPLE_TEXTS[2],
+                           max_font_height=max_font_height, font_path=FONT_FILE,
+                           image_overlay=overlay, encoder=encoder)
+
+    def render_image():
+        dummy = Image.new("RGBA", (64, 64), (255, 255, 255, 255))
+        paste_image_auto(BASEIMAGE_FILE, TEXT_BOX_TOPLEFT, IMAGE_BOX_BOTTOMRIGHT, dummy,
+                         padding=12, allow_upscale=True, image_overlay=overlay, encoder=encoder)
+
+    _step("解码底图", decode_assets)
+    _step("加载字体", load_fonts)
+    _step("渲染文字", render_text)
+    _step("渲染图片", render_image)
+    if adapter is not None:
+        _step("剪贴板", adapter.warm_up)
+    print(f"预热完成，共 {(time.perf_counter() - total_start) * 1000:.1f} ms")
+
+
+def start_warm_up(adapter=None, encoder: str = "default", background: bool = True) -> Optional[threading.Thread]:
+    """
+    启动预热；background 为 True 时渲染相关的预热在后台线程中执行并返回该线程。
+    剪贴板（例如 Qt）通常要求在创建它的线程中访问，因此总是在当前线程预热。
+    """
+    if not background:
+        warm_up(adapter, encoder)
+        return None
+    if adapter is not None:
+        _step("剪贴板", adapter.warm_up)
+    thread = threading.Thread(target=warm_up, args=(None, encoder), name="warm-up", daemon=True)
+    thread.start()
+    return thread